@@ -17,8 +17,10 @@ import functions as fun           # functions library
 import monthly_battery_functions as batt
 import rate_functions as rate     # Suite of rate functions, simpler interface for one-off
 import pvs as dispatch          # medium voltage AC arbitrage function
+import dispatch_result as dr      # hourly dispatch output container
 # import plot_tools as plotit
 import timearray_gen
+import array_store                # shared read only case arrays
 import gc                         # python garbage collector
 
 #%% Project Declarations
@@ -102,6 +104,8 @@ project_rates = rate.uda_35()
 print(f'time through loading rates: {time.time()-start} seconds\n')
 
 #%% define cases, populate case list
+# Cases share their identical hourly arrays through the store.
+store = array_store.ArrayStore()
 case_list = fun.define_cases(component_dict,
                              module_deg, 
                              array_life,
@@ -111,10 +115,47 @@ case_list = fun.define_cases(component_dict,
                              inv_np,
                              PCS_np, 
                              batt_hour,
-                             aug_sched) 
-
-#%% Dispatch
-dispatch.arbitrage(PV_min_energy_chg_threshold, ppa_min_delta, case_list, project_rates, battery_limit_at_POI, battery_hours_at_POI)
+                             aug_sched,
+                             store) 
+stats = store.stats()
+print(f'shared case arrays: {stats["hits"]} of {stats["requests"]}, '
+      f'{stats["saved bytes"]/1024**2:.1f} MB saved')
+# Report the cases that end up with the same dispatch inputs.
+for group in fun.identical_cases(case_list):
+    print(f'identical dispatch inputs: {", ".join(group)}')
+
+#%% Dispatch, streamed one year at a time
+# Each case is dispatched a year at a time, only one year of dense dispatch 
+# inputs is built at once and the annual totals are collected as each year is
+# completed. The hourly output is still kept for the case, the plots and the
+# monthly outputs below read the full run.
+annual_totals = {}
+for key, case in case_list.items():
+    start = time.time()
+    case_output = dr.DispatchResult(len(case['degraded array energy']))
+    annual_totals[key] = []
+    for days, year_output in dispatch.pvs_ac_mv_stream(max(case['degraded array energy'])*PV_min_energy_chg_threshold,
+                                                       ppa_min_delta,
+                                                       battery_limit_at_POI,
+                                                       battery_hours_at_POI,
+                                                       case['degraded array energy'],
+                                                       project_rates,
+                                                       case['POI'],
+                                                       case['losses'],
+                                                       case['limits'],
+                                                       case['battery capacity'],
+                                                       case['battery power'],
+                                                       block_days=365):
+        case_output.days[days] = year_output.days
+        annual_totals[key].append({'year': days.start//365 + 1,
+                                   'PV only energy at POI (MWh)': year_output['PV only plant energy'].sum(),
+                                   'PV + S energy at POI (MWh)': (year_output['PVS POI output - PV'].sum() +
+                                                                  year_output['PVS POI output - battery'].sum()),
+                                   'battery discharge at POI (MWh)': year_output['PVS POI output - battery'].sum()})
+        print(f"{key} year {annual_totals[key][-1]['year']} PV + S: {annual_totals[key][-1]['PV + S energy at POI (MWh)']}")
+    case['dispatch output'] = case_output
+    print(f'{key} dispatch time: {time.time()-start} seconds')
+df_annual = pd.DataFrame(annual_totals['Case 1']).set_index('year')
 
 #%% plotting
 date_time_out = timearray_gen.time_array(date_start,
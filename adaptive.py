@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive coarse to fine case sweep. Rather than dispatching the full grid of
+DC/AC ratio, inverter nameplate, PCS nameplate and battery hours built by
+functions.define_cases, a coarse grid is dispatched first and the search
+refines around the best cases for the chosen objective, halving the spacing
+until it reaches the step of each range. Cases already dispatched are never
+run again. With case_workers or workers in the arbitrage arguments one pool is
+created for the whole sweep and reused by every round.
+"""
+import itertools
+
+import numpy as np
+
+import functions as fun
+import helper_functions as hf
+import parallel as par
+import pvs
+import retention as rt
+
+# Sweep axes in the order define_cases loops over them.
+AXES = ['dc_ac ratio', 'Inv_np', 'PCS nameplate', 'battery hour']
+
+
+def _coarse_stride(n_values, coarse_points):
+    # Index spacing giving about coarse_points values along an axis.
+    if n_values <= 1:
+        return 1
+    return max(1, int(np.ceil((n_values - 1) / max(coarse_points - 1, 1))))
+
+
+def _axis_indices(n_values, stride):
+    # Indices at the stride, always including the last value.
+    indices = list(range(0, n_values, stride))
+    if indices[-1] != n_values - 1:
+        indices.append(n_values - 1)
+    return indices
+
+
+def adaptive_sweep(components,
+                   module_deg,
+                   array_energy,
+                   batt_deg,
+                   POI,
+                   dc_ac,
+                   inv_np,
+                   pcs,
+                   batt_hour,
+                   project_rates,
+                   PV_min_energy_chg_threshold,
+                   ppa_min_delta,
+                   batt_limit_POI,
+                   batt_hours_POI,
+                   aug_sched=[],
+                   objective='PVS energy at POI (MWh)',
+                   coarse_points=3,
+                   refine_top=1,
+                   arbitrage_kwargs=None):
+    """
+    Function to search the case ranges for the best case of an objective,
+    dispatching a coarse grid and refining around the best cases.
+
+    Parameters
+    ----------
+    components, module_deg, array_energy, batt_deg, POI :
+        see functions.define_cases.
+    dc_ac, inv_np, pcs, batt_hour : list
+        start, stop, step of each range, as passed to define_cases. The step
+        is the resolution the search refines down to.
+    project_rates, PV_min_energy_chg_threshold, ppa_min_delta,
+    batt_limit_POI, batt_hours_POI :
+        see pvs.arbitrage.
+    aug_sched : list, optional
+        augmentation schedule, see define_cases. The default is [].
+    objective : string, optional
+        KPI from retention.aggregate_output to maximize. The default is
+        'PVS energy at POI (MWh)', 'PVS revenue ($)' ranks on revenue.
+    coarse_points : int, optional
+        values along each axis in the first grid. The default is 3.
+    refine_top : int, optional
+        number of best cases refined around each round. The default is 1.
+    arbitrage_kwargs : dict, optional
+        extra keyword arguments for pvs.arbitrage (engine, case_workers, ...).
+        A pool is created for the sweep when case_workers or workers is above
+        1 and no pool is given. Cases are scored from their hourly dispatch 
+        output, screening_days, horizon_step and retention raise a ValueError.
+        The default is None.
+
+    Returns
+    -------
+    search : dict
+        dictionary containing the following information:
+            best:       name of the best case.
+            cases:      every dispatched case with its 'dispatch aggregates',
+                        the hourly 'dispatch output' is kept for the best case.
+            rounds:     list of (stride, cases dispatched, best objective) for
+                        each round.
+            runs:       number of cases dispatched.
+            grid size:  number of cases in the full define_cases grid.
+
+    """
+    arbitrage_kwargs = dict(arbitrage_kwargs or {})
+    # Every round scores the hourly dispatch output of its cases.
+    unsupported = [key for key in ('screening_days', 'horizon_step', 'retention')
+                   if arbitrage_kwargs.get(key) is not None]
+    if len(unsupported) > 0:
+        raise ValueError('adaptive_sweep scores the full dispatch output, remove '
+                         f'{", ".join(unsupported)} from arbitrage_kwargs')
+    # One pool for every round, the workers are started once for the sweep.
+    case_workers = arbitrage_kwargs.get('case_workers', 1)
+    pool_workers = max(case_workers, arbitrage_kwargs.get('workers', 1))
+    own_pool = arbitrage_kwargs.get('pool') is None and pool_workers > 1
+    if own_pool:
+        arbitrage_kwargs['pool'] = par.make_pool(pool_workers,
+                                                 'process' if case_workers > 1 else
+                                                 arbitrage_kwargs.get('executor', 'process'))
+    values = [hf.case_steps(axis[0], axis[1], axis[2])
+              for axis in (dc_ac, inv_np, pcs, batt_hour)]
+    sizes = [len(axis_values) for axis_values in values]
+    # Aggregates for every case, hourly output only for the best.
+    policy = rt.RetentionPolicy(project_rates, top=1, rank_by=objective)
+    cases = {}
+    scores = {}
+    names = {}
+
+    def evaluate(indices):
+        # Build and dispatch the cases not already run.
+        new = {}
+        for index in indices:
+            if index in names:
+                continue
+            point = [values[axis][index[axis]] for axis in range(len(AXES))]
+            case = fun.define_cases(components,
+                                    module_deg,
+                                    array_energy,
+                                    batt_deg,
+                                    POI,
+                                    [point[0], point[0], 0],
+                                    [point[1], point[1], 0],
+                                    [point[2], point[2], 0],
+                                    [point[3], point[3], 0],
+                                    aug_sched)['Case 1']
+            name = f'Case {len(names) + 1}'
+            names[index] = name
+            new[name] = case
+        if len(new) == 0:
+            return 0
+        pvs.arbitrage(PV_min_energy_chg_threshold,
+                      ppa_min_delta,
+                      new,
+                      project_rates,
+                      batt_limit_POI,
+                      batt_hours_POI,
+                      **arbitrage_kwargs)
+        for name in new:
+            cases[name] = new[name]
+            policy.apply(cases, name)
+            scores[name] = cases[name]['dispatch aggregates']['KPIs'][objective]
+        return len(new)
+
+    def ranked():
+        # Evaluated grid indices, best first (earlier cases win ties).
+        return sorted(names, key=lambda index: -scores[names[index]])
+
+    try:
+        strides = [_coarse_stride(size, coarse_points) for size in sizes]
+        runs = evaluate(list(itertools.product(*[_axis_indices(size, stride)
+                                                 for size, stride in zip(sizes, strides)])))
+        rounds = [(list(strides), runs, scores[names[ranked()[0]]])]
+        while True:
+            best = names[ranked()[0]]
+            # Neighbours of the best cases at the current spacing.
+            neighbours = set()
+            for centre in ranked()[:refine_top]:
+                steps = [sorted(set(min(max(centre[axis] + offset, 0), sizes[axis] - 1)
+                                    for offset in (-strides[axis], 0, strides[axis])))
+                         for axis in range(len(AXES))]
+                neighbours.update(itertools.product(*steps))
+            dispatched = evaluate(sorted(neighbours))
+            runs += dispatched
+            improved = names[ranked()[0]] != best
+            rounds.append((list(strides), dispatched, scores[names[ranked()[0]]]))
+            if improved:
+                # Move to the better case at the same spacing.
+                continue
+            if all(stride == 1 for stride in strides):
+                # Best case beats every neighbour at the requested resolution.
+                break
+            strides = [max(1, (stride + 1)//2) for stride in strides]
+    finally:
+        if own_pool:
+            arbitrage_kwargs['pool'].shutdown()
+    search = {'best': names[ranked()[0]],
+              'cases': cases,
+              'rounds': rounds,
+              'runs': runs,
+              'grid size': int(np.prod(sizes))}
+    return search
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+In-process interning store for the hourly case inputs. Cases of a sweep share
+many identical arrays (the constant loss paths, the degraded array energy of a
+DC/AC ratio, the battery of a battery hour), the store hands out one shared
+read only array for each distinct content so each case does not hold its own
+copy.
+
+Arrays are looked up on a fingerprint of their dtype, shape and a sample of
+their values and confirmed by a full comparison. The store only holds weak
+references, an array is dropped once no case uses it and its bucket is removed
+once empty.
+"""
+import functools
+import weakref
+
+import numpy as np
+
+# Values sampled along an array for its fingerprint.
+SAMPLE_SIZE = 64
+
+
+class ArrayStore:
+    """
+    Content addressed store of shared read only arrays.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.saved_bytes = 0
+        self._buckets = {}
+
+    def _fingerprint(self, array):
+        flat = array.reshape(-1)
+        step = max(1, flat.size // SAMPLE_SIZE)
+        return (array.dtype.str, array.shape, flat[::step].tobytes())
+
+    def _release(self, key, ref):
+        # Weak reference callback, drop the freed array and its bucket once 
+        # it is empty.
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return
+        bucket[:] = [stored for stored in bucket if stored is not ref]
+        if len(bucket) == 0:
+            del self._buckets[key]
+
+    def intern(self, array):
+        """
+        Return the shared array with the same content, storing the array if 
+        its content is new. Scalars are returned as is.
+
+        A stored array is shared by every case with the same content, so the
+        caller's array is made read only (array.flags.writeable is set to 
+        False) when it is stored. Copy an interned array before changing it.
+        """
+        if not isinstance(array, np.ndarray) or array.ndim == 0:
+            return array
+        self.requests += 1
+        key = self._fingerprint(array)
+        # Copy, the callback can change the bucket while it is compared.
+        bucket = list(self._buckets.get(key, []))
+        for ref in bucket:
+            stored = ref()
+            if stored is array or (stored is not None and
+                                   np.array_equal(stored, array, equal_nan=True)):
+                if stored is not array:
+                    self.hits += 1
+                    self.saved_bytes += array.nbytes
+                return stored
+        array.flags.writeable = False
+        self._buckets.setdefault(key, []).append(
+            weakref.ref(array, functools.partial(self._release, key)))
+        return array
+
+    def intern_dict(self, dictionary):
+        """
+        Intern the arrays of a dictionary (e.g. losses or limits) in place.
+        """
+        for key, value in dictionary.items():
+            dictionary[key] = self.intern(value)
+        return dictionary
+
+    def clear(self):
+        """
+        Forget the stored arrays and reset the counters.
+        """
+        self._buckets.clear()
+        self.requests = 0
+        self.hits = 0
+        self.saved_bytes = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats : dict
+            requests, hits, arrays currently stored and bytes saved by sharing.
+        """
+        return {'requests': self.requests,
+                'hits': self.hits,
+                'arrays': sum(len(bucket) for bucket in self._buckets.values()),
+                'saved bytes': self.saved_bytes}
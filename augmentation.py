@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Battery augmentation cohorts. Each tranche of an augmentation schedule follows
+the same degradation profile from the year it is installed, so the tranches
+are held as a (tranches x hours) cohort matrix gathered from the single unit
+profile by offset indexing. Capacity, DOD nameplate, max power and the
+capacity weighted efficiencies are then sums over the tranche axis.
+"""
+import numpy as np
+
+
+def cohort_matrix(profile, starts, hours):
+    """
+    Function to place a profile at the start hour of each tranche.
+
+    Parameters
+    ----------
+    profile : array
+        hourly profile from the install hour of a tranche.
+    starts : array
+        (tranches) install hour of each tranche.
+    hours : int
+        number of hours in the simulation.
+
+    Returns
+    -------
+    cohort : array
+        (tranches x hours) profile of each tranche, zero before the tranche
+        is installed and after its profile ends.
+
+    """
+    profile = np.asarray(profile, dtype=float)
+    # Zero padded profile, the window starting hours - start covers the 
+    # simulation hours of a tranche installed at start.
+    padded = np.concatenate((np.zeros(hours), profile, np.zeros(hours)))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, hours)
+    # Tranches installed after the end of the simulation stay all zero.
+    offsets = hours - np.minimum(np.asarray(starts, dtype=int), hours)
+    cohort = windows[offsets]
+    return cohort
+
+
+def cohort_battery(battery,
+                   batt_deg,
+                   batt_hour,
+                   aug_sched,
+                   hours):
+    """
+    Function to build the hourly battery capacity and power of an augmented
+    battery system.
+
+    Parameters
+    ----------
+    battery : dict
+        battery from component list for the case.
+    batt_deg : dict
+        hourly capacity and round trip efficiency for the battery.
+    batt_hour : float
+        battery hours (hours).
+    aug_sched : list
+        list of year, and amount (MW) for each battery system augmentation.
+    hours : int
+        number of hours in the simulation.
+
+    Returns
+    -------
+    batt_cap : dict
+        hourly capacity and capacity weighted rte of the installed tranches.
+    batt_power : dict
+        hourly max power, capacity weighted charge and discharge eta, and DOD
+        np of the installed tranches.
+
+    """
+    starts = np.array([aug[0] for aug in aug_sched], dtype=int)*8760
+    amounts = np.array([aug[1] for aug in aug_sched], dtype=float)[:,None]
+    # Capacity per MW installed (MWh / MW), and rte, from the install hour.
+    unit_capacity = np.squeeze(batt_deg['battery capacity'] * batt_hour)
+    capacity = cohort_matrix(unit_capacity, starts, hours) * amounts
+    rte_profile = np.squeeze(batt_deg['rte'])
+    rte = cohort_matrix(rte_profile, starts, hours)
+    # Charge and discharge efficiency are the square root of round trip.
+    chg_eta = cohort_matrix(np.sqrt(rte_profile), starts, hours)
+    # Capacity installed each hour, tranches with capacity remaining.
+    capacity_installed = ((capacity != 0) * amounts).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Efficiencies weighted by the installed capacity of each tranche.
+        rte_total = (rte * amounts).sum(axis=0) / capacity_installed
+        chg_total = (chg_eta * amounts).sum(axis=0) / capacity_installed
+    batt_cap = {'capacity': capacity.sum(axis=0),
+                'rte': rte_total}
+    batt_power = {'max p': (capacity * battery['cp']).sum(axis=0),
+                  'charge eta': chg_total,
+                  'discharge eta': chg_total,
+                  'DOD np': (capacity * battery['eta_DOD']).sum(axis=0)}
+    return batt_cap, batt_power
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Calendar expansion of degradation curves. Annual curves are interpolated to
+monthly values and monthly values are repeated over the hours of each month
+(365 day years), so the hourly module and battery degradation are built with
+one interp and one repeat call rather than looping over every hour.
+
+The hourly curves only depend on the component model, they are cached keyed
+on a digest of the component dictionary (and the cycles per day of the
+battery) and returned read only since every case shares them.
+"""
+import hashlib
+
+import numpy as np
+
+# Days in each month of the simulation year.
+MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+# Hours in each month of the simulation year.
+MONTH_HOURS = np.array(MONTH_DAYS)*24
+
+# Hourly curves built so far, keyed on (curve, component digest, ...).
+_CACHE = {}
+
+
+def monthly_to_hourly(monthly):
+    """
+    Function to repeat monthly values over the hours of each month.
+
+    Parameters
+    ----------
+    monthly : array
+        one value per month, starting in January, a whole number of years.
+
+    Returns
+    -------
+    hourly : array
+        value of the month for every hour.
+
+    """
+    monthly = np.asarray(monthly, dtype=float).reshape(-1)
+    years = len(monthly)//12
+    return np.repeat(monthly, np.tile(MONTH_HOURS, years))
+
+
+def annual_to_monthly(months, points, values):
+    """
+    Function to linearly interpolate values known at some months to every
+    month.
+
+    Parameters
+    ----------
+    months : int
+        number of months to return.
+    points : array
+        months (from 0) of the known values, increasing.
+    values : array
+        known values at the points.
+
+    Returns
+    -------
+    monthly : array
+        interpolated value for each month.
+
+    """
+    return np.interp(np.arange(months), points, values)
+
+
+def component_digest(component):
+    """
+    Returns
+    -------
+    digest : string
+        hex digest of the values of a component model dictionary.
+    """
+    digest = hashlib.sha256()
+    for key in sorted(component):
+        value = np.asarray(component[key])
+        digest.update(str(key).encode())
+        if value.dtype == object:
+            digest.update(repr(component[key]).encode())
+        else:
+            digest.update(f'{value.dtype.str}{value.shape}'.encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+    return digest.hexdigest()
+
+
+def cached(key, build):
+    """
+    Function to return the cached curves for a key, building (and caching)
+    them on the first call.
+
+    Parameters
+    ----------
+    key : tuple
+        cache key, e.g. ('module', component_digest(module)).
+    build : function
+        called without arguments to build the array, or dictionary of arrays.
+
+    Returns
+    -------
+    curves : array or dict
+        read only array, or dictionary of read only arrays.
+
+    """
+    if key not in _CACHE:
+        curves = build()
+        for array in (curves.values() if isinstance(curves, dict) else [curves]):
+            array.flags.writeable = False
+        _CACHE[key] = curves
+    curves = _CACHE[key]
+    # New dictionary so callers adding keys do not change the cache.
+    return dict(curves) if isinstance(curves, dict) else curves
+
+
+def clear_cache():
+    """
+    Forget the cached curves.
+    """
+    _CACHE.clear()
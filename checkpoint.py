@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk checkpoint store for case sweeps. Each finished case is written as it
+completes, the hourly dispatch output as a .npy file (memory mappable) and
+screening / horizon results as pickles, with a json manifest holding the case
+metadata. A sweep restarted with the same store skips the cases already done,
+and the store can be read from another process while the sweep is running.
+
+Files are written under a temporary name and renamed into place, so readers
+only ever see complete files.
+"""
+import json
+import os
+import pickle
+import re
+import time
+
+import numpy as np
+
+import dispatch_result as dr
+
+MANIFEST = 'manifest.json'
+
+
+def replace_file(path, write):
+    """
+    Write a file through a temporary file in the same directory and rename it
+    into place, the rename is atomic so a crash never leaves a partial file.
+    Used by the checkpoint and result cache stores.
+
+    Parameters
+    ----------
+    path : string
+        file to write.
+    write : function
+        called with the open (binary) temporary file to write the contents.
+
+    Returns
+    -------
+    None.
+
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def case_metadata(case):
+    """
+    Returns
+    -------
+    metadata : dict
+        scalar values of the case (POI, DC/AC ratio, nameplates, battery hour).
+    """
+    metadata = {}
+    for key, value in case.items():
+        if isinstance(value, (bool, int, float, str, np.integer, np.floating)):
+            metadata[key] = value.item() if isinstance(value, np.generic) else value
+    return metadata
+
+
+class SweepCheckpoint:
+    """
+    Checkpoint store for the cases of a sweep.
+
+    Parameters
+    ----------
+    directory : string
+        folder holding the store, created if it does not exist.
+    parameters : dict, optional
+        sweep parameters (thresholds, limits, mode). A store created with
+        different parameters raises a ValueError rather than mixing results.
+        The default is None, which skips the check.
+    """
+
+    def __init__(self, directory, parameters=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._read_manifest()
+        if parameters is not None:
+            parameters = json.loads(json.dumps(parameters, default=str))
+            stored = self.manifest.get('parameters')
+            if stored is None:
+                self.manifest['parameters'] = parameters
+                self._write_manifest()
+            elif stored != parameters:
+                raise ValueError(f'checkpoint {directory} was created with different '
+                                 f'sweep parameters: {stored}')
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return {'cases': {}}
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def _write_manifest(self):
+        data = json.dumps(self.manifest, indent=1, default=str).encode()
+        replace_file(os.path.join(self.directory, MANIFEST),
+                      lambda file: file.write(data))
+
+    def refresh(self):
+        """
+        Re-read the manifest, picking up cases finished by a running sweep.
+        """
+        self.manifest = self._read_manifest()
+
+    def done(self, key):
+        return key in self.manifest['cases']
+
+    def keys(self):
+        """
+        Returns
+        -------
+        keys : list
+            finished cases, in the order they completed.
+        """
+        return list(self.manifest['cases'])
+
+    def metadata(self, key):
+        return self.manifest['cases'][key]['metadata']
+
+    def save(self, key, output_key, output, metadata=None):
+        """
+        Write a finished case to the store and record it in the manifest.
+
+        Parameters
+        ----------
+        key : string
+            case name.
+        output_key : string
+            'dispatch output', 'screening output' or 'horizon output'.
+        output : DispatchResult or dict
+            result of the case, hourly results are stored as .npy.
+        metadata : dict, optional
+            case metadata (case_metadata). The default is None.
+        """
+        name = re.sub(r'[^\w\-]+', '_', key)
+        if isinstance(output, dr.DispatchResult):
+            file_name = f'{name}.npy'
+            replace_file(os.path.join(self.directory, file_name),
+                          lambda file: np.save(file, output.data))
+        else:
+            file_name = f'{name}.pkl'
+            replace_file(os.path.join(self.directory, file_name),
+                          lambda file: pickle.dump(output, file))
+        self.manifest['cases'][key] = {'file': file_name,
+                                       'output': output_key,
+                                       'metadata': metadata or {},
+                                       'completed': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self._write_manifest()
+
+    def load(self, key, mmap=True):
+        """
+        Read a finished case from the store.
+
+        Parameters
+        ----------
+        key : string
+            case name.
+        mmap : boolean, optional
+            memory map the hourly output instead of reading it into memory.
+            The default is True.
+
+        Returns
+        -------
+        output_key : string
+            key the output is stored under in the case.
+        output : DispatchResult or dict
+            result of the case.
+        """
+        entry = self.manifest['cases'][key]
+        path = os.path.join(self.directory, entry['file'])
+        if entry['file'].endswith('.npy'):
+            data = np.load(path, mmap_mode='r' if mmap else None)
+            output = dr.DispatchResult.from_buffer(data)
+        else:
+            with open(path, 'rb') as file:
+                output = pickle.load(file)
+        return entry['output'], output
@@ -1,13 +1,91 @@
 # -*- coding: utf-8 -*-
+def dispatch_workspace():
+    """
+    Function to allocate the scratch arrays used by daily_arbitrage. The 
+    workspace is created once per case and reset in place for each day, so the
+    daily dispatch does not allocate new arrays for every day of the run.
+
+    Returns
+    -------
+    workspace : dict
+        dictionary of zeroed scratch arrays keyed by the daily_arbitrage 
+        variable name.
+
+    """
+    import numpy as np
+
+    workspace = {'seq_index_24': np.arange(0,24,1),
+                 'PV_charge_enabled': np.zeros((24), dtype=bool),
+                 'PV_charge_cost': np.zeros((24)),
+                 'seq_chg_24': np.zeros((24,7)),
+                 'seq_chg_sort_24': np.zeros((24,7)),
+                 'seq_disch_24': np.zeros((24,7)),
+                 'seq_disch_sort_24': np.zeros((24,7)),
+                 'seq_chg_sort_index': np.zeros((24,11)),
+                 'seq_chg_sort_new': np.zeros((24,11)),
+                 'seq_chg_matrix': np.zeros((24,14)),
+                 'seq_disch_sort_index': np.zeros((24,11)),
+                 'seq_disch_matrix': np.zeros((24,11)),
+                 'clip_chglim_batt_e': np.zeros((24)),
+                 'clip_batt_e': np.zeros((24)),
+                 'clip_stat_batt_chg': np.zeros((24)),
+                 'clip_chg_PV_e': np.zeros((24)),
+                 'PV_chglim_batt_e': np.zeros((24)),
+                 'PV_chg_batt_e': np.zeros((24)),
+                 'PV_chg_stat_batt_chg': np.zeros((24)),
+                 'PV_chg_PV_e': np.zeros((24)),
+                 'disch_lim_batt_e': np.zeros((24)),
+                 'disch_batt_e': np.zeros((24)),
+                 'disch_POI_e': np.zeros((24)),
+                 'stat_batt_disch': np.zeros((24)),
+                 'batt_SOC': np.zeros((24)),
+                 'SOC_run': np.zeros((24)),
+                 'chg_restore': np.zeros((24), dtype=int),
+                 'disch_restore': np.zeros((24), dtype=int),
+                 'gap_POI_p_24': np.zeros((24)),
+                 'PV_only_POI_e': np.zeros((24)),
+                 'deliverable_PV_e': np.zeros((24)),
+                 'batt_recap_PV_e': np.zeros((24)),
+                 'inv_out_e': np.zeros((24)),
+                 'chg_PV_e': np.zeros((24)),
+                 'batt_SOC_pct': np.zeros((24)),
+                 'batt_SOC_MWh': np.zeros((24)),
+                 'delivered_PV_e': np.zeros((24))}
+    
+    return workspace
+
+
+def reset_workspace(workspace):
+    """
+    Function to zero the scratch arrays of a dispatch workspace in place 
+    before the next day is dispatched.
+
+    Parameters
+    ----------
+    workspace : dict
+        workspace from dispatch_workspace.
+
+    Returns
+    -------
+    None.
+
+    """
+    for key in workspace:
+        if key != 'seq_index_24':
+            workspace[key].fill(0)
+
+
 def daily_arbitrage(arbitrage,
                     POI,
                     PV_min_energy_chg,
                     ppa_min_delta,
                     batt_limit_POI,
                     batt_hours_POI,
-                    daily_array):
-    import numpy as np
-
+                    daily_array,
+                    workspace=None,
+                    pvs_out=None,
+                    chg_order=None,
+                    disch_order=None):
     """
     Function to take an incoming set of information for PV + S simulation, assign
     losses and limits and create preferential pairs for charging and discharging 
@@ -55,6 +133,19 @@ def daily_arbitrage(arbitrage,
               22:     max p
               23:     capacity (battery)
               24:     rte (battery)Bat
+    workspace : dict, optional
+        scratch arrays from dispatch_workspace, reused between days. The 
+        default is None, which allocates a new workspace for the call.
+    pvs_out : array, optional
+        24 x 15 array (or slice of the caller's output) to write the results 
+        into. The default is None, which allocates a new array.
+    chg_order : array, optional
+        hours of the day sorted by PV charge cost, from charge_order. The 
+        default is None, which sorts the day here.
+    disch_order : array, optional
+        hours of the day sorted by combined rate, the day's row of the rate 
+        index order (rate_functions.daily_rate_index). The default is None, 
+        which sorts the day here.
 
     Returns
     -------
@@ -75,42 +166,55 @@ def daily_arbitrage(arbitrage,
             12:     hour sequence
 
     """
+    import numpy as np
+
     pcs_np = batt_limit_POI
     batt_cap_limit = pcs_np*batt_hours_POI
-    # populate containers for 24 hour period.
-    seq_index_24 = np.arange(0,24,1)        
-    seq_chg_24 = np.zeros((24,7))
-    seq_disch_24 = np.zeros((24,7))
-    seq_chg_matrix = np.zeros((24,14))
-    seq_disch_matrix = np.zeros((24,11))
-    clip_chglim_batt_e = np.zeros((24))
-    clip_batt_e = np.zeros((24))
-    clip_stat_batt_chg = np.zeros((24))
-    clip_chg_PV_e = np.zeros((24))
-    PV_chglim_batt_e = np.zeros((24))
-    PV_chg_batt_e = np.zeros((24))
-    PV_chg_stat_batt_chg = np.zeros((24))
-    PV_chg_PV_e = np.zeros((24))
-    disch_lim_batt_e = np.zeros((24))
-    disch_batt_e = np.zeros((24))
-    disch_POI_e = np.zeros((24))
-    stat_batt_disch = np.zeros((24))
-    batt_SOC = np.zeros((24))
-    seq_chg_sort_index = np.zeros((24,11))
-    seq_disch_sort_index = np.zeros((24,11))
-    seq_chg_matrix = np.empty((24,14))
-    seq_disch_matrix = np.empty((24,11))
-    gap_POI_p_24 = np.zeros((24))
-    PV_only_POI_e = np.zeros((24))
-    deliverable_PV_e = np.zeros((24))
-    batt_recap_PV_e = np.zeros((24))
-    inv_out_e = np.zeros((24))
+    # populate containers for 24 hour period, reusing the workspace if given.
+    if workspace is None:
+        workspace = dispatch_workspace()
+    else:
+        reset_workspace(workspace)
+    if pvs_out is None:
+        pvs_out = np.empty([24,15])
+    seq_index_24 = workspace['seq_index_24']
+    seq_chg_24 = workspace['seq_chg_24']
+    seq_chg_sort_24 = workspace['seq_chg_sort_24']
+    seq_disch_24 = workspace['seq_disch_24']
+    seq_disch_sort_24 = workspace['seq_disch_sort_24']
+    seq_chg_sort_index = workspace['seq_chg_sort_index']
+    seq_chg_sort_new = workspace['seq_chg_sort_new']
+    seq_chg_matrix = workspace['seq_chg_matrix']
+    seq_disch_sort_index = workspace['seq_disch_sort_index']
+    seq_disch_matrix = workspace['seq_disch_matrix']
+    clip_chglim_batt_e = workspace['clip_chglim_batt_e']
+    clip_batt_e = workspace['clip_batt_e']
+    clip_stat_batt_chg = workspace['clip_stat_batt_chg']
+    clip_chg_PV_e = workspace['clip_chg_PV_e']
+    PV_chglim_batt_e = workspace['PV_chglim_batt_e']
+    PV_chg_batt_e = workspace['PV_chg_batt_e']
+    PV_chg_stat_batt_chg = workspace['PV_chg_stat_batt_chg']
+    PV_chg_PV_e = workspace['PV_chg_PV_e']
+    disch_lim_batt_e = workspace['disch_lim_batt_e']
+    disch_batt_e = workspace['disch_batt_e']
+    disch_POI_e = workspace['disch_POI_e']
+    stat_batt_disch = workspace['stat_batt_disch']
+    batt_SOC = workspace['batt_SOC']
+    gap_POI_p_24 = workspace['gap_POI_p_24']
+    PV_only_POI_e = workspace['PV_only_POI_e']
+    deliverable_PV_e = workspace['deliverable_PV_e']
+    batt_recap_PV_e = workspace['batt_recap_PV_e']
+    inv_out_e = workspace['inv_out_e']
     
     # make the non-PV hours rate high for sorting purposes.
-    PV_charge_enabled = np.where(daily_array[:,0]>PV_min_energy_chg,True,False)
-    PV_charge_enabled = PV_charge_enabled + np.where(PV_charge_enabled==0, 
-                                                     1000, 0)
-    PV_charge_cost = PV_charge_enabled * daily_array[:,2]
+    PV_charge_enabled = np.greater(daily_array[:,0], PV_min_energy_chg,
+                                   out=workspace['PV_charge_enabled'])
+    PV_charge_cost = np.multiply(daily_array[:,2], 1000,
+                                 out=workspace['PV_charge_cost'])
+    np.copyto(PV_charge_cost, daily_array[:,2], where=PV_charge_enabled)
+    # Running total of the energy held in the battery over the day, updated as 
+    # each hour is charged or discharged.
+    SOC_total = 0.0
     
     # Step 1: charge battery using clipped energy only.
     for hour in range(0,24):
@@ -155,17 +259,18 @@ def daily_arbitrage(arbitrage,
         # DOD nameplate - amount charged in the battery over previous hours.
         clip_chglim_batt_e[hour] = min(clip_chglim_batt_e[hour], 
                                        (daily_array[hour,21] -
-                                        batt_SOC.sum()),
-                                       batt_cap_limit/daily_array[hour,18]-batt_SOC.sum(),
+                                        SOC_total),
+                                       batt_cap_limit/daily_array[hour,18]-SOC_total,
                                        pcs_np/daily_array[hour,15])
         # Check to ensure non-negative values.
         clip_chglim_batt_e[hour] = max(0, clip_chglim_batt_e[hour])
         # Check for room to charge using the total state of charge (MW), vs 
         # DOD nameplate.
-        if batt_SOC.sum() < daily_array[hour,21]:
+        if SOC_total < daily_array[hour,21]:
             # Room exists for the day to charge battery.
             # Charge the clipped energy.
             batt_SOC[hour] = batt_SOC[hour] + clip_chglim_batt_e[hour]
+            SOC_total += clip_chglim_batt_e[hour]
             # Clip harvested energy = clipped energy in the battery / 
             # losses array to the battery.
             clip_chg_PV_e[hour] = clip_chglim_batt_e[hour] / daily_array[hour,15]
@@ -191,10 +296,14 @@ def daily_arbitrage(arbitrage,
     seq_chg_24[:,6] = clip_chg_PV_e         # PV energy pre losses charged to the battery.
     # Determine charge hours after the array rearrangement.
     # sort by cost to charge, then by hour, which should ensure that hours with more available PV energy are charged with priority
-    sort_indexing = np.lexsort((seq_chg_24[:,0], seq_chg_24[:,2]))  
+    # (a stable sort on cost keeps ties in hour order).
+    if chg_order is None:
+        sort_indexing = seq_chg_24[:,2].argsort(kind='stable')
+    else:
+        sort_indexing = chg_order
     # Sort the charge output by PV charge cost (ascending), and break ties
     # by 24 hour sequence (aschending).
-    seq_chg_sort_24 = seq_chg_24[sort_indexing,:]
+    np.take(seq_chg_24, sort_indexing, axis=0, out=seq_chg_sort_24)
     
     # Step 2: charge battery from remaining PV energy after the clip.
     for hour in range(0,24):
@@ -213,17 +322,18 @@ def daily_arbitrage(arbitrage,
         # previous charge limit and DOD nameplate - daily charge accrued. 
         PV_chglim_batt_e[hour] = min(PV_chglim_batt_e[hour],
                                      (daily_array[ref_hour,21] -
-                                      batt_SOC.sum()),
-                                     batt_cap_limit/daily_array[ref_hour,18]-batt_SOC.sum(),
+                                      SOC_total),
+                                     batt_cap_limit/daily_array[ref_hour,18]-SOC_total,
                                      pcs_np/daily_array[ref_hour,15])
         # Check to ensure non-negative values.
         PV_chglim_batt_e[hour] = max(0, PV_chglim_batt_e[hour])
         # Perform charge if in an arbitrage situation. 
-        if ((batt_SOC.sum() < daily_array[ref_hour,21]) and arbitrage):
+        if ((SOC_total < daily_array[ref_hour,21]) and arbitrage):
             # Room to charge battery.
             # Battery SOC for the hour is updated with the charge limit energy.
             batt_SOC[ref_hour] = (batt_SOC[ref_hour]+ 
                                   PV_chglim_batt_e[hour])
+            SOC_total += PV_chglim_batt_e[hour]
             # Array energy used to charge the battery =
             # energy charged in the battery / losses array to battery.
             PV_chg_PV_e[hour] = (PV_chglim_batt_e[hour]/
@@ -246,30 +356,33 @@ def daily_arbitrage(arbitrage,
     seq_chg_sort_index[:,10] = PV_chg_PV_e          # Array energy used to charge the battery.
     
     # Rearrange back to original 24 hour order. 
-    # Sort by original 24 hour sequence (ascending).
-    seq_chg_sort_new = seq_chg_sort_index[seq_chg_sort_index[:,0].argsort()]
+    # Invert the charge order to address each hour's row in the sorted array.
+    chg_restore = workspace['chg_restore']
+    chg_restore[sort_indexing] = seq_index_24
+    np.take(seq_chg_sort_index, chg_restore, axis=0, out=seq_chg_sort_new)
+    # Populate the new charge array.
+    seq_chg_matrix[:,0:11] = seq_chg_sort_new       # Values from original charge sequence array.
     # Charge in the battery = charge from clipping + charge from PV.
-    chg_batt_e_24 = seq_chg_sort_new[:,4] + seq_chg_sort_new[:,9]
+    chg_batt_e_24 = np.add(seq_chg_sort_new[:,4], seq_chg_sort_new[:,9],
+                           out=seq_chg_matrix[:,11])
     # Array energy used to charge the battery = array energy clipped and harvested 
     # + array energy used to charge. 
-    chg_PV_e_24 = seq_chg_sort_new[:,6] + seq_chg_sort_new[:,10]
+    chg_PV_e_24 = np.add(seq_chg_sort_new[:,6], seq_chg_sort_new[:,10],
+                         out=seq_chg_matrix[:,12])
     # Array energy allowed to pass through to the POI / not used for charging =
     # the minimum between deliverable array energy - array energy charged to the battery *
     # losses array to POI.
-    PV_less_chg_POI_e_24 = (np.minimum((deliverable_PV_e - chg_PV_e_24),daily_array[:,7])
-                            *daily_array[:,17])
-    # Populate the new charge array.
-    seq_chg_matrix[:,0:11] = seq_chg_sort_new       # Values from original charge sequence array.
-    seq_chg_matrix[:,11] = chg_batt_e_24            # Charge in the battery.
-    seq_chg_matrix[:,12] = chg_PV_e_24              # Array energy used to charge the battery.
-    seq_chg_matrix[:,13] = PV_less_chg_POI_e_24     # Array energy passed to POI.
+    PV_less_chg_POI_e_24 = np.subtract(deliverable_PV_e, chg_PV_e_24,
+                                       out=seq_chg_matrix[:,13])
+    np.minimum(PV_less_chg_POI_e_24, daily_array[:,7], out=PV_less_chg_POI_e_24)
+    np.multiply(PV_less_chg_POI_e_24, daily_array[:,17], out=PV_less_chg_POI_e_24)
     
     # Determine daily hours for discharge based on energy rate and battery size.
     # Build daily discharge array for sorting later.
     seq_disch_24[:,0] = seq_index_24                # 24 hour sequence (0-23).
     seq_disch_24[:,1] = daily_array[:,0]            # Array energy.
     seq_disch_24[:,2] = daily_array[:,2]            # Combined rate.
-    seq_disch_24[:,3] = np.zeros([24])              # Unused variable, in matlab is inverter limited PV_energy.
+    seq_disch_24[:,3] = 0                           # Unused variable, in matlab is inverter limited PV_energy.
     seq_disch_24[:,4] = seq_chg_sort_new[:,5]       # Deliverable PV energy.
     seq_disch_24[:,5] = chg_PV_e_24                 # Array energy used to charge the battery.
     seq_disch_24[:,6] = PV_less_chg_POI_e_24        # Array energy allowed to pass to the POI.
@@ -278,11 +391,15 @@ def daily_arbitrage(arbitrage,
     if arbitrage:
     # If in an arbitrage day due to rate delta.
         # Sort discharge array by combined rate (ascending), tie-break using 24 hour sequence.
-        sort_indexing = np.lexsort((seq_disch_24[:,0], seq_disch_24[:,2]))
-        seq_disch_sort_24 = seq_disch_24[sort_indexing]
+        if disch_order is None:
+            sort_indexing = seq_disch_24[:,2].argsort(kind='stable')
+        else:
+            sort_indexing = disch_order
+        np.take(seq_disch_24, sort_indexing, axis=0, out=seq_disch_sort_24)
     else:
     # If not in an arbitrage day due to rate delta.
-        seq_disch_sort_24 = seq_disch_24
+        sort_indexing = seq_index_24
+        seq_disch_sort_24[:,:] = seq_disch_24
     
     # Step 3: Battery discharge
     for hour in range(23,-1,-1):
@@ -292,7 +409,7 @@ def daily_arbitrage(arbitrage,
         # Battery discharge power limit and 
         # remaining SOC (MWh) * battery discharge efficiency.
         disch_lim_batt_e[hour] = min(daily_array[ref_hour,9],
-                                    (batt_SOC.sum()),
+                                    SOC_total,
                                     batt_cap_limit*daily_array[ref_hour,20],
                                     pcs_np/daily_array[ref_hour,18]) 
         # Gap to POI = POI - array energy allowed to pass to the POI
@@ -316,37 +433,20 @@ def daily_arbitrage(arbitrage,
         # ensure non negative values
         disch_lim_batt_e[hour] = max(0, disch_lim_batt_e[hour])
         
-        if (batt_SOC.sum() > 0):
+        if (SOC_total > 0):
         # If there is charge left in the battery 
-            # Set a temporary SOC for the desired discharge hour
-            temp_soc = 0.0
-            temp_hour = ref_hour
-            current_discharge_limit = disch_lim_batt_e[hour]
-            # While there is time between the start of the day and the hour 
-            # discharging is desired, continue to add to available capacity.
-            while temp_hour >=0 and temp_soc < current_discharge_limit:
-                # If taking all of the available capacity in the battery at that hour
-                # will be less than the discharge limit, take all of it.
-                if ((temp_soc + batt_SOC[temp_hour]) < current_discharge_limit):
-                    temp_soc += batt_SOC[temp_hour]
-                    batt_SOC[temp_hour] = 0
-                # If there is still room to meet the desired discharge for 
-                # the hour but not all that's available then:
-                elif (temp_soc < current_discharge_limit):
-                    # establish the difference, and how much is available
-                    diff_remain = disch_lim_batt_e[hour] - temp_soc
-                    avail_charge = batt_SOC[temp_hour]
-                    # If there is anything to count towards the dicharging hour:
-                    if ((avail_charge > 0) and ((avail_charge - diff_remain) > 0)):
-                        # Add the difference to the discharge hour.
-                        temp_soc += diff_remain
-                        # Update the battery SOC by the amount scheduled for discharge
-                        batt_SOC[temp_hour] = avail_charge - diff_remain
-                    # TODO: Archaic logic, might not be necessary
-                    else:
-                        temp_soc += batt_SOC[temp_hour]
-                        batt_SOC[temp_hour] = 0
-                temp_hour -=1
+            # Running total of the charge held from the discharge hour back to 
+            # each earlier hour of the day, the battery is drawn latest hour first.
+            SOC_run = np.cumsum(batt_SOC[ref_hour::-1], 
+                                out=workspace['SOC_run'][:ref_hour+1])
+            # Energy drawn = discharge limit, or everything charged up to the hour.
+            temp_soc = min(disch_lim_batt_e[hour], SOC_run[-1])
+            # Charge left in each hour after drawing: hours whose running total 
+            # is covered are emptied, the hour where the draw stops keeps the 
+            # remainder and earlier hours are untouched.
+            SOC_run = np.subtract(SOC_run[::-1], temp_soc, out=SOC_run[::-1])
+            np.clip(SOC_run, 0, batt_SOC[:ref_hour+1], out=batt_SOC[:ref_hour+1])
+            SOC_total = max(0.0, SOC_total - temp_soc)
                 
             # Update the battery discharge for the hour by the available SOC from 
             # predceeding hours
@@ -370,14 +470,13 @@ def daily_arbitrage(arbitrage,
     seq_disch_sort_index[:,8] = stat_batt_disch         # Boolean flag for discharging
     seq_disch_sort_index[:,9] = disch_batt_e            # Energy discharged from the battery.
     seq_disch_sort_index[:,10] = disch_POI_e            # Energy discharged from the battery as seen at POI.
-    # Sort the discharge array by the original 24 hour index.
-    seq_disch_sort_new = seq_disch_sort_index[seq_disch_sort_index[:,0].argsort()]
-    seq_disch_matrix = seq_disch_sort_new
+    # Sort the discharge array by the original 24 hour index, inverting the 
+    # discharge order.
+    disch_restore = workspace['disch_restore']
+    disch_restore[sort_indexing] = seq_index_24
+    np.take(seq_disch_sort_index, disch_restore, axis=0, out=seq_disch_matrix)
     
     # Determine the charge and discharge schedule
-    clip_stat_batt_chg = seq_chg_matrix[:,3]            # Boolean state for charging the battery using clip harvesting.
-    PV_chg_stat_batt_chg = seq_chg_matrix[:,8]          # Boolean state for charging the battery outside clip harvesting.
-    stat_batt_disch = seq_disch_matrix[:,8]             # Boolean state for discharging the battery.
     chg_seq = seq_chg_matrix[:,7]                       # 24 hour index sorted for charging.
     disch_seq = seq_disch_matrix[:,7]                   # 24 hour index sorted for discharging.
     chg_batt_e = seq_chg_matrix[:,11]                   # Battery charge.
@@ -385,18 +484,18 @@ def daily_arbitrage(arbitrage,
     # is past life, avoids division by zero errors. Not necessary with augmentation. 
     chg_PV_e = np.divide(chg_batt_e,                    # array energy used to charge the battery = energy charged in the battery by PV / 
                          daily_array[:,15],             # losses array to battery.
-                         out=np.zeros_like(chg_batt_e), 
+                         out=workspace['chg_PV_e'], 
                          where=daily_array[:,15]!=0)
     disch_batt_e = seq_disch_matrix[:,9]                # Energy discharged from the battery.
-    batt_e = -chg_batt_e + disch_batt_e                 # Battery energy = - charged energy and + discharged energy by hour.
+    # Battery energy = - charged energy and + discharged energy by hour.
+    batt_e = np.subtract(disch_batt_e, chg_batt_e, out=pvs_out[:,9])
     PV_less_chg_POI_e = seq_chg_matrix[:,13]            # Array energy passed to the POI.
     disch_POI_e = seq_disch_matrix[:,10]                # Battery discharge at POI.
-    POI_e = PV_less_chg_POI_e + disch_POI_e             # POI output 
     
     # Find the state of charge for the battery 
     batt_SOC_tmp = 0
-    batt_SOC_pct = np.zeros([24])
-    batt_SOC_MWh = np.zeros([24])
+    batt_SOC_pct = workspace['batt_SOC_pct']
+    batt_SOC_MWh = workspace['batt_SOC_MWh']
     for i in range(0,24,1):
         # Temporary state of charge equals existing SOC - battery charge / discharge for the given hour.
         batt_SOC_tmp = batt_SOC_tmp - batt_e[i]
@@ -409,48 +508,497 @@ def daily_arbitrage(arbitrage,
         else:
             batt_SOC_pct[i] = 0
         
-    # Remove rounding errors from battery SOC
-    batt_SOC_pct = np.round(batt_SOC_pct,8)
-    batt_SOC_MWh = np.round(batt_SOC_MWh,8)
-    batt_SOC_pct[np.where(batt_SOC_pct == -0)] = 0
-    batt_SOC_MWh[np.where(batt_SOC_MWh == -0)] = 0
+    # Remove rounding errors from battery SOC, adding zero clears negative zeros.
+    np.round(batt_SOC_pct, 8, out=pvs_out[:,3])
+    np.round(batt_SOC_MWh, 8, out=pvs_out[:,4])
+    np.add(pvs_out[:,3], 0.0, out=pvs_out[:,3])
+    np.add(pvs_out[:,4], 0.0, out=pvs_out[:,4])
     # Array energy delivered = PV not used to charge the battery / losses array to POI
     # plus the array energy used to charge the battery (pre-losses).
-    delivered_PV_e = (PV_less_chg_POI_e / daily_array[:,17]) + chg_PV_e
-    # Array energy exceeding POI and charge ability = array energy - delivered array energy.
-    waste_PV_e = daily_array[:,0] - delivered_PV_e
-    node_meter_PVS_e = delivered_PV_e * daily_array[:,16]
-    node_meter_PV_e = (PV_only_POI_e/
-                       daily_array[:,17]*
-                       daily_array[:,16])
-    POI_meter_PVS_e = delivered_PV_e * daily_array[:,17]
-    POI_meter_PV_e = PV_only_POI_e
-    PV_only_wasted_energy = daily_array[:,0] - PV_only_POI_e / daily_array[:,17]
-    
-    # pv_only_inv_out = PV_only_POI_e / daily_array[:,17]
-    # pv_only_inv_out = daily_array[:,6]
-    # pv_only_inv_out = PV_only_POI_e + batt_recap_PV_e
-    pv_only_inv_out = inv_out_e
-    clip_harvesting = clip_chglim_batt_e
+    delivered_PV_e = np.divide(PV_less_chg_POI_e, daily_array[:,17],
+                               out=workspace['delivered_PV_e'])
+    np.add(delivered_PV_e, chg_PV_e, out=delivered_PV_e)
     
     """ The current matlab code only makes use of several of these calculated outputs.
         For revision 1, those are the ones returned from the dispatch function """
     # Format output into 24 hour array for storage.
-    pvs_out = np.empty([24,15])
-    pvs_out[:,0] = PV_only_POI_e
-    pvs_out[:,1] = PV_less_chg_POI_e
-    pvs_out[:,2] = disch_POI_e
-    pvs_out[:,3] = batt_SOC_pct
-    pvs_out[:,4] = batt_SOC_MWh
-    pvs_out[:,5] = node_meter_PVS_e
-    pvs_out[:,6] = node_meter_PV_e
-    pvs_out[:,7] = POI_meter_PVS_e
-    pvs_out[:,8] = POI_meter_PV_e
-    pvs_out[:,9] = batt_e
-    pvs_out[:,10] = chg_seq
-    pvs_out[:,11] = disch_seq
-    pvs_out[:,12] = seq_index_24
-    pvs_out[:,13] = pv_only_inv_out
-    pvs_out[:,14] = clip_harvesting
+    pvs_out[:,0] = PV_only_POI_e                                        # PV only plant energy
+    pvs_out[:,1] = PV_less_chg_POI_e                                    # PVS POI output - PV
+    pvs_out[:,2] = disch_POI_e                                          # PVS POI output - battery
+    np.multiply(delivered_PV_e, daily_array[:,16], out=pvs_out[:,5])    # node meter PVS
+    np.divide(PV_only_POI_e, daily_array[:,17], out=pvs_out[:,6])       # node meter PV
+    np.multiply(pvs_out[:,6], daily_array[:,16], out=pvs_out[:,6])
+    np.multiply(delivered_PV_e, daily_array[:,17], out=pvs_out[:,7])    # POI meter PVS
+    pvs_out[:,8] = PV_only_POI_e                                        # POI meter PV
+    pvs_out[:,10] = chg_seq                                             # charge sequence
+    pvs_out[:,11] = disch_seq                                           # discharge sequence
+    pvs_out[:,12] = seq_index_24                                        # hour sequence
+    pvs_out[:,13] = inv_out_e                                           # inverter output
+    pvs_out[:,14] = clip_chglim_batt_e                                  # clip harvesting
             
     return pvs_out
+
+
+def pv_limits(dispatch_block):
+    """
+    Function to find the PV energy that can be delivered each hour with the 
+    inverter and POI limits in place, shared by the batched dispatch functions
+    and the screening mode in pvs.pvs_ac_mv.
+
+    Parameters
+    ----------
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+
+    Returns
+    -------
+    deliverable_PV_e : array
+        PV energy deliverable with limits in place.
+    inv_out_e : array
+        inverter output.
+    PV_only_POI_e : array
+        PV only plant energy at the POI.
+    batt_recap_PV_e : array
+        clipped PV energy available for clip harvesting.
+
+    """
+    import numpy as np
+
+    array_e = dispatch_block[:,:,0]
+    inv_lim_e = dispatch_block[:,:,6]
+    POI_lim_e = dispatch_block[:,:,7]
+    inv_lim_p = dispatch_block[:,:,10]
+    POI_lim_p = dispatch_block[:,:,13]
+    batt_lim_p = dispatch_block[:,:,14]
+    arr_to_POI = dispatch_block[:,:,17]
+    # case 1: POI is limiting, case 2: inverter is limiting.
+    POI_limiting = inv_lim_p > POI_lim_p
+    deliverable_PV_e = np.where(POI_limiting,
+                                np.minimum(batt_lim_p + POI_lim_e, inv_lim_e),
+                                np.minimum(inv_lim_p, array_e))
+    inv_out_e = np.where(POI_limiting,
+                         inv_lim_e,
+                         np.minimum(deliverable_PV_e, inv_lim_e))
+    PV_only_POI_e = np.where(POI_limiting, 
+                             POI_lim_e, 
+                             deliverable_PV_e) * arr_to_POI
+    batt_recap_PV_e = np.where(POI_limiting, 
+                               deliverable_PV_e - POI_lim_e, 
+                               0)
+    
+    return deliverable_PV_e, inv_out_e, PV_only_POI_e, batt_recap_PV_e
+
+
+def charge_order(rate_order, PV_min_energy_chg, dispatch_block):
+    """
+    Function to build the PV charge order for each day from the rate index 
+    order, without sorting. Hours with enough array energy to charge keep their
+    combined rate order and go first, the remaining hours follow in rate order,
+    matching a stable sort on the charge cost (non-PV hours at 1000 x rate). 
+    Days where that does not hold (a non-PV hour cheaper than a PV hour, e.g. 
+    negative rates) are sorted on the charge cost directly.
+
+    Parameters
+    ----------
+    rate_order : array
+        (days, 24) hours sorted by combined rate from the rate index.
+    PV_min_energy_chg : float
+        Minimum array energy required to start charging the battery.
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+
+    Returns
+    -------
+    chg_order : array
+        (days, 24) hours of each day sorted by PV charge cost.
+
+    """
+    import numpy as np
+
+    rate_comb = dispatch_block[:,:,2]
+    PV_charge_enabled = dispatch_block[:,:,0] > PV_min_energy_chg
+    PV_charge_cost = np.where(PV_charge_enabled, 1, 1000) * rate_comb
+    # Position of each hour once the PV hours are moved ahead of the non-PV 
+    # hours, keeping the rate order within each group.
+    enabled = np.take_along_axis(PV_charge_enabled, rate_order, axis=1)
+    position = np.where(enabled,
+                        np.cumsum(enabled, axis=1) - 1,
+                        enabled.sum(axis=1, keepdims=True) + np.cumsum(~enabled, axis=1) - 1)
+    chg_order = np.empty_like(rate_order)
+    np.put_along_axis(chg_order, position, rate_order, axis=1)
+    # Re-sort the days where a non-PV hour is not dearer than every PV hour.
+    PV_cost_max = np.where(PV_charge_enabled, PV_charge_cost, -np.inf).max(axis=1)
+    non_PV_cost_min = np.where(PV_charge_enabled, np.inf, PV_charge_cost).min(axis=1)
+    resort = ~(PV_cost_max < non_PV_cost_min)
+    if resort.any():
+        chg_order[resort] = np.argsort(PV_charge_cost[resort], axis=1, kind='stable')
+    
+    return chg_order
+
+
+def batch_arbitrage(arbitrage,
+                    POI,
+                    PV_min_energy_chg,
+                    ppa_min_delta,
+                    batt_limit_POI,
+                    batt_hours_POI,
+                    dispatch_block,
+                    chg_order=None,
+                    disch_order=None):
+    """
+    Batched version of daily_arbitrage, running the clip harvest, PV charge and
+    discharge steps for every day of the simulation at once. Each day starts 
+    with an empty battery, so days are independent and the hourly loops only 
+    step through the 24 hours of the day, operating on all days together.
+
+    Parameters
+    ----------
+    arbitrage : array
+        boolean array (days), True if the rate delta for the day is large 
+        enough to prompt battery charge / discharge.
+    POI : int
+        Point of interconnect rating (MW).
+    PV_min_energy_chg : float
+        Minimum array energy required to start charging the battery.
+    ppa_min_delta : float
+        Minimum delta between high and low rate pricing to perform arbitrage.
+    batt_limit_POI: int
+        PCS limit at the POI.
+    batt_hours_POI: int
+        hours to dispatch at the POI limit.
+    dispatch_block : array
+        (days, 24, 25) array, the dispatch array from pvs.dispatch_prep 
+        reshaped into days, same column format as daily_array.
+    chg_order : array, optional
+        (days, 24) hours sorted by PV charge cost, from charge_order. The 
+        default is None, which sorts the days here.
+    disch_order : array, optional
+        (days, 24) hours sorted by combined rate, from the rate index. The 
+        default is None, which sorts the days here.
+
+    Returns
+    -------
+    pvs_out : array
+        (days, 24, 15) array, same column format as daily_arbitrage.
+
+    """
+    import numpy as np
+
+    pcs_np = batt_limit_POI
+    batt_cap_limit = pcs_np*batt_hours_POI
+    days = dispatch_block.shape[0]
+    arbitrage = np.asarray(arbitrage, dtype=bool)
+    # Index used to address one hour per day with a per day hour reference.
+    day_index = np.arange(days)
+    seq_index_24 = np.arange(0,24,1)
+    # Column views of the dispatch block, (days, 24) each.
+    array_e = dispatch_block[:,:,0]
+    rate_comb = dispatch_block[:,:,2]
+    POI_lim_e = dispatch_block[:,:,7]
+    batt_chg_p = dispatch_block[:,:,8]
+    batt_disch_p = dispatch_block[:,:,9]
+    arr_to_batt = dispatch_block[:,:,15]
+    arr_to_meter = dispatch_block[:,:,16]
+    arr_to_POI = dispatch_block[:,:,17]
+    batt_to_POI = dispatch_block[:,:,18]
+    chg_eta = dispatch_block[:,:,19]
+    disch_eta = dispatch_block[:,:,20]
+    dod_np = dispatch_block[:,:,21]
+    
+    batt_SOC = np.zeros((days,24))
+    clip_chglim_batt_e = np.zeros((days,24))
+    clip_batt_e = np.zeros((days,24))
+    clip_chg_PV_e = np.zeros((days,24))
+    PV_chg_batt_e = np.zeros((days,24))
+    PV_chg_PV_e = np.zeros((days,24))
+    disch_batt_e = np.zeros((days,24))
+    disch_POI_e = np.zeros((days,24))
+    chg_seq = np.zeros((days,24))
+    disch_seq = np.zeros((days,24))
+    
+    # Division by zero is expected past the battery end of life, the resulting 
+    # inf values drop out of the min comparisons as in daily_arbitrage.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # make the non-PV hours rate high for sorting purposes.
+        PV_charge_enabled = array_e > PV_min_energy_chg
+        PV_charge_cost = np.where(PV_charge_enabled, 1, 1000) * rate_comb
+        
+        # Step 1: charge battery using clipped energy only.
+        (deliverable_PV_e, 
+         inv_out_e, 
+         PV_only_POI_e, 
+         batt_recap_PV_e) = pv_limits(dispatch_block)
+        # Clip harvesting charge limit before the battery capacity limits.
+        clip_lim_e = np.minimum(batt_chg_p*chg_eta, batt_recap_PV_e*arr_to_batt)
+        cap_lim_chg = batt_cap_limit/batt_to_POI
+        pcs_lim_chg = pcs_np/arr_to_batt
+        # Running total of the energy held in the battery for each day.
+        SOC_total = np.zeros(days)
+        for hour in range(0,24):
+            # Battery capacity limit against the energy charged over previous hours.
+            clip_chglim_batt_e[:,hour] = np.maximum(0, 
+                np.minimum(np.minimum(np.minimum(clip_lim_e[:,hour],
+                                                 dod_np[:,hour] - SOC_total),
+                                      cap_lim_chg[:,hour] - SOC_total),
+                           pcs_lim_chg[:,hour]))
+            # Charge the clipped energy on days with room left in the battery.
+            room = SOC_total < dod_np[:,hour]
+            batt_SOC[:,hour] = np.where(room, 
+                                        batt_SOC[:,hour] + clip_chglim_batt_e[:,hour],
+                                        batt_SOC[:,hour])
+            clip_chg_PV_e[:,hour] = np.where(room, 
+                                             clip_chglim_batt_e[:,hour] / arr_to_batt[:,hour],
+                                             0)
+            clip_batt_e[:,hour] = np.where(room, clip_chglim_batt_e[:,hour], 0)
+            SOC_total += clip_batt_e[:,hour]
+        
+        # Sort by cost to charge, then by hour (stable sort keeps hour order on ties).
+        if chg_order is None:
+            chg_order = np.argsort(PV_charge_cost, axis=1, kind='stable')
+        
+        # Step 2: charge battery from remaining PV energy after the clip.
+        for seq in range(0,24):
+            ref_hour = chg_order[:,seq]
+            ref = (day_index, ref_hour)
+            PV_chglim_batt_e = (np.minimum(batt_chg_p[ref]*chg_eta[ref],
+                                           deliverable_PV_e[ref]*arr_to_batt[ref]) -
+                                clip_batt_e[ref])
+            PV_chglim_batt_e = np.maximum(0, 
+                np.minimum(np.minimum(np.minimum(PV_chglim_batt_e,
+                                                 dod_np[ref] - SOC_total),
+                                      cap_lim_chg[ref] - SOC_total),
+                           pcs_lim_chg[ref]))
+            # Perform charge on arbitrage days with room in the battery.
+            charge = (SOC_total < dod_np[ref]) & arbitrage
+            batt_SOC[ref] = np.where(charge, batt_SOC[ref] + PV_chglim_batt_e, batt_SOC[ref])
+            PV_chg_PV_e[ref] = np.where(charge, PV_chglim_batt_e/arr_to_batt[ref], 0)
+            PV_chg_batt_e[ref] = np.where(charge, PV_chglim_batt_e, 0)
+            SOC_total += PV_chg_batt_e[ref]
+            chg_seq[ref] = seq
+        
+        # Charge in the battery = charge from clipping + charge from PV.
+        chg_batt_e_24 = clip_batt_e + PV_chg_batt_e
+        # Array energy used to charge the battery.
+        chg_PV_e_24 = clip_chg_PV_e + PV_chg_PV_e
+        # Array energy passed to the POI.
+        PV_less_chg_POI_e = (np.minimum((deliverable_PV_e - chg_PV_e_24), POI_lim_e)
+                             *arr_to_POI)
+        
+        # Sort discharge by combined rate on arbitrage days, otherwise keep hour order.
+        if disch_order is None:
+            disch_order = np.argsort(rate_comb, axis=1, kind='stable')
+        disch_order = np.where(arbitrage[:,None], disch_order, seq_index_24)
+        
+        # Step 3: Battery discharge
+        for seq in range(23,-1,-1):
+            ref_hour = disch_order[:,seq]
+            ref = (day_index, ref_hour)
+            disch_lim_batt_e = np.minimum(np.minimum(np.minimum(batt_disch_p[ref],
+                                                                SOC_total),
+                                                     batt_cap_limit*disch_eta[ref]),
+                                          pcs_np/batt_to_POI[ref])
+            gap_POI_p = POI - PV_less_chg_POI_e[ref]
+            # Battery past end of life does not discharge.
+            disch_lim_batt_e = np.where(dod_np[ref] > 0,
+                                        np.minimum(disch_lim_batt_e, 
+                                                   gap_POI_p/batt_to_POI[ref]),
+                                        0)
+            disch_lim_batt_e = np.maximum(0, disch_lim_batt_e)
+            discharge = SOC_total > 0
+            # Running total of the charge held from each hour up to the discharge 
+            # hour, the battery is drawn latest hour first.
+            SOC_avail = np.where(seq_index_24 <= ref_hour[:,None], batt_SOC, 0)
+            SOC_run = np.cumsum(SOC_avail[:,::-1], axis=1)[:,::-1]
+            # Energy drawn = discharge limit, or everything charged up to the hour.
+            temp_soc = np.where(discharge, 
+                                np.minimum(disch_lim_batt_e, SOC_run[:,0]), 
+                                0)
+            # Charge left in each hour up to the discharge hour after drawing, 
+            # hours whose running total is covered are emptied, the hour where 
+            # the draw stops keeps the remainder and earlier hours are untouched.
+            batt_SOC = np.where(seq_index_24 <= ref_hour[:,None],
+                                np.clip(SOC_run - temp_soc[:,None], 0, SOC_avail),
+                                batt_SOC)
+            SOC_total = np.maximum(0, SOC_total - temp_soc)
+            disch_batt_e[ref] = np.where(discharge, temp_soc, 0)
+            disch_POI_e[ref] = np.where(discharge, temp_soc*batt_to_POI[ref], 0)
+            disch_seq[ref] = seq
+        
+        # array energy used to charge the battery, zero past battery end of life.
+        chg_PV_e = np.divide(chg_batt_e_24,
+                             arr_to_batt,
+                             out=np.zeros_like(chg_batt_e_24), 
+                             where=arr_to_batt!=0)
+        # Battery energy = - charged energy and + discharged energy by hour.
+        batt_e = -chg_batt_e_24 + disch_batt_e
+        
+        # State of charge accumulated over the day.
+        batt_SOC_MWh = np.cumsum(-batt_e, axis=1)
+        batt_SOC_pct = np.divide(batt_SOC_MWh,
+                                 dod_np,
+                                 out=np.zeros_like(batt_SOC_MWh),
+                                 where=dod_np!=0)
+        # Remove rounding errors from battery SOC
+        batt_SOC_pct = np.round(batt_SOC_pct,8)
+        batt_SOC_MWh = np.round(batt_SOC_MWh,8)
+        batt_SOC_pct[batt_SOC_pct == 0] = 0
+        batt_SOC_MWh[batt_SOC_MWh == 0] = 0
+        delivered_PV_e = (PV_less_chg_POI_e / arr_to_POI) + chg_PV_e
+        
+        # Format output into (days, 24, 15) array.
+        pvs_out = np.empty([days,24,15])
+        pvs_out[:,:,0] = PV_only_POI_e
+        pvs_out[:,:,1] = PV_less_chg_POI_e
+        pvs_out[:,:,2] = disch_POI_e
+        pvs_out[:,:,3] = batt_SOC_pct
+        pvs_out[:,:,4] = batt_SOC_MWh
+        pvs_out[:,:,5] = delivered_PV_e * arr_to_meter
+        pvs_out[:,:,6] = PV_only_POI_e / arr_to_POI * arr_to_meter
+        pvs_out[:,:,7] = delivered_PV_e * arr_to_POI
+        pvs_out[:,:,8] = PV_only_POI_e
+        pvs_out[:,:,9] = batt_e
+        pvs_out[:,:,10] = chg_seq
+        pvs_out[:,:,11] = disch_seq
+        pvs_out[:,:,12] = seq_index_24
+        pvs_out[:,:,13] = inv_out_e
+        pvs_out[:,:,14] = clip_chglim_batt_e
+    
+    return pvs_out
+
+
+def idle_days(arbitrage,
+              batt_limit_POI,
+              batt_hours_POI,
+              dispatch_block):
+    """
+    Function to find the days where the battery stays empty, either because 
+    there is no clipped energy to harvest and the day is not an arbitrage day, 
+    or because the battery is past end of life (DOD np of zero). The dispatch 
+    for these days reduces to the PV only calculation in pv_only_dispatch.
+    
+    Each day starts with an empty battery, so the charge limits of 
+    daily_arbitrage are checked with no charge accrued, a day is idle if no 
+    hour can take charge from the clip harvest, or from PV on arbitrage days.
+
+    Parameters
+    ----------
+    arbitrage : array
+        boolean array (days), True if the rate delta for the day is large 
+        enough to prompt battery charge / discharge.
+    batt_limit_POI: int
+        PCS limit at the POI.
+    batt_hours_POI: int
+        hours to dispatch at the POI limit.
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+
+    Returns
+    -------
+    idle : array
+        boolean array (days), True for days where the battery does not charge.
+
+    """
+    import numpy as np
+
+    pcs_np = batt_limit_POI
+    batt_cap_limit = pcs_np*batt_hours_POI
+    arbitrage = np.asarray(arbitrage, dtype=bool)
+    batt_chg_p = dispatch_block[:,:,8]
+    arr_to_batt = dispatch_block[:,:,15]
+    batt_to_POI = dispatch_block[:,:,18]
+    chg_eta = dispatch_block[:,:,19]
+    dod_np = dispatch_block[:,:,21]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deliverable_PV_e, _, _, batt_recap_PV_e = pv_limits(dispatch_block)
+        # Charge limits shared by the clip harvest and PV charge with an empty battery.
+        batt_lim_e = np.minimum(np.minimum(dod_np, 
+                                           batt_cap_limit/batt_to_POI), 
+                                pcs_np/arr_to_batt)
+        clip_lim_e = np.maximum(0, np.minimum(np.minimum(batt_chg_p*chg_eta, 
+                                                         batt_recap_PV_e*arr_to_batt),
+                                              batt_lim_e))
+        PV_lim_e = np.maximum(0, np.minimum(np.minimum(batt_chg_p*chg_eta, 
+                                                       deliverable_PV_e*arr_to_batt),
+                                            batt_lim_e))
+        # Room to charge with an empty battery, a NaN limit is not treated as idle.
+        room = dod_np > 0
+        clip_chg = (room & ~(clip_lim_e <= 0)).any(axis=1)
+        PV_chg = (room & ~(PV_lim_e <= 0)).any(axis=1)
+    
+    return ~clip_chg & ~(arbitrage & PV_chg)
+
+
+def pv_only_dispatch(arbitrage,
+                     PV_min_energy_chg,
+                     dispatch_block,
+                     chg_order=None,
+                     disch_order=None):
+    """
+    Function to fill the dispatch output for days where the battery stays empty
+    (see idle_days) with a single PV only calculation, matching the output of 
+    daily_arbitrage for those days.
+
+    Parameters
+    ----------
+    arbitrage : array
+        boolean array (days), True if the rate delta for the day is large 
+        enough to prompt battery charge / discharge.
+    PV_min_energy_chg : float
+        Minimum array energy required to start charging the battery.
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+    chg_order : array, optional
+        (days, 24) hours sorted by PV charge cost, from charge_order. The 
+        default is None, which sorts the days here.
+    disch_order : array, optional
+        (days, 24) hours sorted by combined rate, from the rate index. The 
+        default is None, which sorts the days here.
+
+    Returns
+    -------
+    pvs_out : array
+        (days, 24, 15) array, same column format as daily_arbitrage.
+
+    """
+    import numpy as np
+
+    days = dispatch_block.shape[0]
+    arbitrage = np.asarray(arbitrage, dtype=bool)
+    seq_index_24 = np.arange(0,24,1)
+    array_e = dispatch_block[:,:,0]
+    rate_comb = dispatch_block[:,:,2]
+    POI_lim_e = dispatch_block[:,:,7]
+    arr_to_meter = dispatch_block[:,:,16]
+    arr_to_POI = dispatch_block[:,:,17]
+    deliverable_PV_e, inv_out_e, PV_only_POI_e, _ = pv_limits(dispatch_block)
+    # No charge, all deliverable PV passes to the POI.
+    PV_less_chg_POI_e = np.minimum(deliverable_PV_e, POI_lim_e) * arr_to_POI
+    delivered_PV_e = PV_less_chg_POI_e / arr_to_POI
+    # Charge and discharge sequences are still reported, rank of each hour in 
+    # the charge cost and (on arbitrage days) combined rate orders.
+    if chg_order is None:
+        PV_charge_cost = np.where(array_e > PV_min_energy_chg, 1, 1000) * rate_comb
+        chg_order = np.argsort(PV_charge_cost, axis=1, kind='stable')
+    if disch_order is None:
+        disch_order = np.argsort(rate_comb, axis=1, kind='stable')
+    # Invert the orders to give the rank of each hour.
+    sequence = np.broadcast_to(seq_index_24, (days,24))
+    chg_seq = np.empty((days,24), dtype=int)
+    np.put_along_axis(chg_seq, chg_order, sequence, axis=1)
+    disch_seq = np.empty((days,24), dtype=int)
+    np.put_along_axis(disch_seq, disch_order, sequence, axis=1)
+    disch_seq = np.where(arbitrage[:,None], disch_seq, seq_index_24)
+    
+    pvs_out = np.zeros([days,24,15])
+    pvs_out[:,:,0] = PV_only_POI_e
+    pvs_out[:,:,1] = PV_less_chg_POI_e
+    pvs_out[:,:,5] = delivered_PV_e * arr_to_meter
+    pvs_out[:,:,6] = PV_only_POI_e / arr_to_POI * arr_to_meter
+    pvs_out[:,:,7] = delivered_PV_e * arr_to_POI
+    pvs_out[:,:,8] = PV_only_POI_e
+    pvs_out[:,:,10] = chg_seq
+    pvs_out[:,:,11] = disch_seq
+    pvs_out[:,:,12] = seq_index_24
+    pvs_out[:,:,13] = inv_out_e
+    
+    return pvs_out
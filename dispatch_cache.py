@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory cache for the daily dispatch. Days in a multi-year run repeat the same
+rate shape and, after the monthly array and battery degradation, close to the
+same array energy and battery, so the 24 x 15 output of a day can be reused
+when a day's inputs match one that was already dispatched.
+
+By default the key is exact, the columns the dispatch reads, the hour orders
+and the scalar arguments of the day, so a hit returns the output the dispatch
+would calculate. Monthly degradation changes the inputs every month, so exact
+hits are limited to days repeating within a month (and cases sharing inputs).
+
+Approximate matching is an explicit opt-in, rtol > 0 quantizes the key
+relative to the scale of each column: each column the dispatch reads is split
+into its daily scale (largest absolute value), held in logarithmic bins rtol
+wide, and its shape over the day relative to that scale, rounded to decimals.
+The same calendar day of two years of the run has the same array energy shape
+scaled by the degradation, the days share a key while their scales fall in
+the same bins. The hour orders of the day (the rate day pattern) are keyed
+exactly. A larger rtol gives more hits at the cost of reusing the output of a
+day whose inputs differ by up to rtol, the outputs are not rescaled, so the 
+results of the run change (about 1% on the battery output at rtol=0.05).
+
+Used by every dispatch engine through pvs.dispatch_days, the days found in
+the cache are filled from it and only the others are dispatched. The key is
+built in python for every day, which costs more than the compiled 'numba'
+dispatch of the day, the cache pays off with the 'loop' engine.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+# Columns of the dispatch array read by daily_arbitrage, the capacity, energy,
+# RA and REC rates and the battery max p / capacity / rte columns do not change
+# the dispatch and are left out of the fingerprint.
+DISPATCH_COLUMNS = [0, 2, 6, 7, 8, 9, 10, 13, 14, 15, 16, 17, 18, 19, 20, 21]
+
+
+class DailyDispatchCache:
+    """
+    Bounded least recently used cache of daily dispatch outputs.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        maximum number of days held, the least recently used day is evicted
+        once the cache is full. The default is 4096.
+    rtol : float, optional
+        relative width of the bins the daily scale of each column is held in,
+        days whose column scales differ by less than rtol can share an output
+        (approximate matching). The default is 0, exact keys.
+    decimals : int, optional
+        decimals the shape of each column (relative to its daily scale) is
+        rounded to when rtol > 0. The default is 4.
+    """
+
+    def __init__(self, max_size=4096, rtol=0.0, decimals=4):
+        self.max_size = max_size
+        self.rtol = rtol
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+
+    def key(self,
+            arbitrage,
+            POI,
+            PV_min_energy_chg,
+            ppa_min_delta,
+            batt_limit_POI,
+            batt_hours_POI,
+            daily_array,
+            chg_order=None,
+            disch_order=None):
+        """
+        Build the cache key for a day from the daily_arbitrage arguments.
+
+        Returns
+        -------
+        key : tuple
+            scalar arguments, the hour orders and the daily inputs, or with 
+            rtol > 0 the binned scale and rounded shape of the daily inputs.
+        """
+        columns = daily_array[:,DISPATCH_COLUMNS]
+        orders = tuple(None if order is None else np.asarray(order).tobytes()
+                       for order in (chg_order, disch_order))
+        scalars = tuple(float(value) for value in
+                        (POI, PV_min_energy_chg, ppa_min_delta,
+                         batt_limit_POI, batt_hours_POI))
+        if self.rtol <= 0:
+            # Exact key, adding zero clears negative zeros so they match zero.
+            return ((bool(arbitrage),) + scalars + orders +
+                    ((np.ascontiguousarray(columns, dtype=float) + 0.0).tobytes(),))
+        scale = np.abs(columns).max(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Shape relative to the daily scale, adding zero clears negative
+            # zeros so they match zero.
+            shape = np.round(np.where(scale > 0, columns/scale, 0.0), self.decimals) + 0.0
+            # Logarithmic bin of the scale, all zero columns in their own bin.
+            scale_bin = np.where(scale > 0,
+                                 np.floor(np.log(scale)/np.log1p(self.rtol)),
+                                 np.iinfo(np.int64).min).astype(np.int64)
+        return ((bool(arbitrage),) + scalars + orders +
+                (scale_bin.tobytes(), shape.tobytes()))
+
+    def get(self, key):
+        """
+        Return the stored 24 x 15 output for the key, or None on a miss.
+        """
+        pvs_out = self._store.get(key)
+        if pvs_out is None:
+            self.misses += 1
+            return None
+        # Mark as most recently used.
+        self._store.move_to_end(key)
+        self.hits += 1
+        return pvs_out
+
+    def split(self, keys):
+        """
+        Split the keys of a set of days into the days found in the cache, the
+        days to dispatch and the days repeating the key of a day to dispatch.
+
+        Returns
+        -------
+        found : list
+            (position, stored output) of the days found in the cache.
+        missed : list
+            positions of the days to dispatch, the first day of each key.
+        repeats : list
+            (position, position in missed order of the day with the same key)
+            of the days to copy from a dispatched day, counted as hits.
+        """
+        found = []
+        missed = []
+        first = {}
+        repeats = []
+        for position, key in enumerate(keys):
+            if key in first:
+                repeats.append((position, first[key]))
+                self.hits += 1
+                continue
+            pvs_out = self.get(key)
+            if pvs_out is None:
+                first[key] = len(missed)
+                missed.append(position)
+            else:
+                found.append((position, pvs_out))
+        return found, missed, repeats
+
+    def put(self, key, pvs_out):
+        """
+        Store a copy of the daily output, evicting the least recently used days
+        past max_size.
+        """
+        self._store[key] = np.array(pvs_out, copy=True)
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all stored days and reset the counters.
+        """
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats : dict
+            hits, misses, hit rate and current size of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._store)}
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled dispatch backend, nopython versions of dispatch.daily_arbitrage and
+the loop over days in pvs.pvs_ac_mv, written against the 25 column dispatch
+array from pvs.dispatch_prep.
+
+Numba is optional, the compiled functions are cached to disk (__pycache__)
+after the first run so later sessions skip compilation. When Numba is not
+installed NUMBA_AVAILABLE is False and pvs.pvs_ac_mv falls back to the pure
+python loop.
+"""
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+
+def _jit(func):
+    """
+    Compile the function in nopython mode when Numba is installed, caching the
+    compiled machine code to disk. Division by zero follows numpy (inf / nan)
+    to match the pure python dispatch past the battery end of life. The GIL is
+    released so day chunks can be dispatched on parallel threads.
+    """
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True, error_model='numpy', nogil=True)(func)
+    return func
+
+
+@_jit
+def daily_arbitrage_nb(arbitrage,
+                       POI,
+                       batt_limit_POI,
+                       batt_hours_POI,
+                       daily_array,
+                       pvs_out,
+                       chg_order,
+                       disch_order):
+    """
+    Compiled version of dispatch.daily_arbitrage, see that function for the
+    column format of daily_array and pvs_out. All scalar arguments are floats,
+    the results are written into pvs_out (24 x 15) in place.
+
+    Parameters
+    ----------
+    arbitrage : boolean
+        boolean check if the rate delta in the day is large enough to prompt
+        battery charge / discharge.
+    POI : float
+        Point of interconnect rating (MW).
+    batt_limit_POI: float
+        PCS limit at the POI.
+    batt_hours_POI: float
+        hours to dispatch at the POI limit.
+    daily_array : array
+        24 x 25 slice of the dispatch array.
+    pvs_out : array
+        24 x 15 output slice.
+    chg_order : array
+        hours of the day sorted by PV charge cost (dispatch.charge_order).
+    disch_order : array
+        hours of the day sorted by combined rate, from the rate index.
+
+    Returns
+    -------
+    None.
+
+    """
+    pcs_np = batt_limit_POI
+    batt_cap_limit = pcs_np*batt_hours_POI
+    deliverable_PV_e = np.zeros(24)
+    PV_only_POI_e = np.zeros(24)
+    inv_out_e = np.zeros(24)
+    clip_chglim_batt_e = np.zeros(24)
+    clip_batt_e = np.zeros(24)
+    clip_chg_PV_e = np.zeros(24)
+    PV_chg_batt_e = np.zeros(24)
+    PV_chg_PV_e = np.zeros(24)
+    PV_less_chg_POI_e = np.zeros(24)
+    disch_batt_e = np.zeros(24)
+    disch_POI_e = np.zeros(24)
+    batt_SOC = np.zeros(24)
+    # Running total of the energy held in the battery over the day.
+    SOC_total = 0.0
+
+    # Step 1: charge battery using clipped energy only.
+    for hour in range(0,24):
+        if daily_array[hour,10] > daily_array[hour,13]:
+            # POI is limiting.
+            deliverable_PV_e[hour] = min(daily_array[hour,14] + daily_array[hour,7],
+                                         daily_array[hour,6])
+            inv_out_e[hour] = daily_array[hour,6]
+            PV_only_POI_e[hour] = daily_array[hour,7] * daily_array[hour,17]
+            batt_recap_PV_e = deliverable_PV_e[hour] - daily_array[hour,7]
+        else:
+            # Inverter is limiting, no clip harvesting.
+            deliverable_PV_e[hour] = min(daily_array[hour,10], daily_array[hour,0])
+            PV_only_POI_e[hour] = deliverable_PV_e[hour] * daily_array[hour,17]
+            batt_recap_PV_e = 0.0
+            inv_out_e[hour] = min(deliverable_PV_e[hour], daily_array[hour,6])
+        clip_lim = min(daily_array[hour,8]*daily_array[hour,19],
+                       batt_recap_PV_e*daily_array[hour,15])
+        clip_lim = min(clip_lim,
+                       daily_array[hour,21] - SOC_total,
+                       batt_cap_limit/daily_array[hour,18] - SOC_total,
+                       pcs_np/daily_array[hour,15])
+        clip_lim = max(0.0, clip_lim)
+        clip_chglim_batt_e[hour] = clip_lim
+        if SOC_total < daily_array[hour,21]:
+            batt_SOC[hour] = batt_SOC[hour] + clip_lim
+            SOC_total += clip_lim
+            clip_chg_PV_e[hour] = clip_lim / daily_array[hour,15]
+            clip_batt_e[hour] = clip_lim
+
+    # Step 2: charge battery from remaining PV energy after the clip,
+    # cheapest hours first.
+    for seq in range(0,24):
+        ref_hour = chg_order[seq]
+        PV_lim = (min(daily_array[ref_hour,8]*daily_array[ref_hour,19],
+                      deliverable_PV_e[ref_hour]*daily_array[ref_hour,15]) -
+                  clip_batt_e[ref_hour])
+        PV_lim = min(PV_lim,
+                     daily_array[ref_hour,21] - SOC_total,
+                     batt_cap_limit/daily_array[ref_hour,18] - SOC_total,
+                     pcs_np/daily_array[ref_hour,15])
+        PV_lim = max(0.0, PV_lim)
+        if SOC_total < daily_array[ref_hour,21] and arbitrage:
+            batt_SOC[ref_hour] = batt_SOC[ref_hour] + PV_lim
+            SOC_total += PV_lim
+            PV_chg_PV_e[ref_hour] = PV_lim / daily_array[ref_hour,15]
+            PV_chg_batt_e[ref_hour] = PV_lim
+        pvs_out[ref_hour,10] = seq
+
+    for hour in range(0,24):
+        # Array energy allowed to pass through to the POI.
+        chg_PV_e_24 = clip_chg_PV_e[hour] + PV_chg_PV_e[hour]
+        PV_less_chg_POI_e[hour] = (min(deliverable_PV_e[hour] - chg_PV_e_24,
+                                       daily_array[hour,7]) *
+                                   daily_array[hour,17])
+
+    # Discharge by combined rate on arbitrage days, otherwise in hour order.
+    if not arbitrage:
+        disch_order = np.arange(24)
+
+    # Step 3: Battery discharge
+    for seq in range(23,-1,-1):
+        ref_hour = disch_order[seq]
+        disch_lim = min(daily_array[ref_hour,9],
+                        SOC_total,
+                        batt_cap_limit*daily_array[ref_hour,20],
+                        pcs_np/daily_array[ref_hour,18])
+        gap_POI_p = POI - PV_less_chg_POI_e[ref_hour]
+        if daily_array[ref_hour,21] > 0:
+            disch_lim = min(disch_lim, gap_POI_p/daily_array[ref_hour,18])
+        else:
+            # Battery is past end of life.
+            disch_lim = 0.0
+        disch_lim = max(0.0, disch_lim)
+        if SOC_total > 0:
+            # Energy drawn = discharge limit, or everything charged up to the hour.
+            SOC_run = 0.0
+            for temp_hour in range(ref_hour,-1,-1):
+                SOC_run += batt_SOC[temp_hour]
+            temp_soc = min(disch_lim, SOC_run)
+            # Draw latest hour first using the running total from the discharge 
+            # hour back, emptying covered hours and leaving the remainder in the 
+            # hour where the draw stops.
+            SOC_run = 0.0
+            for temp_hour in range(ref_hour,-1,-1):
+                SOC_run += batt_SOC[temp_hour]
+                SOC_left = SOC_run - temp_soc
+                if SOC_left >= batt_SOC[temp_hour]:
+                    break
+                batt_SOC[temp_hour] = max(0.0, SOC_left)
+            SOC_total = max(0.0, SOC_total - temp_soc)
+            disch_batt_e[ref_hour] = temp_soc
+            disch_POI_e[ref_hour] = temp_soc * daily_array[ref_hour,18]
+        pvs_out[ref_hour,11] = seq
+
+    # Collect outputs by hour.
+    batt_SOC_tmp = 0.0
+    batt_SOC_pct = np.zeros(24)
+    batt_SOC_MWh = np.zeros(24)
+    for hour in range(0,24):
+        chg_batt_e = clip_batt_e[hour] + PV_chg_batt_e[hour]
+        if daily_array[hour,15] != 0:
+            chg_PV_e = chg_batt_e / daily_array[hour,15]
+        else:
+            chg_PV_e = 0.0
+        batt_e = -chg_batt_e + disch_batt_e[hour]
+        batt_SOC_tmp = batt_SOC_tmp - batt_e
+        batt_SOC_MWh[hour] = batt_SOC_tmp
+        if daily_array[hour,21] != 0:
+            batt_SOC_pct[hour] = batt_SOC_tmp / daily_array[hour,21]
+        delivered_PV_e = (PV_less_chg_POI_e[hour] / daily_array[hour,17]) + chg_PV_e
+        pvs_out[hour,0] = PV_only_POI_e[hour]
+        pvs_out[hour,1] = PV_less_chg_POI_e[hour]
+        pvs_out[hour,2] = disch_POI_e[hour]
+        pvs_out[hour,5] = delivered_PV_e * daily_array[hour,16]
+        pvs_out[hour,6] = (PV_only_POI_e[hour] / daily_array[hour,17] *
+                           daily_array[hour,16])
+        pvs_out[hour,7] = delivered_PV_e * daily_array[hour,17]
+        pvs_out[hour,8] = PV_only_POI_e[hour]
+        pvs_out[hour,9] = batt_e
+        pvs_out[hour,12] = hour
+        pvs_out[hour,13] = inv_out_e[hour]
+        pvs_out[hour,14] = clip_chglim_batt_e[hour]
+    # Remove rounding errors from battery SOC
+    batt_SOC_pct = np.round(batt_SOC_pct, 8)
+    batt_SOC_MWh = np.round(batt_SOC_MWh, 8)
+    for hour in range(0,24):
+        # Also clears negative zero.
+        pvs_out[hour,3] = batt_SOC_pct[hour] if batt_SOC_pct[hour] != 0 else 0.0
+        pvs_out[hour,4] = batt_SOC_MWh[hour] if batt_SOC_MWh[hour] != 0 else 0.0
+
+
+@_jit
+def pvs_ac_mv_nb(dispatch_array,
+                 POI,
+                 arbitrage_days,
+                 batt_limit_POI,
+                 batt_hours_POI,
+                 chg_order,
+                 disch_order,
+                 output):
+    """
+    Compiled loop over days for pvs.pvs_ac_mv, slicing the dispatch array into
+    24 hour blocks and writing each day into the matching rows of output. The
+    daily arbitrage flags and hour orders come from the rate index, so no 
+    sorting is done in the compiled loop.
+
+    Parameters
+    ----------
+    dispatch_array : array
+        hourly dispatch array from pvs.dispatch_prep (hours x 25).
+    POI : float
+        Interconnection size in MW.
+    arbitrage_days : array
+        boolean array (days), True where the daily rate delta meets the 
+        arbitrage requirements.
+    batt_limit_POI: float
+        PCS limit at the POI.
+    batt_hours_POI: float
+        hours to dispatch at the POI limit.
+    chg_order : array
+        (days, 24) hours sorted by PV charge cost, the minimum PV energy to
+        charge is applied when the order is built (dispatch.charge_order).
+    disch_order : array
+        (days, 24) hours sorted by combined rate.
+    output : array
+        hours x 15 output array, filled in place.
+
+    Returns
+    -------
+    None.
+
+    """
+    for day in range(0,dispatch_array.shape[0]//24):
+        index = day*24
+        daily_arbitrage_nb(arbitrage_days[day],
+                           POI,
+                           batt_limit_POI,
+                           batt_hours_POI,
+                           dispatch_array[index:index+24,:],
+                           output[index:index+24,:],
+                           chg_order[day],
+                           disch_order[day])
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar container for the hourly dispatch output of a case. The 15 output
+columns are held in a single buffer, column major so each named column is a
+contiguous array, with an optional float32 storage mode to halve the memory of
+large sweeps. The result reads like the dispatch output dictionary it replaces
+(result['POI meter PVS']) and converts to a pandas DataFrame without copying.
+A result can also hold a leading points axis, one output per sweep point of a
+batched evaluation (pvs.pvs_ac_mv_points).
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+# Names of the dispatch output columns.
+OUTPUT_COLUMNS = ['PV only plant energy',
+                  'PVS POI output - PV',
+                  'PVS POI output - battery',
+                  'battery SOC %',
+                  'battery SOC MWh',
+                  'node meter PVS',
+                  'node meter PV',
+                  'POI meter PVS',
+                  'POI meter PV',
+                  'battery charge state',
+                  'charge sequence',
+                  'discharge sequence',
+                  'hour',
+                  'inverter output',
+                  'clip harvesting']
+
+
+class DispatchResult(Mapping):
+    """
+    Hourly dispatch output with named column access.
+
+    Parameters
+    ----------
+    hours : int
+        number of hours in the run.
+    dtype : numpy dtype, optional
+        storage type, np.float64 or np.float32. The dispatch is always
+        calculated in float64 and rounded on storage. The default is np.float64.
+    points : int, optional
+        number of sweep points, the buffer is (points, hours, 15) and columns
+        read as (points, hours). The default is None, a single (hours, 15)
+        output.
+    """
+
+    def __init__(self, hours, dtype=np.float64, points=None):
+        self.columns = list(OUTPUT_COLUMNS)
+        self._index = {key: col for col, key in enumerate(self.columns)}
+        if points is None:
+            # Column major, each column is contiguous and the (hours, 15) array
+            # reshapes into days without copying.
+            self.data = np.zeros((hours, len(self.columns)), dtype=dtype, order='F')
+        else:
+            # Each point is laid out like a single output, column major.
+            self.data = np.zeros((points, len(self.columns), hours),
+                                 dtype=dtype).transpose(0, 2, 1)
+
+    @classmethod
+    def from_array(cls, array, dtype=None):
+        """
+        Build a result from an (hours, 15) output array, copying it into the
+        result buffer.
+        """
+        array = np.asarray(array)
+        result = cls(array.shape[0], dtype=array.dtype if dtype is None else dtype)
+        result.data[...] = array
+        return result
+
+    @classmethod
+    def from_buffer(cls, data):
+        """
+        Wrap an existing (hours, 15) column major buffer (e.g. a memory mapped
+        checkpoint file), or a (points, hours, 15) buffer, without copying it.
+        """
+        if data.ndim not in (2, 3) or data.shape[-1] != len(OUTPUT_COLUMNS):
+            raise ValueError('dispatch result buffer must be (hours, 15) or (points, hours, 15)')
+        result = cls(0, dtype=data.dtype)
+        result.data = data
+        return result
+
+    @property
+    def days(self):
+        """
+        (days, 24, 15) view of the buffer, written in place by the dispatch,
+        (points, days, 24, 15) with a points axis.
+        """
+        days = self.data.reshape(self.data.shape[:-2] + (-1, 24, len(self.columns)))
+        if not np.shares_memory(days, self.data):
+            raise ValueError('dispatch result buffer cannot be viewed as days')
+        return days
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @property
+    def points(self):
+        """
+        Number of sweep points, None for a single output.
+        """
+        return self.data.shape[0] if self.data.ndim == 3 else None
+
+    def point(self, index):
+        """
+        Output of one sweep point, sharing the buffer.
+        """
+        if self.points is None:
+            raise ValueError('dispatch result has no points axis')
+        return DispatchResult.from_buffer(self.data[index])
+
+    def __getitem__(self, key):
+        return self.data[..., self._index[key]]
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def to_dataframe(self, index=None):
+        """
+        Returns
+        -------
+        dataframe : pandas DataFrame
+            hourly output with one column per output, sharing the result
+            buffer (changes to one show in the other).
+        """
+        import pandas as pd
+
+        if self.points is not None:
+            raise ValueError('select a sweep point first, result.point(index).to_dataframe()')
+        return pd.DataFrame(self.data, columns=self.columns, index=index, copy=False)
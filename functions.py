@@ -63,24 +63,23 @@ def module_degradation(module_dictionary):
     Returns
     -------
     deg_H : np_array
-        numpy array of hourly degradation
+        numpy array of hourly degradation, cached for the module and read only
 
     """
-    # TODO: check with start for array losses / degradation prior to COD
-    annual_deg = module_dictionary['degradation']   # annual degradation %
-    module_life = module_dictionary['life']         # years the module lasts
-    deg_H = []           # create an hourly array full of nan
-    month_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    month_counter = 0
-    deg_monthly = 1
-    for i in range(0,module_life):
-        for days in month_days:
-            deg_monthly = 1 - (annual_deg/12)*month_counter   # matlab degradation
-            for day in range(0, days):
-                for hour in range(0,24):
-                    deg_H.append(deg_monthly)
-            month_counter+=1 
-    
+    import numpy as np
+    import calendar_expansion as cal
+
+    def build():
+        # TODO: check with start for array losses / degradation prior to COD
+        annual_deg = module_dictionary['degradation']   # annual degradation %
+        module_life = int(module_dictionary['life'])    # years the module lasts
+        month_counter = np.arange(module_life*12)
+        deg_monthly = 1 - (annual_deg/12)*month_counter  # matlab degradation
+        # every hour of a month holds the degradation of the month
+        return cal.monthly_to_hourly(deg_monthly)
+
+    deg_H = cal.cached(('module', cal.component_digest(module_dictionary)), build)
+
     return deg_H
 
 def inv_output(array_energy, array_voltage):
@@ -92,19 +91,155 @@ def inv_output(array_energy, array_voltage):
         inv_output[i] = inv_losses(array_energy[i],array_voltage[i])
     return inv_output
     
-def define_cases(components,
-                 module_deg, 
-                 array_energy,
+def case_battery(components,
                  batt_deg,
-                 POI, 
-                 dc_ac, 
-                 inv_np, 
-                 pcs, 
-                 batt_hour,
-                 aug_sched = []):
+                 Batt_hour,
+                 PCS_np,
+                 hours,
+                 aug_sched = [],
+                 store = None):
     """
-    function to populate case combinations for DC/AC ratio, Inverter total nameplate,
-    PCS total nameplate, and battery total hours
+    function to build the hourly battery capacity and power for a case, shared 
+    by every case with the same battery hour (and PCS nameplate when there is 
+    no augmentation, the augmentation schedule sets the installed capacity)
+
+    Parameters
+    ----------
+    components : dictionary
+        component models used for simulation
+    batt_deg : dict
+        hourly capacity and round trip efficiency for the battery
+    Batt_hour : float
+        battery hours (hours)
+    PCS_np : float
+        PCS nameplate (MW), not used with an augmentation schedule
+    hours : int
+        number of hours in the simulation
+    aug_sched : list
+        list of year, and amount for battery system augmentation, default value of zero
+    store : array_store.ArrayStore, optional
+        store the hourly battery arrays are interned in, default value of None
+
+    Returns
+    -------
+    batt_cap_case : dict
+        hourly capacity and rte for the life of the system
+    batt_power_case : dict
+        hourly max power, charge and discharge eta, and DOD np for the life of 
+        the system
+    """
+    import monthly_battery_functions as batt
+    import augmentation as augm
+
+    if len(aug_sched)==0:       # no augmentation
+        # calculate hourly battery capacity and rte for life of system
+        batt_cap_case = batt.battery_capacity(batt_deg,     
+                                              Batt_hour, 
+                                              PCS_np,
+                                              store=store)
+        # calculate hourly max power, DOD nameplate, and  
+        # charge/discharge efficiency for life of system
+        batt_power_case = batt.battery_power(components['Batt'],        
+                                             batt_cap_case,
+                                             store=store)
+    else:                       # Augmentation schedule provided
+        # Tranches held as a cohort matrix, capacity, power and the capacity
+        # weighted efficiencies summed over the tranches.
+        batt_cap_case, batt_power_case = augm.cohort_battery(components['Batt'],
+                                                             batt_deg,
+                                                             Batt_hour,
+                                                             aug_sched,
+                                                             hours)
+    # Pad to the simulation length here, so the battery shared by several cases 
+    # is not padded in place by losses.loss_calculations.
+    batt_power_case, batt_cap_case = batt.array_match(batt_power_case,
+                                                      batt_cap_case,
+                                                      hours,
+                                                      store=store)
+
+    return batt_cap_case, batt_power_case
+
+def _values_digest(values):
+    # Digest of an array, or of the arrays of a dictionary in key order.
+    import hashlib
+    import numpy as np
+
+    digest = hashlib.sha256()
+    if isinstance(values, dict):
+        for key in sorted(values):
+            digest.update(key.encode())
+            digest.update(np.ascontiguousarray(values[key], dtype=float).tobytes())
+    else:
+        digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+def inputs_digest(case, group_digests=None):
+    """
+    function to fingerprint the inputs of a case that determine its dispatch,
+    cases with the same digest give the same dispatch output
+
+    Parameters
+    ----------
+    case : dict
+        case from iter_cases / define_cases
+    group_digests : dict, optional
+        digests of input groups shared by several cases ('degraded array 
+        energy', 'battery capacity', 'battery power'), hashed once by the 
+        caller. The default is None
+
+    Returns
+    -------
+    digest : string
+        hex digest of the degraded array energy, battery, losses, limits and POI
+    """
+    import hashlib
+
+    if group_digests is None:
+        group_digests = {}
+    digest = hashlib.sha256(repr(float(case['POI'])).encode())
+    for group in ('degraded array energy', 'battery capacity', 'battery power', 'losses', 'limits'):
+        if group not in group_digests:
+            group_digests = dict(group_digests, **{group: _values_digest(case[group])})
+        digest.update(f'{group}|{group_digests[group]}'.encode())
+    return digest.hexdigest()
+
+def identical_cases(case_list):
+    """
+    function to group the cases with identical dispatch inputs, only one case
+    of each group needs to be dispatched
+
+    Parameters
+    ----------
+    case_list : dict
+        cases from define_cases
+
+    Returns
+    -------
+    groups : list
+        lists of case names sharing the same dispatch inputs, groups of one 
+        case are left out
+    """
+    groups = {}
+    for key in case_list:
+        groups.setdefault(case_list[key]['inputs digest'], []).append(key)
+    return [group for group in groups.values() if len(group) > 1]
+
+def iter_cases(components,
+               module_deg, 
+               array_energy,
+               batt_deg,
+               POI, 
+               dc_ac, 
+               inv_np, 
+               pcs, 
+               batt_hour,
+               aug_sched = [],
+               store = None):
+    """
+    generator version of define_cases, building each case combination for DC/AC 
+    ratio, Inverter total nameplate, PCS total nameplate, and battery total hours
+    only when it is reached. Pass it to pvs.arbitrage so only the cases being 
+    dispatched are held in memory.
 
     Parameters
     ----------
@@ -128,13 +263,17 @@ def define_cases(components,
         start, stop, step for battery hour[s] range for case simulations
     aug_sched : list
         list of year, and amount for battery system augmentation, default value of zero
+    store : array_store.ArrayStore, optional
+        store the hourly case arrays are interned in, cases with the same 
+        content share one read only array. Default value of None, a new store 
+        is used.
 
-    Returns
-    -------
-    case_list : dict
-        dictionary of named case runs displaying pertinent info, to be 
-         accessed by index to simplify use
-         holds the following:
+    Yields
+    ------
+    name : string
+        case name, Case 1, Case 2, ... in define_cases order.
+    case : dict
+        case run displaying pertinent info, holds the following:
              array energy
              battery capacity
              battery hour
@@ -146,16 +285,24 @@ def define_cases(components,
              losses
              PCS nameplate
              POI
+             inputs digest
+
+    Intermediates are built once and shared by the cases that use them, the 
+    degraded array energy per DC/AC ratio and the battery per battery hour 
+    (and PCS nameplate without augmentation, see case_battery).
     """
     import helper_functions as hf
-    import monthly_battery_functions as batt
     import losses as loss
-    import numpy as np
+    import array_store
 
-    case_list = {}
+    if store is None:
+        store = array_store.ArrayStore()
     i = 1
     # TODO: Matlab normalizes the array energy after applying degradation, is this good practice?
     array_norm = (array_energy/max(array_energy))*POI   # normalize array energy to model different DC/AC ratios
+    # Degraded array energy normalized against its max value, the same for every case.
+    array_deg_norm = array_energy*module_deg
+    array_deg_norm = array_deg_norm / max(array_deg_norm)
     # create variables to cycle through
     dcac_cases = hf.case_steps(dc_ac[0], 
                                dc_ac[1], 
@@ -169,88 +316,36 @@ def define_cases(components,
     batt_hour_cases = hf.case_steps(batt_hour[0], 
                                     batt_hour[1], 
                                     batt_hour[2])   # Battery hours (hours)
+    # Battery capacity and power built once per battery hour and PCS nameplate,
+    # with augmentation the installed capacity comes from the schedule and the 
+    # battery only depends on the battery hour.
+    battery_cases = {}
     
     for dc_ac in dcac_cases:
+        # Array energy for the run's dcac ratio, shared by the cases of the ratio.
+        array_case = store.intern(array_norm*       # define array energy for the run's dcac ratio 
+                                  dc_ac)            
+        # Multiply the normalized degraded array energy by the DC/AC ratio and 
+        # POI to allow for multiple case runs using the same simulation output.
+        array_deg_case = store.intern(array_deg_norm*dc_ac*POI)
+        array_deg_digest = _values_digest(array_deg_case)
         for Inv in inv_np_cases:
             for PCS_np in pcs_np_cases:
                 for Batt_hour in batt_hour_cases:
-                        array_case = (array_norm*                   # define array energy for the run's dcac ratio 
-                                      dc_ac)            
-                        
-                        array_deg_case = (array_energy*module_deg)
-                        # Normalize the degraded array energy against the max value found
-                        # and multiply by the DC/AC ratio and POI to allow for 
-                        # multiple case runs using the same simulation output.
-                        array_deg_case = (array_deg_case / max(array_deg_case))*dc_ac*POI 
-                    
-                        if len(aug_sched)==0:       # no augmentation
-                            # calculate hourly battery capacity and rte for life of system
-                            batt_cap_case = batt.battery_capacity(batt_deg,     
-                                                                  Batt_hour, 
-                                                                  PCS_np)
-                            # calculate hourly max power, DOD nameplate, and  
-                            # charge/discharge efficiency for life of system
-                            batt_power_case = batt.battery_power(components['Batt'],        
-                                                                 batt_cap_case)
-                        else:                       # Augmentation schedule provided
-                            # Set temporary container for augmentation
-                            aug_temp = {}
-                            capacity_installed = np.zeros(len(array_energy))
-                            # For each augmentation in the schedule
-                            for aug in aug_sched:
-                                pre_aug = np.zeros(aug[0]*8760)  # create zeros prior to the year where the battery augmentation is installed.
-                                # Find capacity, and dod_np over the life of the new battery.
-                                cap_temp = batt.battery_capacity(batt_deg,     
-                                                                  Batt_hour, 
-                                                                  aug[1])
-                                # Find power and rte limits over the life of the new battery.
-                                power_temp = batt.battery_power(components['Batt'],        
-                                                                 cap_temp)
-                                # iterate through each of the battery limits.
-                                for key in cap_temp:
-                                    # Precede the values with zeros equal to the pre install period.
-                                    cap_temp[key] = np.append(pre_aug, cap_temp[key])
-                                    if len(cap_temp[key])<len(array_energy):
-                                        # If it's not the final installation then add zeros to the end.
-                                        cap_temp[key] = np.append(cap_temp[key],np.zeros(len(array_energy)-len(cap_temp[key])))
-                                    elif len(cap_temp[key]) > len(array_energy):
-                                        # If the installation runs past the simulation length, then clip anything past the end.
-                                        cap_temp[key] = cap_temp[key][:len(array_energy)]
-                                # Update the capacity total installed for each hour, to normalize augmentation rte and chg/discharge eta.
-                                capacity_installed += np.where(cap_temp['capacity'] != 0,np.ones(len(cap_temp['capacity']))*aug[1], np.zeros(len(array_energy)))
-                                for key in power_temp:
-                                    # Precede the values with zeros equal to the pre-install period.
-                                    power_temp[key] = np.append(pre_aug, power_temp[key])
-                                    if len(power_temp[key])<len(array_energy):
-                                        # If the augmentation does not go to the end of the simulation append zeros to the end.
-                                        power_temp[key] = np.append(power_temp[key],np.zeros(len(array_energy)-len(power_temp[key])))
-                                    elif len(power_temp[key]) > len(array_energy):
-                                        # If the augmentation runs past the simulation clip excess values.
-                                        power_temp[key] = power_temp[key][:len(array_energy)]
-                                # Create a temporary dictionary holding     
-                                aug_temp[aug[0]] = {'installed_cap':aug[1],'batt cap':cap_temp,'batt power':power_temp}
-                            
-                            cap_total = np.zeros(len(array_energy))
-                            dod_total = np.zeros(len(array_energy))
-                            p_total = np.zeros(len(array_energy))
-                            rte_total = np.zeros(len(array_energy))
-                            chg_total = np.zeros(len(array_energy))
-                            # add all of the powers
-                            for key in aug_temp:
-                                cap_total += aug_temp[key]['batt cap']['capacity']
-                                dod_total += aug_temp[key]['batt power']['DOD np']
-                                p_total += aug_temp[key]['batt power']['max p']
-                                rte_total += aug_temp[key]['batt cap']['rte']*aug_temp[key]['installed_cap']
-                                chg_total += aug_temp[key]['batt power']['charge eta']*aug_temp[key]['installed_cap']
-                            rte_total /= capacity_installed
-                            chg_total /= capacity_installed
-                            
-                            batt_cap_case = {'capacity': cap_total,
-                                             'rte': rte_total}
-                            batt_power_case = {'max p': p_total,
-                                               'charge eta': chg_total,
-                                               'discharge eta': chg_total,
-                                               'DOD np': dod_total}
+                        battery_key = (Batt_hour,) if len(aug_sched) > 0 else (Batt_hour, PCS_np)
+                        if battery_key not in battery_cases:
+                            batt_cap_case, batt_power_case = case_battery(components,
+                                                                          batt_deg,
+                                                                          Batt_hour,
+                                                                          PCS_np,
+                                                                          len(array_energy),
+                                                                          aug_sched,
+                                                                          store)
+                            battery_cases[battery_key] = (batt_cap_case,
+                                                          batt_power_case,
+                                                          {'battery capacity': _values_digest(batt_cap_case),
+                                                           'battery power': _values_digest(batt_power_case)})
+                        batt_cap_case, batt_power_case, batt_digests = battery_cases[battery_key]
          
                         # losses_case = hourly losses for power paths
                         # limits_case = hourly limits for array energy, 
@@ -261,7 +356,8 @@ def define_cases(components,
                                                              PCS_np,
                                                              components,
                                                              batt_cap_case,
-                                                             batt_power_case)
+                                                             batt_power_case,
+                                                             store=store)
                         # Provide individual case run names for presentation and storage
                         # named case runs for differentiation and printing / naming excel outputs by case key
                         # name_temp = f'Case {i}: DC/AC ratio: {DC_AC}; PCS: {PCS_np} MWh; Inv_np: {Inv}; Battery hour: {Batt_hour}'
@@ -277,9 +373,71 @@ def define_cases(components,
                                      'Inv_np':Inv,                              # inverter nameplate (MW)
                                      'PCS nameplate':PCS_np,                    # PCS nameplate (MW)
                                      'battery hour':Batt_hour}                  # battery hours (hours)
-                        # Update the case list dictionary with the new simulation case
-                        case_list[name_temp] = temp_dict
+                        # Fingerprint of the dispatch inputs to find identical cases.
+                        temp_dict['inputs digest'] = inputs_digest(temp_dict,
+                                                                   dict(batt_digests,
+                                                                        **{'degraded array energy': array_deg_digest}))
+                        # Hand the new simulation case to the caller
+                        yield name_temp, temp_dict
                         i+=1
 
+
+def define_cases(components,
+                 module_deg, 
+                 array_energy,
+                 batt_deg,
+                 POI, 
+                 dc_ac, 
+                 inv_np, 
+                 pcs, 
+                 batt_hour,
+                 aug_sched = [],
+                 store = None):
+    """
+    function to populate case combinations for DC/AC ratio, Inverter total nameplate,
+    PCS total nameplate, and battery total hours
+
+    Parameters
+    ----------
+    see iter_cases.
+
+    Returns
+    -------
+    case_list : dict
+        dictionary of named case runs displaying pertinent info, to be 
+         accessed by index to simplify use
+         holds the following:
+             array energy
+             battery capacity
+             battery hour
+             battery power
+             dc/ac ratio
+             degraded array energy
+             inverter nameplate
+             limits
+             losses
+             PCS nameplate
+             POI
+             inputs digest
+        cases with identical dispatch inputs are grouped by 
+        identical_cases(case_list), the memory saved by sharing identical 
+        arrays is reported by store.stats() of the store passed in.
+    """
+    import array_store
+
+    if store is None:
+        store = array_store.ArrayStore()
+    case_list = dict(iter_cases(components,
+                                module_deg,
+                                array_energy,
+                                batt_deg,
+                                POI,
+                                dc_ac,
+                                inv_np,
+                                pcs,
+                                batt_hour,
+                                aug_sched,
+                                store))
+
     return case_list
   
\ No newline at end of file
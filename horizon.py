@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Decimated horizon runs. Battery capacity, rte and module degradation change
+slowly from year to year, so early design work can dispatch a subset of the
+years (year 1, every Nth year and the years around augmentation events) and
+interpolate the annual totals for the years in between. deviation_report
+compares the interpolation against a full run.
+"""
+import numpy as np
+
+from screening import ENERGY_COLUMNS
+
+
+def sample_years(n_years, step, aug_sched=None, capacity=None):
+    """
+    Function to pick the years to dispatch.
+
+    Parameters
+    ----------
+    n_years : int
+        number of years in the run.
+    step : int
+        dispatch every step years.
+    aug_sched : list, optional
+        list of year, and amount for battery system augmentation, as passed to
+        functions.define_cases. The default is None.
+    capacity : array, optional
+        hourly battery capacity of the case, years where the capacity steps up
+        or drops to zero (augmentation or end of life) are also sampled. The
+        default is None.
+
+    Returns
+    -------
+    years : array
+        sorted years (0 = year 1) to dispatch. The first and last years are
+        always included, as are both sides of each event so the interpolation
+        does not smooth over the step.
+
+    """
+    step = max(1, int(step))
+    years = set(range(0, n_years, step))
+    years.update([0, n_years - 1])
+    events = []
+    if aug_sched is not None:
+        events += [aug[0] for aug in aug_sched]
+    if capacity is not None:
+        # Annual mean capacity, changes between years beyond the gradual
+        # degradation mark an event.
+        annual = np.asarray(capacity, dtype=float)[:n_years*8760].reshape(n_years,-1).mean(axis=1)
+        change = np.diff(annual)
+        events += list(np.flatnonzero((change > 0) | ((annual[1:] == 0) & (annual[:-1] != 0))) + 1)
+    for event in events:
+        years.update([event - 1, event])
+    years = np.array(sorted(year for year in years if 0 <= year < n_years), dtype=int)
+    return years
+
+
+def sample_days(years):
+    """
+    Returns
+    -------
+    days : array
+        index of every day of the given years (365 day years).
+    """
+    return (np.asarray(years)[:,None]*365 + np.arange(365)).ravel()
+
+
+def annual_totals(output, n_years):
+    """
+    Function to sum the energy columns of the dispatch output by year.
+
+    Parameters
+    ----------
+    output : array
+        (days, 24, 15) dispatch output covering n_years full years.
+    n_years : int
+        number of years in the output.
+
+    Returns
+    -------
+    totals : array
+        (n_years, 15) annual totals, zero for the non energy columns.
+
+    """
+    totals = np.zeros((n_years, output.shape[2]))
+    totals[:,ENERGY_COLUMNS] = (output[:n_years*365,:,ENERGY_COLUMNS]
+                                .reshape(n_years, -1, len(ENERGY_COLUMNS)).sum(axis=1))
+    return totals
+
+
+def interpolate_years(years, sample_output, n_years, output_keys):
+    """
+    Function to fill the annual totals of the years that were not dispatched
+    by linear interpolation between the sampled years.
+
+    Parameters
+    ----------
+    years : array
+        sampled years.
+    sample_output : array
+        (sampled days, 24, 15) dispatch output of the sampled years, in order.
+    n_years : int
+        number of years in the run.
+    output_keys : list
+        names of the 15 dispatch output columns.
+
+    Returns
+    -------
+    horizon_output : dict
+        dictionary containing the following information:
+            sample years:       years that were dispatched.
+            interpolated:       (n_years) boolean, True for interpolated years.
+            annual totals:      dictionary of (n_years) totals by output key.
+            lifetime totals:    dictionary of lifetime totals by output key.
+
+    """
+    sampled = annual_totals(sample_output, len(years))
+    all_years = np.arange(n_years)
+    annual_totals_dict = {}
+    lifetime_totals = {}
+    for col in ENERGY_COLUMNS:
+        annual = np.interp(all_years, years, sampled[:,col])
+        annual_totals_dict[output_keys[col]] = annual
+        lifetime_totals[output_keys[col]] = annual.sum()
+    horizon_output = {'sample years': np.array(years, dtype=int),
+                      'interpolated': ~np.isin(all_years, years),
+                      'annual totals': annual_totals_dict,
+                      'lifetime totals': lifetime_totals}
+    return horizon_output
+
+
+def deviation_report(horizon_output, dispatch_output):
+    """
+    Function to compare a decimated run against the full run of the same case.
+
+    Parameters
+    ----------
+    horizon_output : dict
+        output of pvs.pvs_ac_mv with horizon_years set.
+    dispatch_output : dict
+        hourly output of the full pvs.pvs_ac_mv run.
+
+    Returns
+    -------
+    report : dict
+        dictionary by output key holding:
+            worst year:             year with the largest relative deviation.
+            worst year deviation:   relative deviation of that year.
+            lifetime deviation:     relative deviation of the lifetime total.
+
+    """
+    report = {}
+    for key, annual in horizon_output['annual totals'].items():
+        hourly = np.asarray(dispatch_output[key])
+        full = hourly[:len(annual)*8760].reshape(len(annual), -1).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.where(full != 0, np.abs(annual - full) / np.abs(full),
+                                 np.abs(annual - full))
+        lifetime = full.sum()
+        report[key] = {'worst year': int(deviation.argmax()),
+                       'worst year deviation': deviation.max(),
+                       'lifetime deviation': (abs(annual.sum() - lifetime) / abs(lifetime)
+                                              if lifetime != 0 else abs(annual.sum()))}
+    return report
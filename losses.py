@@ -5,7 +5,8 @@ def loss_calculations(PV_energy,
                       PCS_np,
                       components, 
                       batt_cap,
-                      batt_power):
+                      batt_power,
+                      store=None):
     """
     Function to calculate losses and limits on an hourly basis to transmission
     paths, and for key components in the dispatch function
@@ -30,6 +31,10 @@ def loss_calculations(PV_energy,
         dictionary with hourly values over the life of the battery for 
         max power, charge efficiency, discharge efficiency, and nameplate depth
         of discdharge
+    store : array_store.ArrayStore, optional
+        store the hourly losses and limits are interned in, paths and limits 
+        that are the same for several cases (array to POI, array to node 
+        meter, PCS limits, ...) share one array. The default is None.
 
     Returns
     -------
@@ -64,7 +69,8 @@ def loss_calculations(PV_energy,
     array_length = components['Mod']['life'] * 365 * 24     # hourly by life of module.
     batt_power, batt_cap = batt.array_match(batt_power,     # match battery system parameters to length of array energy for dispatch.
                                             batt_cap, 
-                                            array_length)
+                                            array_length,
+                                            store=store)
     # calculate array to POI losses based on diagram.
     arr_to_POI_temp = (components['ModCol']['eta']* 
                   components['Inv']['eta']*
@@ -140,5 +146,9 @@ def loss_calculations(PV_energy,
                    'power limited by battery': batt_lim_PV_p,
                    'array energy inverter limited': inv_lim_PV_e,
                    'array energy POI limited': POI_lim_PV_e}
+    if store is not None:
+        # Share the arrays already held by another case.
+        store.intern_dict(loss_dict)
+        store.intern_dict(limits_dict)
     
     return loss_dict, limits_dict
@@ -8,7 +8,8 @@ Created on Tue Oct 19 13:50:44 2021
 # monthly_battery_functions
 #%% Imports
 import numpy as np
-import pandas as pd
+
+import calendar_expansion as cal
 
 def battery_degradation(battery, 
                         cycles_per_day):
@@ -22,7 +23,7 @@ def battery_degradation(battery,
         degradation curves
     cycles_per_day : int
         select 1 or 2 cycles per day to determine which
-        degradation curve to use
+        degradation curve to use, other values raise a ValueError
 
     Returns
     -------
@@ -30,6 +31,7 @@ def battery_degradation(battery,
         dictionary containing hourly values for the following
             battery_rte:    float   round trip efficiency of the battery at each hour
             capacity:       float   degraded capacity in % for the battery at each hour
+        cached for the battery and cycles per day, the arrays are read only.
             
     """
     batt_life = int(battery['life'])    # cast as int, np array default type float64
@@ -38,53 +40,35 @@ def battery_degradation(battery,
     elif(cycles_per_day == 2):
         deg_curve = battery['deg_c730']
     else:
-        return(print('selected cycles per day is invalid for current model'))
-    # calculate calendar and throughput degradation over battery life
-    month_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    deg_temp = np.zeros(batt_life*12+1)     # establish empty hourly array.
-    deg_temp[:] = np.nan                    # convert zeros to NAN for interpolation.
-    rte_temp = deg_temp[:len(deg_temp)-1]   # 1 unit less since degradation trims final value, 
-                                            # in order to interpolate properly.
-    
-    for i in range(batt_life):
-        deg_temp[i*12] = deg_curve[i]                        # add known values.
-    deg_temp[len(deg_temp)-1] = deg_curve[len(deg_curve)-1]  # add final value.
-    df_temp = pd.DataFrame(data=deg_temp)
-    df_temp = df_temp.interpolate()
-    deg_m = df_temp.to_numpy(dtype=float)
-    deg_m = deg_m[:len(deg_m)-1]
-    batt_deg = np.zeros(batt_life*365*24)
-    
-    # calculate round trip efficiency hourly over battery .
-    rte_temp[:] = np.nan
-    rte_temp[0] = float(battery['rte_BOL'])                 # beginning of life n.
-    rte_temp[len(rte_temp)-1] = float(battery['rte_EOL'])   # end of life n.
-    # load into dataframe for interpolation
-    df_rte_temp = pd.DataFrame(data=rte_temp)
-    df_rte_temp = df_rte_temp.interpolate()
-    rte_m = df_rte_temp.to_numpy(dtype=float)
-    rte_deg = np.zeros(batt_life*365*24)
-    
-    # iterate over the degradation, loading each month with the same degradation value. 
-    # over its length
-    hourly_index = 0
-    month_index = 0
-    for year in range(batt_life):
-        for days in month_days:
-            for i in range(days*24):
-                batt_deg[hourly_index] = deg_m[month_index]
-                rte_deg[hourly_index] = rte_m[month_index]
-                hourly_index += 1
-            month_index += 1
-    
-    batt_degradation = {'battery capacity': batt_deg, 'rte': rte_deg}
+        raise ValueError('selected cycles per day is invalid for current model')
+
+    def build():
+        # calculate calendar and throughput degradation over battery life, 
+        # the annual curve is known at the start of each year and the final 
+        # value at the end of life, interpolated linearly between.
+        months = batt_life*12
+        deg_points = np.append(np.arange(batt_life)*12, months)
+        deg_values = np.append(np.asarray(deg_curve[:batt_life], dtype=float),
+                               float(deg_curve[len(deg_curve)-1]))
+        deg_m = cal.annual_to_monthly(months, deg_points, deg_values)
+        # round trip efficiency from beginning of life to end of life.
+        rte_m = cal.annual_to_monthly(months, 
+                                      [0, months-1], 
+                                      [float(battery['rte_BOL']), float(battery['rte_EOL'])])
+        # load each month with the same degradation value over its length.
+        return {'battery capacity': cal.monthly_to_hourly(deg_m), 
+                'rte': cal.monthly_to_hourly(rte_m)}
+
+    batt_degradation = cal.cached(('battery', cal.component_digest(battery), cycles_per_day), 
+                                  build)
     
     return batt_degradation
 
 
 def battery_capacity(batt_deg,
                      batt_hour,
-                     PCS_tot_np
+                     PCS_tot_np,
+                     store=None
                      ):
     """
     convert the degradation into capacity for the energy storage currently installed.
@@ -102,6 +86,9 @@ def battery_capacity(batt_deg,
         versions, the PCS nameplate should not be accounted, 
         instead use the number of containers for the augmentation.
         the funciton will be rewritten to accomodate. 
+    store : array_store.ArrayStore, optional
+        store the hourly values are interned in, identical arrays are shared between
+        cases. The default is None.
 
     Returns
     -------
@@ -119,11 +106,15 @@ def battery_capacity(batt_deg,
     batt_cap = {'capacity': batt_capacity,
                 'rte': np.squeeze(batt_deg['rte'])}
 
+    if store is not None:
+        store.intern_dict(batt_cap)
+
     return batt_cap
 
 
 def battery_power(battery,
-               batt_cap):
+               batt_cap,
+               store=None):
     """
     create hourly values for battery storage system characteristics 
 
@@ -134,6 +125,9 @@ def battery_power(battery,
     batt_cap : dict
         hourly values for round trip efficiency and capacity
         over the life of the battery
+    store : array_store.ArrayStore, optional
+        store the hourly values are interned in, identical arrays are shared between
+        cases. The default is None.
 
     Returns
     -------
@@ -160,10 +154,12 @@ def battery_power(battery,
         'charge eta': batt_chg_eta,
         'discharge eta': batt_dischg_eta,
         'DOD np': batt_DOD_np}
+    if store is not None:
+        store.intern_dict(batt_power)
     
     return batt_power
 
-def array_match(batt_power, batt_cap, array_length):
+def array_match(batt_power, batt_cap, array_length, store=None):
     """
     function to match array sizing with solar energy array length, pads with 
     zeros to allow for hourly math in the dispatch function
@@ -176,6 +172,9 @@ def array_match(batt_power, batt_cap, array_length):
         DESCRIPTION.
     array_length : int
         length (hourly) of array to match
+    store : array_store.ArrayStore, optional
+        store the padded arrays are interned in, identical arrays are shared between
+        cases. The default is None.
 
     Returns
     -------
@@ -193,5 +192,8 @@ def array_match(batt_power, batt_cap, array_length):
     for key in batt_cap:
         if(len(batt_cap[key]) < array_length):
             batt_cap[key] = np.pad(batt_cap[key],((0,array_length-len(batt_cap[key]))),'constant')
+    if store is not None:
+        store.intern_dict(batt_power)
+        store.intern_dict(batt_cap)
     return batt_power, batt_cap
     
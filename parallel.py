@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers to run the dispatch in parallel. Arrays are handed to worker processes
+through shared memory so the 306,600 hour inputs and outputs are not pickled
+for every task, thread workers use the arrays directly.
+
+Process workers re-import the simulation modules, scripts that use the process
+executor need the usual if __name__ == '__main__': guard on Windows. Pools are
+created once per run with make_pool and passed to run_day_chunks and 
+run_cases, so the workers are started (and import the modules) once rather 
+than for every case or chunk of days.
+
+run_cases runs whole cases of a sweep in a process pool, the shared rates and
+each case's inputs are put in shared memory and each case's hourly output is
+written back through shared memory.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def share_array(array):
+    """
+    Copy an array into a new shared memory block.
+
+    Parameters
+    ----------
+    array : array
+        numpy array to share.
+
+    Returns
+    -------
+    shm : SharedMemory
+        shared memory block, the caller closes and unlinks it when done.
+    shared : array
+        numpy array backed by the shared memory block.
+    spec : tuple
+        name, shape and dtype used by attach_array in the workers.
+
+    """
+    array = np.asarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[...] = array
+    spec = (shm.name, array.shape, array.dtype.str)
+    return shm, shared, spec
+
+
+def attach_array(spec):
+    """
+    Attach to a shared memory block created by share_array.
+
+    Parameters
+    ----------
+    spec : tuple
+        name, shape and dtype from share_array.
+
+    Returns
+    -------
+    shm : SharedMemory
+        shared memory block, close (do not unlink) when done.
+    shared : array
+        numpy array backed by the shared memory block.
+
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    shared = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return shm, shared
+
+
+def release_array(shm, unlink=True):
+    """
+    Close a shared memory block and, for the creating process, unlink it.
+    """
+    shm.close()
+    if unlink:
+        shm.unlink()
+
+
+def make_pool(workers, executor='process'):
+    """
+    Create the pool of workers for a run, shared by the cases and chunks of
+    days dispatched in it. The caller shuts the pool down when the run is done
+    (or uses it as a context manager).
+
+    Parameters
+    ----------
+    workers : int
+        number of worker processes or threads.
+    executor : string, optional
+        'process' or 'thread'. The default is 'process'.
+
+    Returns
+    -------
+    pool : concurrent.futures.Executor
+        process or thread pool.
+
+    """
+    if executor == 'thread':
+        return ThreadPoolExecutor(max_workers=workers)
+    if executor == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f'unknown executor: {executor}')
+
+
+def _run_chunk(func, days, block_spec, output_spec, args_spec):
+    # Worker process side, attach to the shared input, output and array 
+    # arguments and dispatch the days of the chunk in place.
+    block_shm, dispatch_block = attach_array(block_spec)
+    output_shm, output_block = attach_array(output_spec)
+    args_shms, args = attach_dict(args_spec)
+    try:
+        func(days, dispatch_block, output_block, *[args[i] for i in range(len(args))])
+    finally:
+        # Views must be released before the shared memory can be closed.
+        del dispatch_block, output_block, args
+        release_array(block_shm, unlink=False)
+        release_array(output_shm, unlink=False)
+        for shm in args_shms:
+            release_array(shm, unlink=False)
+
+
+def run_day_chunks(func,
+                   days,
+                   dispatch_block,
+                   output_block,
+                   args,
+                   workers,
+                   executor='process',
+                   chunks_per_worker=4,
+                   pool=None):
+    """
+    Split the days into contiguous ranges and dispatch them in a process or
+    thread pool, each worker writing its days into the shared output. With a
+    process pool the dispatch block, the output and the array arguments 
+    (arbitrage days, hour orders) are put in shared memory once for the call,
+    the tasks only carry their handles.
+
+    Parameters
+    ----------
+    func : function
+        module level function called as func(days, dispatch_block,
+        output_block, *args), writing the output for the days in place
+        (pvs.dispatch_days).
+    days : array
+        indices of the days to dispatch.
+    dispatch_block : array
+        (days, 24, 25) dispatch array.
+    output_block : array
+        (days, 24, 15) output array, filled in place for the given days.
+    args : tuple
+        remaining arguments for func, arrays are shared with the workers.
+    workers : int
+        number of worker processes or threads.
+    executor : string, optional
+        'process' or 'thread', used when no pool is given. The default is 
+        'process'.
+    chunks_per_worker : int, optional
+        day ranges per worker, more chunks balance uneven days. The default is 4.
+    pool : concurrent.futures.Executor, optional
+        pool from make_pool reused for the run. The default is None, which 
+        creates a pool for the call.
+
+    Returns
+    -------
+    None.
+
+    """
+    chunks = [chunk for chunk in np.array_split(np.asarray(days), workers*chunks_per_worker)
+              if len(chunk) > 0]
+    if len(chunks) == 0:
+        return
+    if pool is None:
+        # Pool for this call only.
+        with make_pool(workers, executor) as pool:
+            run_day_chunks(func, days, dispatch_block, output_block, args, workers,
+                           chunks_per_worker=chunks_per_worker, pool=pool)
+        return
+    if isinstance(pool, ThreadPoolExecutor):
+        # Threads share the arrays directly, the compiled and numpy kernels
+        # release the GIL while they run.
+        futures = [pool.submit(func, chunk, dispatch_block, output_block, *args)
+                   for chunk in chunks]
+        for future in futures:
+            future.result()
+        return
+    block_shm, shared_block, block_spec = share_array(dispatch_block)
+    output_shm, shared_output, output_spec = share_array(output_block)
+    # Arbitrage days and hour orders are shared as well, only their handles
+    # are pickled with each task.
+    args_shms, args_spec = share_dict(dict(enumerate(args)))
+    try:
+        futures = [pool.submit(_run_chunk, func, chunk, block_spec, output_spec, args_spec)
+                   for chunk in chunks]
+        for future in futures:
+            future.result()
+        # Collect the dispatched days from the shared output.
+        days = np.concatenate(chunks)
+        output_block[days] = shared_output[days]
+    finally:
+        del shared_block, shared_output
+        release_array(block_shm)
+        release_array(output_shm)
+        for shm in args_shms:
+            release_array(shm)
+
+
+def share_dict(dictionary):
+    """
+    Copy the arrays held in a (nested) dictionary into shared memory.
+
+    Parameters
+    ----------
+    dictionary : dict
+        dictionary of arrays, nested dictionaries and plain values.
+
+    Returns
+    -------
+    shms : list
+        shared memory blocks created, released with release_array.
+    spec : dict
+        same keys as the dictionary, arrays are replaced with their 
+        share_array spec, other values are kept as is.
+
+    """
+    shms = []
+    spec = {}
+    for key, value in dictionary.items():
+        if isinstance(value, dict):
+            sub_shms, spec[key] = share_dict(value)
+            shms += sub_shms
+        elif isinstance(value, np.ndarray) and value.ndim > 0:
+            shm, shared, array_spec = share_array(value)
+            del shared
+            shms.append(shm)
+            spec[key] = ('shared array', array_spec)
+        else:
+            spec[key] = value
+    return shms, spec
+
+
+def attach_dict(spec):
+    """
+    Rebuild a dictionary shared with share_dict, the arrays are backed by the
+    shared memory blocks.
+
+    Returns
+    -------
+    shms : list
+        attached shared memory blocks, close (do not unlink) when done.
+    dictionary : dict
+        the shared dictionary.
+
+    """
+    shms = []
+    dictionary = {}
+    for key, value in spec.items():
+        if isinstance(value, dict):
+            sub_shms, dictionary[key] = attach_dict(value)
+            shms += sub_shms
+        elif isinstance(value, tuple) and len(value) == 2 and value[0] == 'shared array':
+            shm, dictionary[key] = attach_array(value[1])
+            shms.append(shm)
+        else:
+            dictionary[key] = value
+    return shms, dictionary
+
+
+def _run_case(func, shared_spec, case_spec, output_spec, args):
+    # Worker process side, attach to the shared and case inputs and the output,
+    # then run the case.
+    shared_shms, shared = attach_dict(shared_spec)
+    case_shms, case = attach_dict(case_spec)
+    if output_spec is not None:
+        output_shm, output = attach_array(output_spec)
+    else:
+        output_shm, output = None, None
+    try:
+        result = func(shared, case, output, *args)
+    finally:
+        # Views must be released before the shared memory can be closed.
+        del shared, case, output
+        for shm in shared_shms + case_shms:
+            release_array(shm, unlink=False)
+        if output_shm is not None:
+            release_array(output_shm, unlink=False)
+    return result
+
+
+def run_cases(func,
+              shared,
+              cases,
+              output_shapes,
+              args,
+              workers,
+              max_pending=None,
+              pool=None,
+              collect=np.array):
+    """
+    Run the cases of a sweep in a process pool, yielding the results in case 
+    order. Only max_pending cases have their inputs and outputs in shared 
+    memory at a time, and a lazy case source is only read as cases are 
+    submitted, so large sweeps do not hold every case in memory.
+
+    Parameters
+    ----------
+    func : function
+        module level function called as func(shared, case, output, *args), 
+        writing the hourly output of the case into output in place (output is
+        None for cases without an output shape) and returning any other result.
+        The result must not hold views of the shared arrays, the shared memory
+        is closed once func returns.
+    shared : dict
+        inputs shared by every case (rates).
+    cases : dict or iterable
+        inputs of each case by case name, or an iterable of (case name, 
+        inputs) pairs read as the cases are submitted.
+    output_shapes : dict or function
+        shape of the hourly output by case name, or None to only return the 
+        function result. A function is called with the case inputs.
+    args : tuple
+        remaining arguments for func.
+    workers : int
+        number of worker processes.
+    max_pending : int, optional
+        cases submitted ahead of the one being collected. The default is None,
+        which uses 2 x workers.
+    pool : concurrent.futures.Executor, optional
+        pool from make_pool reused across the sweep, only the shared memory 
+        handles of the rates and each case are sent to it. The default is 
+        None, which creates a process pool for the call.
+    collect : function, optional
+        called with the shared output of a case to copy it out of shared 
+        memory before the block is released, e.g. into a 
+        dispatch_result.DispatchResult. The default is np.array.
+
+    Yields
+    ------
+    key : string
+        case name, in the order of cases.
+    output : array
+        hourly output of the case copied out of shared memory by collect, or 
+        None.
+    result : object
+        value returned by func.
+
+    """
+    if max_pending is None:
+        max_pending = 2*workers
+    if pool is None:
+        # Pool for this call only.
+        with make_pool(workers) as pool:
+            yield from run_cases(func, shared, cases, output_shapes, args, workers,
+                                 max_pending=max_pending, pool=pool, collect=collect)
+        return
+    items = iter(cases.items() if isinstance(cases, dict) else cases)
+    shared_shms, shared_spec = share_dict(shared)
+    pending = deque()
+    try:
+        exhausted = False
+        while True:
+            # Keep the pool busy with the next cases while collecting in order.
+            while not exhausted and len(pending) < max_pending:
+                next_case = next(items, None)
+                if next_case is None:
+                    exhausted = True
+                    break
+                next_key, case = next_case
+                shape = (output_shapes(case) if callable(output_shapes) 
+                         else output_shapes[next_key])
+                case_shms, case_spec = share_dict(case)
+                del case
+                if shape is not None:
+                    output_shm, shared_output, output_spec = share_array(np.zeros(shape))
+                else:
+                    output_shm, shared_output, output_spec = None, None, None
+                future = pool.submit(_run_case, func, shared_spec, case_spec,
+                                     output_spec, args)
+                pending.append((next_key, future, case_shms, output_shm, shared_output))
+            if len(pending) == 0:
+                break
+            key, future, case_shms, output_shm, shared_output = pending.popleft()
+            try:
+                result = future.result()
+                output = None if shared_output is None else collect(shared_output)
+            finally:
+                del shared_output
+                for shm in case_shms:
+                    release_array(shm)
+                if output_shm is not None:
+                    release_array(output_shm)
+            yield key, output, result
+    finally:
+        # Release the cases still pending after an error.
+        while pending:
+            key, future, case_shms, output_shm, shared_output = pending.popleft()
+            future.cancel()
+            del shared_output
+            for shm in case_shms:
+                release_array(shm)
+            if output_shm is not None:
+                release_array(output_shm)
+        for shm in shared_shms:
+            release_array(shm)
@@ -10,10 +10,26 @@ Created on Fri Sep 17 12:59:25 2021
 import numpy as np
 import time 
 import dispatch as nd
+import dispatch_numba as dn
+import parallel as par
+import rate_functions as rf
+import screening as sc
+import horizon as hz
+import dispatch_result as dr
+import checkpoint as ckpt
+import retention as rt
+import scheduling as sch
 import gc 
+
+# Names of the dispatch output columns.
+OUTPUT_KEYS = dr.OUTPUT_COLUMNS
     
 
-def arbitrage(PV_min_energy_chg_threshold, ppa_min_delta, case_list, project_rates, batt_limit_POI, batt_hours_POI):
+def arbitrage(PV_min_energy_chg_threshold, ppa_min_delta, case_list, project_rates, batt_limit_POI, batt_hours_POI,
+              engine='loop', cache=None, workers=1, executor='process',
+              screening_days=None, horizon_step=None, aug_sched=None, case_workers=1,
+              output_dtype=np.float64, checkpoint=None, retention=None, result_cache=None,
+              pool=None):
     """
     Function to reduce configuration page requirements to run simulations. Takes 
     the charge and arbitrage threshold variables and runs the each case simulation,
@@ -21,50 +37,374 @@ def arbitrage(PV_min_energy_chg_threshold, ppa_min_delta, case_list, project_rat
 
     Parameters
     ----------
-    PV_min_energy_chg_threshold : float
+    PV_min_energy_chg_threshold : float or array
         Minimum PV energy to charge the battery.
-    ppa_min_delta : float
+    ppa_min_delta : float or array
         Minimum delta between highest and lowest daily combined rate to charge 
         and discharge the battery
-    case_list : dict
-        Dictionary of all the cases to perform arbitrage on.
+    case_list : dict or iterable
+        Dictionary of all the cases to perform arbitrage on, or a lazy case 
+        source yielding (case name, case) pairs (functions.iter_cases). Cases
+        from a lazy source are built as they are dispatched and drop their 
+        hourly inputs once done, so only the cases in flight are held.
     project_rates : dict
         Dictionary of hourly values for all rates, can be performed using only 
         the combined rate if necessary
-    batt_limit_POI: int
+    batt_limit_POI: int or array
         PCS limit at the POI.
-    batt_hours_POI: int
+    batt_hours_POI: int or array
         hours to dispatch at the POI limit.
+    engine : string, optional
+        dispatch engine passed to pvs_ac_mv, 'loop', 'batch' or 'numba'. 
+        The default is 'loop'.
+    cache : dispatch_cache.DailyDispatchCache, optional
+        daily dispatch cache shared by all cases, see pvs_ac_mv. The default 
+        is None.
+    workers : int, optional
+        number of workers each case's days are split across, see pvs_ac_mv.
+        The default is 1.
+    executor : string, optional
+        'process' or 'thread' pool for the workers. The default is 'process'.
+    pool : concurrent.futures.Executor, optional
+        pool from parallel.make_pool reused for the run, e.g. by the rounds 
+        of a sweep. The default is None, which creates one pool for the run 
+        when workers > 1.
+    screening_days : int, optional
+        run each case in screening mode on this many representative days (see
+        pvs_ac_mv), storing the result under 'screening output' instead of 
+        'dispatch output'. Pass screening.shortlist of the screened cases back
+        through arbitrage for the full dispatch. The default is None.
+    horizon_step : int, optional
+        decimated horizon mode, dispatch year 1, every horizon_step years and 
+        the years around augmentation / end of life events and interpolate the
+        rest (see pvs_ac_mv), storing the result under 'horizon output'. The 
+        default is None.
+    aug_sched : list, optional
+        augmentation schedule passed to define_cases, its years are always 
+        dispatched in the decimated horizon mode. The default is None.
+    case_workers : int, optional
+        number of worker processes to run the cases across. The rates and each
+        case's inputs and hourly output are passed through shared memory, the
+        results are stored in case order. Inside the case workers the days are
+        dispatched serially. The pool (created for the run when not given) is 
+        used for the cases. cache and result_cache cannot be combined with 
+        case_workers and raise a ValueError. The default is 1.
+    output_dtype : numpy dtype, optional
+        storage type of the hourly dispatch output, see pvs_ac_mv. The default
+        is np.float64.
+    checkpoint : string or checkpoint.SweepCheckpoint, optional
+        folder (or store) each finished case is written to. Cases already in 
+        the store are loaded (memory mapped) instead of dispatched, so an 
+        interrupted sweep restarts where it stopped. The default is None.
+    retention : retention.RetentionPolicy, optional
+        aggregate only retention for large sweeps, each finished case is 
+        reduced to annual / monthly totals and KPIs (stored under 'dispatch 
+        aggregates') and the hourly output is only kept for the cases selected
+        by the policy. Applies to the full dispatch, the checkpoint still 
+        stores every case's hourly output. The default is None, which keeps 
+        every hourly output.
+    result_cache : result_cache.DispatchResultCache, optional
+        persistent cache of case results passed to pvs_ac_mv, cases with 
+        unchanged inputs are loaded from it instead of dispatched. Used by the
+        serial full dispatch. The default is None.
+
+    Passing arrays for the threshold, delta, limit or hours (broadcast 
+    together, parameter_grid builds every combination) makes them sweep axes,
+    each case is prepared once and evaluated against every point with 
+    pvs_ac_mv_points. The 'dispatch output' gets a leading points axis and the
+    points are stored under 'sweep points'. Sweep points run the full dispatch
+    serially, without screening, horizon, case_workers or retention.
+
+    The cost of each case is estimated from its battery and arbitrage days 
+    (scheduling.case_cost), with case_workers the most expensive cases are 
+    dispatched first (a lazy source is dispatched in the order it yields). 
+    The predicted and actual dispatch time of each case is stored under 
+    'run time' and printed once the sweep finishes.
 
     Returns
     -------
-    None.
+    case_list : dict
+        for a lazy case source, the finished cases by name holding their 
+        outputs and case parameters. None when case_list is a dictionary, which
+        is updated in place.
 
     """
-    # iterate through each case in the simulation sweep.
-    for key in case_list:
-        start=time.time()
-        # Calculate the minimum PV energy to charge the battery.
-        PV_min_energy_chg = (max(case_list[key]['degraded array energy'])*
-                                    PV_min_energy_chg_threshold)
-        # Perform arbitrage for the simulation case.
-        output = pvs_ac_mv(PV_min_energy_chg,
-                                ppa_min_delta,
-                                batt_limit_POI,
-                                batt_hours_POI,
-                                case_list[key]['degraded array energy'],
-                                project_rates,
-                                case_list[key]['POI'],
-                                case_list[key]['losses'],
-                                case_list[key]['limits'],
-                                case_list[key]['battery capacity'],
-                                case_list[key]['battery power'])
-        # Update the case in the dictionary with the dispatch output.
-        case_list[key]['dispatch output'] = output
-        print(f'parameter declaration and full arbitrage time: {time.time()-start} seconds')
-        # call the python garbage collector
-        gc.collect()
-        
+    # Key the case output is stored under for the sweep mode.
+    if screening_days is not None:
+        output_key = 'screening output'
+    elif horizon_step is not None:
+        output_key = 'horizon output'
+    else:
+        output_key = 'dispatch output'
+    if case_workers > 1 and (cache is not None or result_cache is not None):
+        # The daily cache lives in this process and the result cache index is
+        # written by one process, neither reaches the case workers.
+        raise ValueError('case_workers runs the cases without the daily cache or '
+                         'result cache, pass case_workers=1 to use them')
+    # Sweep points of the dispatch parameters, evaluated together for each case.
+    points = None
+    if any(np.ndim(value) > 0 for value in (PV_min_energy_chg_threshold, ppa_min_delta,
+                                            batt_limit_POI, batt_hours_POI)):
+        if (screening_days is not None or horizon_step is not None or 
+            case_workers > 1 or retention is not None):
+            raise ValueError('sweep points run the full dispatch serially, without '
+                             'screening, horizon, case_workers or retention')
+        points = dict(zip(['PV min energy chg threshold', 'ppa min delta',
+                           'batt limit POI', 'batt hours POI'],
+                          [np.atleast_1d(value).astype(float) 
+                           for value in np.broadcast_arrays(PV_min_energy_chg_threshold,
+                                                            ppa_min_delta,
+                                                            batt_limit_POI,
+                                                            batt_hours_POI)]))
+    if isinstance(checkpoint, str):
+        checkpoint = ckpt.SweepCheckpoint(checkpoint,
+                                          parameters={'PV min energy chg threshold': np.asarray(PV_min_energy_chg_threshold).tolist(),
+                                                      'ppa min delta': np.asarray(ppa_min_delta).tolist(),
+                                                      'batt limit POI': np.asarray(batt_limit_POI).tolist(),
+                                                      'batt hours POI': np.asarray(batt_hours_POI).tolist(),
+                                                      'output': output_key,
+                                                      'screening days': screening_days,
+                                                      'horizon step': horizon_step,
+                                                      'aug sched': aug_sched,
+                                                      'output dtype': np.dtype(output_dtype).name})
+    # A lazy case source is read one case at a time into a new dictionary of
+    # results.
+    lazy = not isinstance(case_list, dict)
+    source = iter(case_list) if lazy else iter(list(case_list.items()))
+    if lazy:
+        case_list = {}
+    # Index the daily combined rate once, every case shares the rates.
+    rate_index = rf.daily_rate_index(project_rates, 
+                                     ppa_min_delta if points is None else points['ppa min delta'][0])
+
+    def pending():
+        # Cases left to dispatch, finished cases are read back from the checkpoint.
+        for key, case in source:
+            case_list[key] = case
+            if checkpoint is not None and checkpoint.done(key):
+                stored_key, output = checkpoint.load(key)
+                case_list[key][stored_key] = output
+                if points is not None:
+                    case_list[key]['sweep points'] = points
+                if retention is not None and stored_key == 'dispatch output':
+                    retention.apply(case_list, key)
+                if lazy:
+                    _release_inputs(case)
+                print(f'{key} loaded from checkpoint')
+            else:
+                yield key
+
+    def horizon_years(key):
+        # Years to dispatch for the case in the decimated horizon mode.
+        if horizon_step is None:
+            return None
+        return hz.sample_years(len(case_list[key]['degraded array energy'])//8760,
+                               horizon_step,
+                               aug_sched=aug_sched,
+                               capacity=case_list[key]['battery capacity']['capacity'])
+
+    if lazy:
+        # Cases are dispatched as they are built, costed one at a time.
+        costs = {}
+        remaining = pending()
+    else:
+        # Estimate the cost of each case, most expensive first.
+        remaining, costs = sch.schedule(case_list, list(pending()), rate_index['arbitrage days'])
+    seconds = {}
+    if case_workers > 1:
+        start = time.time()
+
+        def cases():
+            # Only the inputs used by the dispatch are sent to the workers,
+            # built as the cases are submitted.
+            for key in remaining:
+                if key not in costs:
+                    costs[key] = sch.case_cost(case_list[key], rate_index['arbitrage days'])
+                yield key, {'degraded array energy': np.asarray(case_list[key]['degraded array energy']),
+                            'POI': case_list[key]['POI'],
+                            'losses': case_list[key]['losses'],
+                            'limits': case_list[key]['limits'],
+                            'battery capacity': case_list[key]['battery capacity'],
+                            'battery power': case_list[key]['battery power'],
+                            'horizon years': horizon_years(key)}
+
+        # Hourly outputs come back through shared memory, the screening and 
+        # horizon totals are returned directly.
+        full_dispatch = screening_days is None and horizon_step is None
+
+        def output_shape(case):
+            return (len(case['degraded array energy']),15) if full_dispatch else None
+
+        def collect(output):
+            # Copied once out of shared memory into the result buffer.
+            return dr.DispatchResult.from_array(output, dtype=output_dtype)
+
+        # Cases are submitted most expensive first so the workers do not end 
+        # on a long case.
+        for key, output, (result, seconds[key]) in par.run_cases(_dispatch_shared_case,
+                                                 {'project rates': project_rates,
+                                                  'rate index': rate_index},
+                                                 cases(),
+                                                 output_shape,
+                                                 (PV_min_energy_chg_threshold,
+                                                  ppa_min_delta,
+                                                  batt_limit_POI,
+                                                  batt_hours_POI,
+                                                  engine,
+                                                  screening_days),
+                                                 case_workers,
+                                                 pool=pool,
+                                                 collect=collect):
+            if full_dispatch:
+                result = output
+            case_list[key][output_key] = result
+            if checkpoint is not None:
+                checkpoint.save(key, output_key, result, ckpt.case_metadata(case_list[key]))
+            if retention is not None and full_dispatch:
+                # Reduce the case to aggregates before the next one arrives.
+                retention.apply(case_list, key)
+            if lazy:
+                _release_inputs(case_list[key])
+            del output, result
+            print(f'{key} complete, sweep time: {time.time()-start} seconds')
+        _schedule_report(case_list, costs, seconds)
+        return case_list if lazy else None
+    # One pool for the days of every case of the run.
+    own_pool = pool is None and workers > 1
+    if own_pool:
+        pool = par.make_pool(workers, executor)
+    try:
+        # iterate through each case in the simulation sweep.
+        for key in remaining:
+            start=time.time()
+            if key not in costs:
+                costs[key] = sch.case_cost(case_list[key], rate_index['arbitrage days'])
+            # Calculate the minimum PV energy to charge the battery.
+            PV_min_energy_chg = (max(case_list[key]['degraded array energy'])*
+                                        PV_min_energy_chg_threshold)
+            # Perform arbitrage for the simulation case.
+            case_start = time.time()
+            if points is not None:
+                # Evaluate the case against every sweep point, sharing the prep.
+                output = pvs_ac_mv_points(max(case_list[key]['degraded array energy'])*
+                                          points['PV min energy chg threshold'],
+                                          points['ppa min delta'],
+                                          points['batt limit POI'],
+                                          points['batt hours POI'],
+                                          case_list[key]['degraded array energy'],
+                                          project_rates,
+                                          case_list[key]['POI'],
+                                          case_list[key]['losses'],
+                                          case_list[key]['limits'],
+                                          case_list[key]['battery capacity'],
+                                          case_list[key]['battery power'],
+                                          engine=engine,
+                                          cache=cache,
+                                          workers=workers,
+                                          executor=executor,
+                                          rate_index=rate_index,
+                                          output_dtype=output_dtype,
+                                          pool=pool)
+                case_list[key]['sweep points'] = points
+            else:
+                output = pvs_ac_mv(PV_min_energy_chg,
+                                        ppa_min_delta,
+                                        batt_limit_POI,
+                                        batt_hours_POI,
+                                        case_list[key]['degraded array energy'],
+                                        project_rates,
+                                        case_list[key]['POI'],
+                                        case_list[key]['losses'],
+                                        case_list[key]['limits'],
+                                        case_list[key]['battery capacity'],
+                                        case_list[key]['battery power'],
+                                        engine=engine,
+                                        cache=cache,
+                                        workers=workers,
+                                        executor=executor,
+                                        pool=pool,
+                                        rate_index=rate_index,
+                                        screening_days=screening_days,
+                                        horizon_years=horizon_years(key),
+                                        output_dtype=output_dtype,
+                                        result_cache=result_cache)
+            seconds[key] = time.time() - case_start
+            # Update the case in the dictionary with the dispatch output.
+            case_list[key][output_key] = output
+            if checkpoint is not None:
+                # Write the finished case to disk.
+                checkpoint.save(key, output_key, output, ckpt.case_metadata(case_list[key]))
+            if retention is not None and output_key == 'dispatch output':
+                # Reduce the case to aggregates, dropping the hourly output unless
+                # the policy keeps it.
+                retention.apply(case_list, key)
+            if lazy:
+                _release_inputs(case_list[key])
+            del output
+            print(f'parameter declaration and full arbitrage time: {time.time()-start} seconds')
+    finally:
+        if own_pool:
+            pool.shutdown()
+    # call the python garbage collector once the sweep is done, the dispatch 
+    # workspace is reused so the cases leave nothing to collect in between.
+    gc.collect()
+    _schedule_report(case_list, costs, seconds)
+    return case_list if lazy else None
+
+# Hourly case inputs from functions.define_cases.
+CASE_INPUTS = ['array energy', 'degraded array energy', 'battery capacity',
+               'battery power', 'losses', 'limits']
+
+def _release_inputs(case):
+    # Drop the hourly inputs of a dispatched case, keeping its parameters and 
+    # outputs.
+    for key in CASE_INPUTS:
+        case.pop(key, None)
+
+def _schedule_report(case_list, costs, seconds):
+    # Store and print the predicted vs actual dispatch time of each case.
+    report = sch.schedule_report(costs, seconds)
+    for key, run_time in report.items():
+        case_list[key]['run time'] = run_time
+        print(f"{key} predicted: {run_time['predicted seconds']:.2f} seconds, "
+              f"actual: {run_time['actual seconds']:.2f} seconds")
+
+def _dispatch_shared_case(shared,
+                          case,
+                          output,
+                          PV_min_energy_chg_threshold,
+                          ppa_min_delta,
+                          batt_limit_POI,
+                          batt_hours_POI,
+                          engine,
+                          screening_days):
+    # Case worker for parallel.run_cases, runs pvs_ac_mv on the shared inputs
+    # and copies the hourly output into the shared output array. Returns the 
+    # result (None for the hourly output) and the dispatch time.
+    start = time.time()
+    PV_min_energy_chg = (max(case['degraded array energy'])*
+                         PV_min_energy_chg_threshold)
+    result = pvs_ac_mv(PV_min_energy_chg,
+                       ppa_min_delta,
+                       batt_limit_POI,
+                       batt_hours_POI,
+                       case['degraded array energy'],
+                       shared['project rates'],
+                       case['POI'],
+                       case['losses'],
+                       case['limits'],
+                       case['battery capacity'],
+                       case['battery power'],
+                       engine=engine,
+                       rate_index=shared['rate index'],
+                       screening_days=screening_days,
+                       horizon_years=case['horizon years'])
+    if output is not None:
+        output[...] = result.data
+        result = None
+    return result, time.time() - start
+
+
 def pvs_ac_mv(PV_min_energy_chg,
               ppa_min_delta,
               batt_limit_POI,
@@ -75,7 +415,20 @@ def pvs_ac_mv(PV_min_energy_chg,
               loss_dict, 
               limits_dict,
               batt_cap,
-              batt_power):
+              batt_power,
+              engine='loop',
+              cache=None,
+              idle_fast_path=True,
+              workers=1,
+              executor='process',
+              pool=None,
+              rate_index=None,
+              screening_days=None,
+              screening_check_days=None,
+              horizon_years=None,
+              chunk_days=365,
+              output_dtype=np.float64,
+              result_cache=None):
     """
     Function to slice daily chunks from input arrays and run the arbitrage 
     function for the battery system
@@ -104,11 +457,69 @@ def pvs_ac_mv(PV_min_energy_chg,
         dictionary holding capacity and round trip efficiency for the battery system
     batt_power : dictionary
         dictionary holding max power, charge and discharge eta, and dod_np for the battery system.
+    engine : string, optional
+        'loop' runs dispatch.daily_arbitrage one day at a time, 'batch' runs 
+        dispatch.batch_arbitrage on all days at once, 'numba' runs the compiled 
+        dispatch_numba.pvs_ac_mv_nb, falling back to 'loop' when Numba is not 
+        installed. The default is 'loop'.
+    cache : dispatch_cache.DailyDispatchCache, optional
+        cache of daily outputs, days with matching inputs reuse the stored 
+        output instead of being dispatched. Matching is exact unless the cache
+        opts in to approximate keys (rtol > 0), which changes the results. Works
+        with every engine, but keying each day costs more than the 'numba' 
+        dispatch of the day, best used with the 'loop' engine. The default is
+        None.
+    idle_fast_path : boolean, optional
+        fill days where the battery stays empty (dispatch.idle_days) with the 
+        PV only outputs and only send the remaining days through the dispatch 
+        engine. The default is True.
+    workers : int, optional
+        number of workers to split the days across, days are independent 
+        since the battery starts each day empty. The cache is only used with
+        a single worker. The default is 1.
+    executor : string, optional
+        'process' (inputs and outputs held in shared memory) or 'thread' 
+        (best with the 'numba' and 'batch' engines). The default is 'process'.
+    pool : concurrent.futures.Executor, optional
+        pool from parallel.make_pool to dispatch the days in, reused between 
+        cases. The default is None, which creates one pool for the case when 
+        workers > 1.
+    rate_index : dict, optional
+        daily spread, hour orders and arbitrage days of the combined rate from
+        rate_functions.daily_rate_index. The default is None, which indexes 
+        project_rates for the case.
+    screening_days : int, optional
+        screening mode, cluster the days of the run (screening.
+        representative_days) and dispatch only this many representative days,
+        returning weighted totals (screening.weighted_totals) instead of the 
+        hourly output. The default is None, which dispatches every day.
+    screening_check_days : int, optional
+        number of randomly sampled days dispatched in full in screening mode 
+        to estimate the error of the weighted PVS and battery totals. The 
+        default is None, which uses screening_days.
+    horizon_years : array, optional
+        decimated horizon mode, dispatch only these years (0 = year 1, from 
+        horizon.sample_years) and interpolate the annual totals of the others
+        (horizon.interpolate_years), horizon.deviation_report compares the 
+        result against a full run. The default is None.
+    chunk_days : int, optional
+        number of days built into a dense dispatch block at a time, only the
+        compact inputs and one chunk of dense inputs are held. Smaller chunks
+        hold less memory for the case, None builds every day at once. The 
+        default is 365.
+    output_dtype : numpy dtype, optional
+        storage type of the hourly output, np.float32 halves the memory held 
+        by the result. The default is np.float64.
+    result_cache : result_cache.DispatchResultCache, optional
+        persistent cache of case results keyed on the dispatch inputs, 
+        thresholds, engine and code version. A case found in the cache is 
+        memory mapped (read only) instead of dispatched, new results are 
+        stored. Used by the full dispatch only. The default is None.
 
     Returns
     -------
-    dispatch_output : dictionary
-        dictionary holding hourly outputs for the following data:
+    dispatch_output : dispatch_result.DispatchResult
+        hourly outputs by name (read like a dictionary) for the following data:
             PV only plant energy
             PVS POI output - PV
             PVS POI output - battery,
@@ -124,59 +535,555 @@ def pvs_ac_mv(PV_min_energy_chg,
             hour
             inverter output
             clip harvesting
+        in screening mode, the dictionary from screening.weighted_totals, in
+        decimated horizon mode the dictionary from horizon.interpolate_years.
 
     """
+    # Prepare the case for dispatch, holding the time varying columns as 
+    # hourly arrays and the constant columns as scalars, dense day blocks are 
+    # built from it as they are dispatched.
+    (compact, 
+     engine, 
+     arbitrage_days, 
+     disch_order) = _prepare_case(PV_min_energy_chg,
+                                  ppa_min_delta,
+                                  array_energy, 
+                                  project_rates, 
+                                  loss_dict, 
+                                  limits_dict,
+                                  batt_cap,
+                                  batt_power,
+                                  engine,
+                                  rate_index)
+    n_days = compact['hours']//24
+    if screening_days is not None:
+        # Clustering looks at every day of the run.
+        dispatch_block = dispatch_block_days(compact, slice(None))
+        chg_order = nd.charge_order(disch_order, PV_min_energy_chg, dispatch_block)
+        # Dispatch one real day per cluster of similar days, and the check 
+        # days in full to estimate the error of the weighted totals.
+        representative = sc.representative_days(dispatch_block, screening_days)
+        check = sc.check_days(n_days, 
+                              screening_days if screening_check_days is None else screening_check_days)
+        rep_days = np.concatenate((representative['days'], check))
+        rep_output = np.empty([len(rep_days),24,15])
+        dispatch_days(np.arange(len(rep_days)),
+                      dispatch_block[rep_days],
+                      rep_output,
+                      engine,
+                      arbitrage_days[rep_days],
+                      POI,
+                      PV_min_energy_chg,
+                      ppa_min_delta,
+                      batt_limit_POI,
+                      batt_hours_POI,
+                      chg_order[rep_days],
+                      disch_order[rep_days],
+                      cache=cache)
+        # PV only energy of every day, compared against the weighted total.
+        _, _, exact_pv_only, _ = nd.pv_limits(dispatch_block)
+        n_rep = len(representative['days'])
+        return sc.weighted_totals(representative, 
+                                  rep_output[:n_rep], 
+                                  exact_pv_only, 
+                                  OUTPUT_KEYS,
+                                  check=check,
+                                  check_output=rep_output[n_rep:])
+    if horizon_years is not None:
+        # Dispatch every day of the sampled years, only those days are built.
+        sampled = hz.sample_days(horizon_years)
+        sample_block = dispatch_block_days(compact, sampled)
+        sample_output = np.empty([len(sampled),24,15])
+        dispatch_days(np.arange(len(sampled)),
+                      sample_block,
+                      sample_output,
+                      engine,
+                      arbitrage_days[sampled],
+                      POI,
+                      PV_min_energy_chg,
+                      ppa_min_delta,
+                      batt_limit_POI,
+                      batt_hours_POI,
+                      nd.charge_order(disch_order[sampled], PV_min_energy_chg, sample_block),
+                      disch_order[sampled],
+                      cache=cache)
+        return hz.interpolate_years(horizon_years,
+                                    sample_output,
+                                    n_days//365,
+                                    OUTPUT_KEYS)
+    if result_cache is not None:
+        # Load the case from the cache when it was dispatched before.
+        cache_key = result_cache.key(compact,
+                                     POI,
+                                     PV_min_energy_chg,
+                                     ppa_min_delta,
+                                     batt_limit_POI,
+                                     batt_hours_POI,
+                                     engine,
+                                     output_dtype,
+                                     cache)
+        output = result_cache.get(cache_key)
+        if output is not None:
+            return output
     # Create empty output container, at this time only 12 values are used by 
     # the matlab code.
-    output = np.empty([len(array_energy),15])
-    start = time.time()
-    # Prepare the case for dispatch, converting dictionary held values to a 
-    # 35 year hourly array for addressing in simulation.
-    dispatch_array = dispatch_prep(array_energy, 
-                                   project_rates, 
-                                   loss_dict, 
-                                   limits_dict,
-                                   batt_cap,
-                                   batt_power)
-    # Slice the full run array into 24 hour arrays and send them through the 
-    # daily arbitrage function.
-    for index in range(0,len(array_energy),24):
-        # slice appropriate data from holders.
-        daily_array = dispatch_array[index:index+24,:]
-        # Determine if the rate delta for the day meets arbitrage requirements.
-        arbitrage = (max(daily_array[:,2]) - min(daily_array[:,2])
-                        > ppa_min_delta)
-        # Run the mv-ac coupled dispatch function for each day.
-        daily_out = nd.daily_arbitrage(arbitrage,
-                                    POI,
-                                    PV_min_energy_chg,
+    output = dr.DispatchResult(len(array_energy), dtype=output_dtype)
+    # Dispatch the run in chunks of days, written into the output by day.
+    output_block = output.days
+    for chunk, chunk_output in _dispatch_chunks(compact,
+                                                engine,
+                                                arbitrage_days,
+                                                disch_order,
+                                                POI,
+                                                PV_min_energy_chg,
+                                                ppa_min_delta,
+                                                batt_limit_POI,
+                                                batt_hours_POI,
+                                                n_days if chunk_days is None else chunk_days,
+                                                cache,
+                                                idle_fast_path,
+                                                workers,
+                                                executor,
+                                                pool,
+                                                output_block=output_block):
+        pass
+    if result_cache is not None:
+        result_cache.put(cache_key, output)
+            
+    return output
+
+
+def pvs_ac_mv_stream(PV_min_energy_chg,
+                     ppa_min_delta,
+                     batt_limit_POI,
+                     batt_hours_POI,
+                     array_energy, 
+                     project_rates, 
+                     POI, 
+                     loss_dict, 
+                     limits_dict,
+                     batt_cap,
+                     batt_power,
+                     block_days=365,
+                     engine='loop',
+                     cache=None,
+                     idle_fast_path=True,
+                     workers=1,
+                     executor='process',
+                     pool=None,
+                     rate_index=None,
+                     output_dtype=np.float64):
+    """
+    Generator version of pvs_ac_mv, yielding the dispatch output one block of
+    days at a time (a year by default). The dispatch inputs of each block are
+    built as it is reached and each block gets its own output, so the memory 
+    held does not grow with the length of the run.
+
+    Parameters
+    ----------
+    block_days : int, optional
+        number of days in each block. The default is 365.
+    other parameters : 
+        see pvs_ac_mv.
+
+    Yields
+    ------
+    days : slice
+        days of the run covered by the block.
+    block_output : dispatch_result.DispatchResult
+        hourly outputs of the block.
+
+    """
+    (compact, 
+     engine, 
+     arbitrage_days, 
+     disch_order) = _prepare_case(PV_min_energy_chg,
+                                  ppa_min_delta,
+                                  array_energy, 
+                                  project_rates, 
+                                  loss_dict, 
+                                  limits_dict,
+                                  batt_cap,
+                                  batt_power,
+                                  engine,
+                                  rate_index)
+    for chunk, chunk_output in _dispatch_chunks(compact,
+                                                engine,
+                                                arbitrage_days,
+                                                disch_order,
+                                                POI,
+                                                PV_min_energy_chg,
+                                                ppa_min_delta,
+                                                batt_limit_POI,
+                                                batt_hours_POI,
+                                                block_days,
+                                                cache,
+                                                idle_fast_path,
+                                                workers,
+                                                executor,
+                                                pool,
+                                                output_dtype=output_dtype):
+        yield chunk, chunk_output
+
+
+def parameter_grid(PV_min_energy_chg_threshold, ppa_min_delta, batt_limit_POI, batt_hours_POI):
+    """
+    Function to build the sweep points for every combination of the dispatch
+    parameter values.
+
+    Parameters
+    ----------
+    PV_min_energy_chg_threshold : float or list
+        values of the minimum PV energy to charge the battery threshold.
+    ppa_min_delta : float or list
+        values of the minimum daily rate delta.
+    batt_limit_POI: float or list
+        values of the PCS limit at the POI.
+    batt_hours_POI: float or list
+        values of the hours to dispatch at the POI limit.
+
+    Returns
+    -------
+    points : dict
+        (points) array of each parameter, the first parameter varying slowest,
+        to pass to arbitrage or pvs_ac_mv_points.
+
+    """
+    grid = np.meshgrid(np.atleast_1d(PV_min_energy_chg_threshold).astype(float),
+                       np.atleast_1d(ppa_min_delta).astype(float),
+                       np.atleast_1d(batt_limit_POI).astype(float),
+                       np.atleast_1d(batt_hours_POI).astype(float),
+                       indexing='ij')
+    points = {'PV min energy chg threshold': grid[0].ravel(),
+              'ppa min delta': grid[1].ravel(),
+              'batt limit POI': grid[2].ravel(),
+              'batt hours POI': grid[3].ravel()}
+    return points
+
+
+def pvs_ac_mv_points(PV_min_energy_chg,
+                     ppa_min_delta,
+                     batt_limit_POI,
+                     batt_hours_POI,
+                     array_energy, 
+                     project_rates, 
+                     POI, 
+                     loss_dict, 
+                     limits_dict,
+                     batt_cap,
+                     batt_power,
+                     engine='loop',
+                     cache=None,
+                     idle_fast_path=True,
+                     workers=1,
+                     executor='process',
+                     rate_index=None,
+                     chunk_days=365,
+                     output_dtype=np.float64,
+                     pool=None):
+    """
+    Batched version of pvs_ac_mv, evaluating one case against a set of sweep
+    points of the dispatch parameters. The dispatch inputs, the daily rate 
+    index and the PV only calculations are built once and shared by every 
+    point, charge orders, arbitrage days and idle days are built once per 
+    distinct parameter value.
+
+    Parameters
+    ----------
+    PV_min_energy_chg : float or array
+        minimum array energy required to initiate charging for each point.
+    ppa_min_delta : float or array
+        minimum daily rate delta for each point.
+    batt_limit_POI: float or array
+        PCS limit at the POI for each point.
+    batt_hours_POI: float or array
+        hours to dispatch at the POI limit for each point.
+    other parameters : 
+        see pvs_ac_mv, the parameter arrays are broadcast to a common (points)
+        shape.
+
+    Returns
+    -------
+    dispatch_output : dispatch_result.DispatchResult
+        hourly outputs with a leading points axis, result['POI meter PVS'] is
+        (points, hours) and result.point(index) gives the output of a point.
+
+    """
+    if pool is None and workers > 1:
+        # One pool for every chunk and point of the case.
+        with par.make_pool(workers, executor) as pool:
+            return pvs_ac_mv_points(PV_min_energy_chg,
                                     ppa_min_delta,
                                     batt_limit_POI,
                                     batt_hours_POI,
-                                    daily_array)
-        # Update the output array in the correct index for each day.
-        output[index:index+24,:] = daily_out
-        # Create the output dictionary, assigning keys to columns in the array.
-        dispatch_output = {
-            'PV only plant energy': output[:,0],
-            'PVS POI output - PV': output[:,1],
-            'PVS POI output - battery': output[:,2],
-            'battery SOC %': output[:,3],
-            'battery SOC MWh': output[:,4],
-            'node meter PVS': output[:,5],
-            'node meter PV': output[:,6],
-            'POI meter PVS': output[:,7],
-            'POI meter PV': output[:,8],
-            'battery charge state': output[:,9],
-            'charge sequence': output[:,10],
-            'discharge sequence': output[:,11],
-            'hour': output[:,12],
-            'inverter output': output[:,13],
-            'clip harvesting': output[:,14]}
-            
-            
-    return dispatch_output
+                                    array_energy, 
+                                    project_rates, 
+                                    POI, 
+                                    loss_dict, 
+                                    limits_dict,
+                                    batt_cap,
+                                    batt_power,
+                                    engine=engine,
+                                    cache=cache,
+                                    idle_fast_path=idle_fast_path,
+                                    workers=workers,
+                                    executor=executor,
+                                    rate_index=rate_index,
+                                    chunk_days=chunk_days,
+                                    output_dtype=output_dtype,
+                                    pool=pool)
+    (PV_min_energy_chg,
+     ppa_min_delta,
+     batt_limit_POI,
+     batt_hours_POI) = [np.atleast_1d(value).astype(float)
+                        for value in np.broadcast_arrays(PV_min_energy_chg,
+                                                         ppa_min_delta,
+                                                         batt_limit_POI,
+                                                         batt_hours_POI)]
+    if rate_index is None:
+        rate_index = rf.daily_rate_index(project_rates, ppa_min_delta[0])
+    (compact, 
+     engine, 
+     _, 
+     disch_order) = _prepare_case(PV_min_energy_chg[0],
+                                  ppa_min_delta[0],
+                                  array_energy, 
+                                  project_rates, 
+                                  loss_dict, 
+                                  limits_dict,
+                                  batt_cap,
+                                  batt_power,
+                                  engine,
+                                  rate_index)
+    n_days = compact['hours']//24
+    if chunk_days is None:
+        chunk_days = n_days
+    output = dr.DispatchResult(len(array_energy), dtype=output_dtype, points=len(ppa_min_delta))
+    output_block = output.days
+    # Arbitrage days for each distinct rate delta.
+    arbitrage_days = {delta: rate_index['spread'] > delta for delta in np.unique(ppa_min_delta)}
+    for first in range(0, n_days, chunk_days):
+        # Build the dense dispatch block once for every point.
+        chunk = slice(first, min(first + chunk_days, n_days))
+        dispatch_block = dispatch_block_days(compact, chunk)
+        chunk_disch_order = disch_order[chunk]
+        # Charge orders, PV only outputs and idle days shared by the points 
+        # with the same parameter values.
+        chg_orders = {}
+        pv_only = {}
+        idle = {}
+        for point in range(len(ppa_min_delta)):
+            PV_min = PV_min_energy_chg[point]
+            delta = ppa_min_delta[point]
+            limit = batt_limit_POI[point]
+            hours = batt_hours_POI[point]
+            chunk_arbitrage = arbitrage_days[delta][chunk]
+            chunk_output = output_block[point][chunk]
+            if PV_min not in chg_orders:
+                chg_orders[PV_min] = nd.charge_order(chunk_disch_order, PV_min, dispatch_block)
+            chg_order = chg_orders[PV_min]
+            if idle_fast_path:
+                if (delta, limit, hours) not in idle:
+                    idle[(delta, limit, hours)] = nd.idle_days(chunk_arbitrage,
+                                                               limit,
+                                                               hours,
+                                                               dispatch_block)
+                point_idle = idle[(delta, limit, hours)]
+                if (PV_min, delta) not in pv_only:
+                    # PV only output of every day of the chunk, idle days of 
+                    # each point are copied out of it.
+                    pv_only[(PV_min, delta)] = nd.pv_only_dispatch(chunk_arbitrage,
+                                                                   PV_min,
+                                                                   dispatch_block,
+                                                                   chg_order=chg_order,
+                                                                   disch_order=chunk_disch_order)
+                chunk_output[point_idle] = pv_only[(PV_min, delta)][point_idle]
+                active_days = np.flatnonzero(~point_idle)
+            else:
+                active_days = np.arange(dispatch_block.shape[0])
+            if workers > 1:
+                par.run_day_chunks(dispatch_days,
+                                   active_days,
+                                   dispatch_block,
+                                   chunk_output,
+                                   (engine,
+                                    chunk_arbitrage,
+                                    POI,
+                                    PV_min,
+                                    delta,
+                                    limit,
+                                    hours,
+                                    chg_order,
+                                    chunk_disch_order),
+                                   workers,
+                                   pool=pool)
+            else:
+                dispatch_days(active_days,
+                              dispatch_block,
+                              chunk_output,
+                              engine,
+                              chunk_arbitrage,
+                              POI,
+                              PV_min,
+                              delta,
+                              limit,
+                              hours,
+                              chg_order,
+                              chunk_disch_order,
+                              cache=cache)
+    
+    return output
+
+
+def _prepare_case(PV_min_energy_chg,
+                  ppa_min_delta,
+                  array_energy, 
+                  project_rates, 
+                  loss_dict, 
+                  limits_dict,
+                  batt_cap,
+                  batt_power,
+                  engine,
+                  rate_index):
+    # Shared setup of pvs_ac_mv and pvs_ac_mv_stream, returns the compact 
+    # dispatch inputs, the engine to run, the arbitrage days and the discharge 
+    # order of every day.
+    # Hold the time varying columns as hourly arrays and the constant columns
+    # as scalars, dense day blocks are built from it as they are dispatched.
+    compact = dispatch_prep_compact(array_energy, 
+                                    project_rates, 
+                                    loss_dict, 
+                                    limits_dict,
+                                    batt_cap,
+                                    batt_power)
+    if engine not in ('loop', 'batch', 'numba'):
+        raise ValueError(f'unknown dispatch engine: {engine}')
+    if engine == 'numba' and not dn.NUMBA_AVAILABLE:
+        # Compiler not installed, run the pure python loop instead.
+        print('numba not installed, falling back to the python dispatch loop')
+        engine = 'loop'
+    n_days = compact['hours']//24
+    if rate_index is None:
+        rate_index = rf.daily_rate_index(project_rates, ppa_min_delta)
+    if len(rate_index['spread']) != n_days:
+        raise ValueError('rate index does not cover the days of the case')
+    # Determine which days meet the rate delta arbitrage requirements.
+    if rate_index['ppa min delta'] == ppa_min_delta:
+        arbitrage_days = rate_index['arbitrage days']
+    else:
+        arbitrage_days = rate_index['spread'] > ppa_min_delta
+    # Hours sorted by combined rate for discharge.
+    disch_order = rate_index['order']
+    
+    return compact, engine, arbitrage_days, disch_order
+
+
+def _dispatch_chunks(compact,
+                     engine,
+                     arbitrage_days,
+                     disch_order,
+                     POI,
+                     PV_min_energy_chg,
+                     ppa_min_delta,
+                     batt_limit_POI,
+                     batt_hours_POI,
+                     chunk_days,
+                     cache,
+                     idle_fast_path,
+                     workers,
+                     executor,
+                     pool,
+                     output_block=None,
+                     output_dtype=np.float64):
+    # Dispatch the run chunk_days at a time, building the dense dispatch block
+    # of each chunk from the compact inputs. Chunks are written into the days
+    # of output_block when given, otherwise into a new DispatchResult per 
+    # chunk. Yields the days of the chunk and its output. Without a pool,
+    # one is created for the chunks of the case when workers > 1.
+    n_days = compact['hours']//24
+    if pool is None and workers > 1:
+        with par.make_pool(workers, executor) as pool:
+            yield from _dispatch_chunks(compact,
+                                        engine,
+                                        arbitrage_days,
+                                        disch_order,
+                                        POI,
+                                        PV_min_energy_chg,
+                                        ppa_min_delta,
+                                        batt_limit_POI,
+                                        batt_hours_POI,
+                                        chunk_days,
+                                        cache,
+                                        idle_fast_path,
+                                        workers,
+                                        executor,
+                                        pool,
+                                        output_block=output_block,
+                                        output_dtype=output_dtype)
+        return
+    for first in range(0, n_days, chunk_days):
+        # Build the dense dispatch block for the chunk of days.
+        chunk = slice(first, min(first + chunk_days, n_days))
+        dispatch_block = dispatch_block_days(compact, chunk)
+        if output_block is not None:
+            chunk_result = None
+            chunk_output = output_block[chunk]
+        else:
+            chunk_result = dr.DispatchResult(dispatch_block.shape[0]*24, dtype=output_dtype)
+            chunk_output = chunk_result.days
+        chunk_arbitrage = arbitrage_days[chunk]
+        chunk_disch_order = disch_order[chunk]
+        # Hours sorted by the case's PV charge cost for charging.
+        chg_order = nd.charge_order(chunk_disch_order, PV_min_energy_chg, dispatch_block)
+        if idle_fast_path:
+            # Days where the battery stays empty (no clipping on a non arbitrage 
+            # day, or battery past end of life) only need the PV only outputs.
+            idle = nd.idle_days(chunk_arbitrage,
+                                batt_limit_POI,
+                                batt_hours_POI,
+                                dispatch_block)
+            chunk_output[idle] = nd.pv_only_dispatch(chunk_arbitrage[idle],
+                                                     PV_min_energy_chg,
+                                                     dispatch_block[idle],
+                                                     chg_order=chg_order[idle],
+                                                     disch_order=chunk_disch_order[idle])
+            active_days = np.flatnonzero(~idle)
+        else:
+            active_days = np.arange(dispatch_block.shape[0])
         
+        if workers > 1:
+            # Split the active days into contiguous ranges dispatched in parallel.
+            par.run_day_chunks(dispatch_days,
+                               active_days,
+                               dispatch_block,
+                               chunk_output,
+                               (engine,
+                                chunk_arbitrage,
+                                POI,
+                                PV_min_energy_chg,
+                                ppa_min_delta,
+                                batt_limit_POI,
+                                batt_hours_POI,
+                                chg_order,
+                                chunk_disch_order),
+                               workers,
+                               pool=pool)
+        else:
+            dispatch_days(active_days,
+                          dispatch_block,
+                          chunk_output,
+                          engine,
+                          chunk_arbitrage,
+                          POI,
+                          PV_min_energy_chg,
+                          ppa_min_delta,
+                          batt_limit_POI,
+                          batt_hours_POI,
+                          chg_order,
+                          chunk_disch_order,
+                          cache=cache)
+        yield chunk, chunk_output if chunk_result is None else chunk_result
+
 
 def dispatch_prep(array_energy,
                   project_rates,
@@ -184,8 +1091,6 @@ def dispatch_prep(array_energy,
                   limits,
                   battery_capacity,
                   battery_power):
-    # Create empty array to hold all variables.
-    dispatch_array = np.empty([len(array_energy),25])
     """
     Function to convert simulation parameters from dictionary entries into a numpy array
     for faster access and the ability to run using Numba. 
@@ -217,30 +1122,246 @@ def dispatch_prep(array_energy,
         23:     capacity (battery)
         24:     rte (battery)
         """
-    dispatch_array[:,0] = array_energy
-    dispatch_array[:,1] = project_rates['rate capacity']
-    dispatch_array[:,2] = project_rates['rate combined']
-    dispatch_array[:,3] = project_rates['rate energy']
-    dispatch_array[:,4] = project_rates['rate RA']
-    dispatch_array[:,5] = project_rates['rate REC']
-    dispatch_array[:,6] = limits['array energy inverter limited']
-    dispatch_array[:,7] = limits['array energy POI limited']
-    dispatch_array[:,8] = limits['battery charge power']
-    dispatch_array[:,9] = limits['battery discharge power']
-    dispatch_array[:,10] = limits['inverter limit PV power']
-    dispatch_array[:,11] = limits['PCS limit battery charge power']
-    dispatch_array[:,12] = limits['PCS limit battery discharge power']
-    dispatch_array[:,13] = limits['POI limit PV power']
-    dispatch_array[:,14] = limits['power limited by battery']
-    dispatch_array[:,15] = losses['array to battery']
-    dispatch_array[:,16] = losses['array to node meter']
-    dispatch_array[:,17] = losses['array to POI']
-    dispatch_array[:,18] = losses['battery to POI']
-    dispatch_array[:,19] = battery_power['charge eta']
-    dispatch_array[:,20] = battery_power['discharge eta']
-    dispatch_array[:,21] = battery_power['DOD np']
-    dispatch_array[:,22] = battery_power['max p']
-    dispatch_array[:,23] = battery_capacity['capacity']
-    dispatch_array[:,24] = battery_capacity['rte']
+    compact = dispatch_prep_compact(array_energy,
+                                    project_rates,
+                                    losses,
+                                    limits,
+                                    battery_capacity,
+                                    battery_power)
+    dispatch_array = dispatch_block_days(compact, slice(None)).reshape(-1,25)
     
-    return dispatch_array
\ No newline at end of file
+    return dispatch_array
+
+
+def dispatch_prep_compact(array_energy,
+                          project_rates,
+                          losses,
+                          limits,
+                          battery_capacity,
+                          battery_power):
+    """
+    Function to collect the dispatch array columns without building the dense
+    array. Columns holding one value for every hour (limits, losses, constant
+    battery values) are stored as scalars, rate columns reference the rate 
+    arrays shared by every case (read only), and the remaining time varying 
+    columns reference the case's hourly arrays. Arrays keep their own type 
+    (e.g. integer or float32 rates) so they are not copied for each case, 
+    dispatch_block_days casts them to float as it builds dense blocks of 
+    days. Same column format as dispatch_prep.
+
+    Returns
+    -------
+    compact : dict
+        dictionary containing the following information:
+            hours:      number of hours in the run.
+            columns:    list of the 25 dispatch array columns, each a float
+                        or a read only hourly array (view of the source).
+
+    """
+    sources = [array_energy,
+               project_rates['rate capacity'],
+               project_rates['rate combined'],
+               project_rates['rate energy'],
+               project_rates['rate RA'],
+               project_rates['rate REC'],
+               limits['array energy inverter limited'],
+               limits['array energy POI limited'],
+               limits['battery charge power'],
+               limits['battery discharge power'],
+               limits['inverter limit PV power'],
+               limits['PCS limit battery charge power'],
+               limits['PCS limit battery discharge power'],
+               limits['POI limit PV power'],
+               limits['power limited by battery'],
+               losses['array to battery'],
+               losses['array to node meter'],
+               losses['array to POI'],
+               losses['battery to POI'],
+               battery_power['charge eta'],
+               battery_power['discharge eta'],
+               battery_power['DOD np'],
+               battery_power['max p'],
+               battery_capacity['capacity'],
+               battery_capacity['rte']]
+    hours = len(array_energy)
+    columns = []
+    for source in sources:
+        value = np.asarray(source)
+        if value.dtype.kind not in 'fiu':
+            # Boolean or object inputs are converted, numeric arrays are 
+            # referenced as they are.
+            value = value.astype(float)
+        if value.ndim == 0:
+            columns.append(float(value))
+        elif value.shape[0] != hours:
+            raise ValueError('dispatch input does not match the length of the array energy')
+        elif value[0] == value[-1] and (value == value[0]).all():
+            # One value for every hour.
+            columns.append(float(value[0]))
+        else:
+            # Read only view, the arrays are shared and not copied.
+            value = value.view()
+            value.flags.writeable = False
+            columns.append(value)
+    compact = {'hours': hours,
+               'columns': columns}
+    return compact
+
+
+def dispatch_block_days(compact, days):
+    """
+    Function to build the dense dispatch array for a set of days.
+
+    Parameters
+    ----------
+    compact : dict
+        output of dispatch_prep_compact.
+    days : array or slice
+        days to build.
+
+    Returns
+    -------
+    dispatch_block : array
+        (days, 24, 25) dispatch array for the days, scalar columns broadcast 
+        to every hour.
+
+    """
+    day_index = np.arange(compact['hours']//24)[days]
+    dispatch_block = np.empty([len(day_index),24,len(compact['columns'])])
+    for col, value in enumerate(compact['columns']):
+        if isinstance(value, float):
+            dispatch_block[:,:,col] = value
+        else:
+            dispatch_block[:,:,col] = value.reshape(-1,24)[days]
+    return dispatch_block
+
+
+def dispatch_days(days,
+                  dispatch_block,
+                  output_block,
+                  engine,
+                  arbitrage_days,
+                  POI,
+                  PV_min_energy_chg,
+                  ppa_min_delta,
+                  batt_limit_POI,
+                  batt_hours_POI,
+                  chg_order,
+                  disch_order,
+                  cache=None):
+    """
+    Function to run the selected dispatch engine for a set of days, writing the
+    results into the matching days of the output. Used by pvs_ac_mv directly, 
+    and by the workers when the days are split across a process or thread pool.
+
+    Parameters
+    ----------
+    days : array
+        indices of the days to dispatch.
+    dispatch_block : array
+        (days, 24, 25) dispatch array from dispatch_prep reshaped into days.
+    output_block : array
+        (days, 24, 15) output array, filled in place for the given days.
+    engine : string
+        'loop', 'batch' or 'numba', see pvs_ac_mv.
+    arbitrage_days : array
+        boolean array (days), True where the daily rate delta meets the 
+        arbitrage requirements.
+    POI : int
+        Interconnection size in MW.
+    PV_min_energy_chg : float
+        minimum array energy required to initiate charging for the battery.
+    ppa_min_delta : int
+        minimum daily delta between high and low rate to initiate arbitrage.
+    batt_limit_POI: int
+        PCS limit at the POI.
+    batt_hours_POI: int
+        hours to dispatch at the POI limit.
+    chg_order : array
+        (days, 24) hours sorted by PV charge cost (dispatch.charge_order).
+    disch_order : array
+        (days, 24) hours sorted by combined rate, from the rate index.
+    cache : dispatch_cache.DailyDispatchCache, optional
+        cache of daily outputs, the days found in it are filled from the cache
+        and only the others run through the engine. The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    if cache is not None:
+        # Fill the days with a stored output (or repeating a day dispatched 
+        # here), only the other days are sent through the engine.
+        keys = [cache.key(arbitrage_days[day],
+                          POI,
+                          PV_min_energy_chg,
+                          ppa_min_delta,
+                          batt_limit_POI,
+                          batt_hours_POI,
+                          dispatch_block[day],
+                          chg_order[day],
+                          disch_order[day]) for day in days]
+        found, missed, repeats = cache.split(keys)
+        for position, cached_out in found:
+            output_block[days[position]] = cached_out
+        dispatched = days
+        days = np.asarray(days)[missed]
+    if engine == 'numba':
+        # Run the compiled loop over the active days, filling the output in place.
+        active_array = dispatch_block[days].reshape(-1,dispatch_block.shape[2])
+        active_output = np.empty([len(days)*24,15])
+        dn.pvs_ac_mv_nb(active_array,
+                        float(POI),
+                        arbitrage_days[days],
+                        float(batt_limit_POI),
+                        float(batt_hours_POI),
+                        chg_order[days],
+                        disch_order[days],
+                        active_output)
+        output_block[days] = active_output.reshape(-1,24,15)
+    elif engine == 'batch':
+        # Dispatch every active day at once.
+        output_block[days] = nd.batch_arbitrage(arbitrage_days[days],
+                                                POI,
+                                                PV_min_energy_chg,
+                                                ppa_min_delta,
+                                                batt_limit_POI,
+                                                batt_hours_POI,
+                                                dispatch_block[days],
+                                                chg_order=chg_order[days],
+                                                disch_order=disch_order[days])
+    else:
+        # Scratch arrays for the daily dispatch, allocated once for the case 
+        # and reset in place for each day.
+        workspace = nd.dispatch_workspace()
+        # The day is calculated in float64, a float32 output is written through
+        # a scratch day.
+        if output_block.dtype != np.float64:
+            day_scratch = np.empty([24,15])
+        else:
+            day_scratch = None
+        # Send each 24 hour slice of the run through the daily arbitrage function.
+        for day in days:
+            # Run the mv-ac coupled dispatch function for each day, writing the 
+            # results straight into the output array at the index for the day.
+            pvs_out = output_block[day] if day_scratch is None else day_scratch
+            nd.daily_arbitrage(arbitrage_days[day],
+                               POI,
+                               PV_min_energy_chg,
+                               ppa_min_delta,
+                               batt_limit_POI,
+                               batt_hours_POI,
+                               dispatch_block[day],
+                               workspace=workspace,
+                               pvs_out=pvs_out,
+                               chg_order=chg_order[day],
+                               disch_order=disch_order[day])
+            if day_scratch is not None:
+                output_block[day] = day_scratch
+    if cache is not None:
+        # Store the dispatched days and copy them to the days repeating them.
+        for position, day in zip(missed, days):
+            cache.put(keys[position], output_block[day])
+        for position, first in repeats:
+            output_block[dispatched[position]] = output_block[days[first]]
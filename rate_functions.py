@@ -387,4 +387,40 @@ def uda_rates(rate_years):
                  'rate REC': np.zeros(306600),
                  'rate RA': np.zeros(306600),
                  'rate combined': rate_energy_H}
-    return rate_dict
\ No newline at end of file
+    return rate_dict
+
+def daily_rate_index(project_rates, ppa_min_delta):
+    """
+    Function to index the daily combined rate once for a rate series, so the 
+    cases of a sweep sharing the rates do not re-sort each day during dispatch.
+
+    Parameters
+    ----------
+    project_rates : dict
+        Dictionary of hourly values for all rates, only the combined rate is 
+        indexed.
+    ppa_min_delta : float
+        minimum daily delta between high and low rate to initiate arbitrage.
+
+    Returns
+    -------
+    rate_index : dict
+        dictionary containing the following information:
+            spread:         (days) daily delta between high and low combined rate.
+            order:          (days, 24) hours of each day sorted by combined rate 
+                            (ascending, ties kept in hour order).
+            arbitrage days: (days) boolean, spread > ppa_min_delta.
+            ppa min delta:  delta used for the arbitrage days.
+
+    """
+    import numpy as np
+
+    rate_comb = np.asarray(project_rates['rate combined'], dtype=float).reshape(-1,24)
+    spread = rate_comb.max(axis=1) - rate_comb.min(axis=1)
+    # A stable sort keeps tied hours in 24 hour order, as in the dispatch.
+    order = np.argsort(rate_comb, axis=1, kind='stable')
+    rate_index = {'spread': spread,
+                  'order': order,
+                  'arbitrage days': spread > ppa_min_delta,
+                  'ppa min delta': ppa_min_delta}
+    return rate_index
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of whole case dispatch results. A project rerun with mostly
+unchanged inputs only dispatches the cases whose inputs changed, the others
+are memory mapped from the cache folder.
+
+Cases are keyed on a digest of everything that determines the output: the
+compact dispatch inputs (array energy, rates, losses, limits and battery
+columns), POI, the thresholds and limits, the engine, the output type, the
+settings of an approximate daily dispatch cache and the source of the modules
+on the dispatch path (DISPATCH_MODULES), so editing the dispatch code 
+invalidates the cache. The folder is held under a size cap with least recently used eviction.
+"""
+import hashlib
+import importlib
+import inspect
+import json
+import os
+
+import numpy as np
+
+import dispatch_result as dr
+from checkpoint import replace_file
+
+INDEX = 'index.json'
+
+# Modules whose source decides the stored dispatch output, add a module here
+# when the dispatch path starts using it.
+DISPATCH_MODULES = ['dispatch',
+                    'dispatch_cache',
+                    'dispatch_numba',
+                    'dispatch_result',
+                    'horizon',
+                    'parallel',
+                    'pvs',
+                    'rate_functions',
+                    'screening']
+
+
+def code_version():
+    """
+    Returns
+    -------
+    version : string
+        digest of the source of the modules that calculate the dispatch
+        (DISPATCH_MODULES).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name in DISPATCH_MODULES:
+        digest.update(name.encode())
+        digest.update(inspect.getsource(importlib.import_module(name)).encode())
+    return digest.hexdigest()
+
+
+class DispatchResultCache:
+    """
+    On-disk least recently used cache of case dispatch results.
+
+    Parameters
+    ----------
+    directory : string
+        folder holding the cache, created if it does not exist.
+    max_bytes : int, optional
+        size cap of the stored results, the least recently used results are
+        evicted once a new result takes the cache past it. The default is
+        10 GB.
+    version : string, optional
+        code version mixed into every key. The default is None, which uses
+        code_version().
+    """
+
+    def __init__(self, directory, max_bytes=10*1024**3, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version() if version is None else version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._read_index()
+
+    def _read_index(self):
+        path = os.path.join(self.directory, INDEX)
+        if not os.path.exists(path):
+            return {'tick': 0, 'entries': {}}
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def _write_index(self):
+        data = json.dumps(self.index, indent=1).encode()
+        replace_file(os.path.join(self.directory, INDEX),
+                      lambda file: file.write(data))
+
+    def _touch(self, key):
+        # Mark as most recently used, a counter orders the entries.
+        self.index['tick'] += 1
+        self.index['entries'][key]['used'] = self.index['tick']
+
+    def key(self,
+            compact,
+            POI,
+            PV_min_energy_chg,
+            ppa_min_delta,
+            batt_limit_POI,
+            batt_hours_POI,
+            engine,
+            output_dtype,
+            cache=None):
+        """
+        Build the cache key for a case from its compact dispatch inputs
+        (pvs.dispatch_prep_compact) and the pvs_ac_mv arguments. cache is the
+        daily dispatch cache of the run, one with approximate keys (rtol > 0)
+        gets its own results.
+
+        Returns
+        -------
+        key : string
+            hex digest of the inputs.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.version.encode())
+        scalars = (POI, PV_min_energy_chg, ppa_min_delta, batt_limit_POI, batt_hours_POI)
+        digest.update(np.array(scalars, dtype=float).tobytes())
+        digest.update(f'{engine}|{np.dtype(output_dtype).str}|{compact["hours"]}'.encode())
+        if cache is not None and cache.rtol > 0:
+            # Approximate daily cache hits change the output, exact ones do not.
+            digest.update(f'|daily cache {cache.rtol!r} {cache.decimals}'.encode())
+        for column in compact['columns']:
+            if np.ndim(column) == 0:
+                # Constant column held as a scalar.
+                digest.update(b's' + np.float64(column).tobytes())
+            else:
+                # Hashed in its own type, integer and float32 rates are not
+                # copied to float.
+                digest.update(b'a' + column.dtype.str.encode())
+                digest.update(np.ascontiguousarray(column))
+        return digest.hexdigest()
+
+    def get(self, key, mmap=True):
+        """
+        Return the stored result for the key, memory mapped (read only) by
+        default, or None on a miss.
+        """
+        entry = self.index['entries'].get(key)
+        path = None if entry is None else os.path.join(self.directory, entry['file'])
+        if entry is None or not os.path.exists(path):
+            self.misses += 1
+            return None
+        data = np.load(path, mmap_mode='r' if mmap else None)
+        self.hits += 1
+        self._touch(key)
+        self._write_index()
+        return dr.DispatchResult.from_buffer(data)
+
+    def put(self, key, result):
+        """
+        Store a dispatch result, evicting the least recently used results past
+        max_bytes.
+        """
+        file_name = f'{key}.npy'
+        replace_file(os.path.join(self.directory, file_name),
+                      lambda file: np.save(file, result.data))
+        self.index['entries'][key] = {'file': file_name,
+                                      'bytes': int(result.nbytes),
+                                      'used': 0}
+        self._touch(key)
+        self._evict(keep=key)
+        self._write_index()
+
+    def _evict(self, keep=None):
+        entries = self.index['entries']
+        for key in sorted(entries, key=lambda key: entries[key]['used']):
+            if self.size() <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, entries[key]['file']))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Still memory mapped (Windows), left for a later eviction.
+                continue
+            del entries[key]
+            self.evictions += 1
+
+    def size(self):
+        """
+        Returns
+        -------
+        size : int
+            bytes held by the stored results.
+        """
+        return sum(entry['bytes'] for entry in self.index['entries'].values())
+
+    def clear(self):
+        """
+        Remove all stored results and reset the counters.
+        """
+        for entry in self.index['entries'].values():
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError:
+                pass
+        self.index = {'tick': 0, 'entries': {}}
+        self._write_index()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats : dict
+            hits, misses, hit rate, evictions, stored results and bytes held.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self.index['entries']),
+                'bytes': self.size()}
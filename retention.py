@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Output retention for large sweeps. Each finished case is reduced to annual and
+monthly totals and lifetime KPIs, and the hourly dispatch output is only kept
+for selected cases and the top ranked cases of the sweep.
+"""
+import numpy as np
+
+from screening import ENERGY_COLUMNS
+from dispatch_result import OUTPUT_COLUMNS
+
+# Hours in each month of a 8760 hour year.
+MONTH_HOURS = np.array([31,28,31,30,31,30,31,31,30,31,30,31])*24
+
+
+def aggregate_output(dispatch_output, project_rates):
+    """
+    Function to reduce the hourly dispatch output of a case to annual and
+    monthly totals and lifetime KPIs.
+
+    Parameters
+    ----------
+    dispatch_output : DispatchResult or dict
+        hourly dispatch output of the case.
+    project_rates : dict
+        hourly rates, the combined rate prices the PVS and PV only energy.
+
+    Returns
+    -------
+    aggregates : dict
+        dictionary containing the following information:
+            annual:     dictionary of (years) totals by output key.
+            monthly:    dictionary of (years x 12) totals by output key.
+            KPIs:       dictionary of lifetime totals, PVS and PV only energy
+                        and revenue at the POI, battery discharge and clip
+                        harvesting.
+
+    """
+    rate_comb = np.asarray(project_rates['rate combined'], dtype=float)
+    hours = len(dispatch_output[OUTPUT_COLUMNS[0]])
+    years = hours // 8760
+    series = {OUTPUT_COLUMNS[col]: np.asarray(dispatch_output[OUTPUT_COLUMNS[col]], dtype=float)
+              for col in ENERGY_COLUMNS}
+    # PV + S energy at the POI, as reported in UDA_35_year.
+    series['PVS energy at POI'] = (series['PVS POI output - PV'] +
+                                   series['PVS POI output - battery'])
+    series['PVS revenue'] = series['PVS energy at POI'] * rate_comb[:hours]
+    series['PV only revenue'] = series['PV only plant energy'] * rate_comb[:hours]
+    # First hour of each month of the run.
+    month_start = (np.arange(years)[:,None]*8760 +
+                   np.concatenate(([0], np.cumsum(MONTH_HOURS)[:-1]))[None,:]).ravel()
+    annual = {}
+    monthly = {}
+    for key, values in series.items():
+        values = values[:years*8760]
+        annual[key] = values.reshape(years, 8760).sum(axis=1)
+        monthly[key] = (np.add.reduceat(values, month_start).reshape(years, 12)
+                        if years > 0 else np.zeros((0, 12)))
+    KPIs = {'PVS energy at POI (MWh)': annual['PVS energy at POI'].sum(),
+            'PV only energy at POI (MWh)': annual['PV only plant energy'].sum(),
+            'PVS revenue ($)': annual['PVS revenue'].sum(),
+            'PV only revenue ($)': annual['PV only revenue'].sum(),
+            'battery discharge at POI (MWh)': annual['PVS POI output - battery'].sum(),
+            'clip harvesting (MWh)': annual['clip harvesting'].sum()}
+    KPIs['PVS revenue gain ($)'] = KPIs['PVS revenue ($)'] - KPIs['PV only revenue ($)']
+    aggregates = {'annual': annual,
+                  'monthly': monthly,
+                  'KPIs': KPIs}
+    return aggregates
+
+
+class RetentionPolicy:
+    """
+    Retention policy for pvs.arbitrage, stores the aggregates of every case
+    under 'dispatch aggregates' and drops the hourly 'dispatch output' unless
+    the case is selected or ranks in the top cases seen so far.
+
+    Parameters
+    ----------
+    project_rates : dict
+        hourly rates used for the revenue KPIs.
+    keep : list, optional
+        case names that always keep the hourly output. The default is ().
+    top : int, optional
+        number of top ranked cases, besides the keep cases, that keep the
+        hourly output. The default is 0.
+    rank_by : string, optional
+        KPI the cases are ranked by, highest first. The default is
+        'PVS revenue ($)'.
+    """
+
+    def __init__(self, project_rates, keep=(), top=0, rank_by='PVS revenue ($)'):
+        self.project_rates = project_rates
+        self.keep = set(keep)
+        self.top = top
+        self.rank_by = rank_by
+        # (KPI, case name) of the top ranked cases holding hourly output.
+        self.ranked = []
+
+    def apply(self, case_list, key):
+        """
+        Aggregate a finished case and apply the retention policy.
+        """
+        case = case_list[key]
+        aggregates = aggregate_output(case['dispatch output'], self.project_rates)
+        case['dispatch aggregates'] = aggregates
+        if key in self.keep:
+            return
+        if self.top > 0:
+            score = aggregates['KPIs'][self.rank_by]
+            if len(self.ranked) < self.top or score > self.ranked[-1][0]:
+                self.ranked.append((score, key))
+                # Highest first, earlier cases win ties.
+                self.ranked.sort(key=lambda item: -item[0])
+                if len(self.ranked) > self.top:
+                    # Case pushed out of the top drops its hourly output.
+                    _, dropped = self.ranked.pop()
+                    if dropped not in self.keep:
+                        case_list[dropped].pop('dispatch output', None)
+                return
+        case.pop('dispatch output', None)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Cost model for scheduling the cases of a sweep. The run time of a case grows
+with the days the battery is in service (augmented cases keep the battery
+running, cases reaching end of life early leave idle PV only days) and with the
+days the rates trigger arbitrage. The most expensive cases are dispatched first
+so the case workers do not finish on a single long case.
+"""
+import numpy as np
+
+# Relative cost of a day of the run, a day with the battery in service and a
+# battery day with arbitrage. Idle days take the PV only fast path.
+COST_WEIGHTS = {'days': 1.0,
+                'battery days': 4.0,
+                'arbitrage days': 2.0}
+
+
+def case_cost(case, arbitrage_days, weights=COST_WEIGHTS):
+    """
+    Function to estimate the relative cost of dispatching a case from its
+    inputs.
+
+    Parameters
+    ----------
+    case : dict
+        case from functions.define_cases.
+    arbitrage_days : array
+        (days) boolean, days where the combined rate spread triggers arbitrage
+        (rate_functions.daily_rate_index).
+    weights : dict, optional
+        relative cost of each day type. The default is COST_WEIGHTS.
+
+    Returns
+    -------
+    cost : dict
+        dictionary containing the following information:
+            days:               days in the run.
+            battery days:       days with battery capacity in service.
+            arbitrage days:     battery days with arbitrage.
+            cost:               weighted cost in relative units.
+
+    """
+    capacity = np.asarray(case['battery capacity']['capacity'], dtype=float)
+    n_days = len(capacity)//24
+    battery_days = capacity[:n_days*24].reshape(n_days, 24).max(axis=1) > 0
+    arbitrage = battery_days & np.asarray(arbitrage_days[:n_days], dtype=bool)
+    cost = {'days': n_days,
+            'battery days': int(battery_days.sum()),
+            'arbitrage days': int(arbitrage.sum())}
+    cost['cost'] = sum(weights[key]*cost[key] for key in weights)
+    return cost
+
+
+def schedule(case_list, keys, arbitrage_days, weights=COST_WEIGHTS):
+    """
+    Function to order cases most expensive first.
+
+    Parameters
+    ----------
+    case_list : dict
+        cases from functions.define_cases.
+    keys : list
+        case names to schedule.
+    arbitrage_days : array
+        (days) boolean arbitrage days of the rates.
+    weights : dict, optional
+        relative cost of each day type. The default is COST_WEIGHTS.
+
+    Returns
+    -------
+    order : list
+        case names, most expensive first (cases of equal cost keep their
+        order).
+    costs : dict
+        case_cost of each case by case name.
+
+    """
+    costs = {key: case_cost(case_list[key], arbitrage_days, weights) for key in keys}
+    order = sorted(keys, key=lambda key: -costs[key]['cost'])
+    return order, costs
+
+
+def schedule_report(costs, seconds):
+    """
+    Function to compare the predicted and actual run time of each case. The
+    relative costs are turned into seconds with the rate of the whole sweep
+    (total seconds / total cost).
+
+    Parameters
+    ----------
+    costs : dict
+        case_cost of each case by case name.
+    seconds : dict
+        actual dispatch time of each case by case name.
+
+    Returns
+    -------
+    report : dict
+        dictionary by case name holding:
+            cost:               relative cost.
+            predicted seconds:  predicted dispatch time.
+            actual seconds:     measured dispatch time.
+            error:              relative error of the prediction.
+
+    """
+    keys = [key for key in costs if key in seconds]
+    total_cost = sum(costs[key]['cost'] for key in keys)
+    rate = sum(seconds[key] for key in keys) / total_cost if total_cost > 0 else 0.0
+    report = {}
+    for key in keys:
+        predicted = costs[key]['cost']*rate
+        report[key] = {'cost': costs[key]['cost'],
+                       'predicted seconds': predicted,
+                       'actual seconds': seconds[key],
+                       'error': ((predicted - seconds[key]) / seconds[key]
+                                 if seconds[key] > 0 else 0.0)}
+    return report
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Representative day screening for case sweeps. Days of the run are clustered on
+their PV shape, combined rate shape and battery capacity, one real day per
+cluster is dispatched and the results are weighted by the cluster size to give
+annual and lifetime totals. Used to shortlist cases before running the full
+dispatch on them. A random sample of check days is dispatched in full to 
+estimate the error of the weighted totals.
+"""
+import numpy as np
+
+# Columns of the dispatch output that are energies and can be summed over days,
+# SOC, sequence and hour columns are left out of the totals.
+ENERGY_COLUMNS = [0, 1, 2, 5, 6, 7, 8, 9, 13, 14]
+
+
+def day_features(dispatch_block):
+    """
+    Function to build the clustering features for each day.
+
+    Parameters
+    ----------
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+
+    Returns
+    -------
+    features : array
+        (days, 49) array, normalized 24 hour array energy, 24 hour combined
+        rate and the battery DOD nameplate for the day. Each group is scaled to
+        carry the same weight in the distance between days.
+
+    """
+    array_e = dispatch_block[:,:,0]
+    rate_comb = dispatch_block[:,:,2]
+    dod_np = dispatch_block[:,:,21].max(axis=1, keepdims=True)
+    # Normalize each group by its largest value over the run.
+    pv_scale = max(np.abs(array_e).max(), 1e-12)
+    rate_scale = max(np.abs(rate_comb).max(), 1e-12)
+    dod_scale = max(np.abs(dod_np).max(), 1e-12)
+    features = np.hstack([array_e / pv_scale / np.sqrt(24),
+                          rate_comb / rate_scale / np.sqrt(24),
+                          dod_np / dod_scale])
+    return features
+
+
+def _kmeans(features, n_clusters, iterations=50, seed=0):
+    # k-means++ initialization followed by Lloyd iterations, seeded so the same
+    # inputs always give the same clusters.
+    rng = np.random.default_rng(seed)
+    n_days = features.shape[0]
+    centers = [features[rng.integers(n_days)]]
+    distance = ((features - centers[0])**2).sum(axis=1)
+    for cluster in range(1,n_clusters):
+        if distance.sum() <= 0:
+            # Fewer distinct days than clusters.
+            break
+        pick = rng.choice(n_days, p=distance/distance.sum())
+        centers.append(features[pick])
+        distance = np.minimum(distance, ((features - features[pick])**2).sum(axis=1))
+    centers = np.array(centers)
+    labels = np.full(n_days, -1)
+    feature_norm = (features**2).sum(axis=1)[:,None]
+    for iteration in range(iterations):
+        distance = feature_norm - 2*features @ centers.T + (centers**2).sum(axis=1)
+        new_labels = distance.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, features)
+        # Clusters left empty keep their previous center.
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled,None]
+    return labels, centers
+
+
+def representative_days(dispatch_block, n_days, seed=0):
+    """
+    Function to cluster the days of the run and pick one real day per cluster,
+    the member closest to the cluster center.
+
+    Parameters
+    ----------
+    dispatch_block : array
+        (days, 24, 25) dispatch array reshaped into days.
+    n_days : int
+        number of representative days (clusters).
+    seed : int, optional
+        seed for the cluster initialization. The default is 0.
+
+    Returns
+    -------
+    representative : dict
+        dictionary containing the following information:
+            days:       (clusters) index of the representative day of each cluster.
+            weights:    (clusters) number of days in each cluster.
+            labels:     (days) cluster of each day of the run.
+
+    """
+    features = day_features(dispatch_block)
+    total_days = features.shape[0]
+    n_days = max(1, min(int(n_days), total_days))
+    labels, centers = _kmeans(features, n_days, seed=seed)
+    # Drop clusters that ended up empty and renumber the labels.
+    used, labels = np.unique(labels, return_inverse=True)
+    centers = centers[used]
+    distance = ((features - centers[labels])**2).sum(axis=1)
+    days = np.empty(len(used), dtype=int)
+    for cluster in range(len(used)):
+        members = np.flatnonzero(labels == cluster)
+        days[cluster] = members[distance[members].argmin()]
+    representative = {'days': days,
+                      'weights': np.bincount(labels, minlength=len(used)),
+                      'labels': labels}
+    return representative
+
+
+def check_days(total_days, n_days, seed=0):
+    """
+    Function to draw the check days, a uniform random sample of the days of
+    the run that is dispatched in full to estimate the screening error.
+
+    Parameters
+    ----------
+    total_days : int
+        number of days in the run.
+    n_days : int
+        number of check days.
+    seed : int, optional
+        seed for the sample. The default is 0.
+
+    Returns
+    -------
+    days : array
+        sorted index of the check days.
+
+    """
+    rng = np.random.default_rng(seed)
+    n_days = max(0, min(int(n_days), total_days))
+    return np.sort(rng.choice(total_days, size=n_days, replace=False))
+
+
+def weighted_totals(representative, 
+                    rep_output, 
+                    exact_pv_only, 
+                    output_keys, 
+                    check=None, 
+                    check_output=None):
+    """
+    Function to weight the dispatch of the representative days up to annual
+    and lifetime totals. The error of the totals is estimated from the check
+    days, dispatched in full and compared against the representative day of
+    their cluster, the PV only energy (known exactly for every day) is 
+    compared directly.
+
+    Parameters
+    ----------
+    representative : dict
+        output of representative_days.
+    rep_output : array
+        (clusters, 24, 15) dispatch output of the representative days.
+    exact_pv_only : array
+        (days, 24) PV only plant energy for every day of the run.
+    output_keys : list
+        names of the 15 dispatch output columns.
+    check : array, optional
+        index of the check days (check_days). The default is None, no error 
+        estimate for the dispatched totals.
+    check_output : array, optional
+        (check days, 24, 15) full dispatch output of the check days. The 
+        default is None.
+
+    Returns
+    -------
+    screening_output : dict
+        dictionary containing the following information:
+            representative days:    index of the dispatched days.
+            weights:                days represented by each dispatched day.
+            annual totals:          dictionary of (years) totals by output key.
+            lifetime totals:        dictionary of lifetime totals by output key.
+            error estimate:         by output key, the relative error of the 
+                                    lifetime total estimated from the check 
+                                    days ('estimate') and the estimate plus two
+                                    standard errors ('bound'), nan without 
+                                    check days.
+            check days:             index of the check days.
+            PV only error:          relative error of the weighted PV only
+                                    energy, lifetime and worst year. The PV 
+                                    only energy has no battery, it does not 
+                                    bound the error of the PVS or battery totals.
+
+    """
+    labels = representative['labels']
+    # Days of each cluster falling in each year of the run (365 day years).
+    years = len(labels) // 365
+    day_year = np.minimum(np.arange(len(labels)) // 365, max(years - 1, 0))
+    year_weights = np.zeros((len(representative['days']), max(years, 1)))
+    np.add.at(year_weights, (labels, day_year), 1)
+    # Daily totals of the representative days weighted into each year.
+    rep_daily = rep_output.sum(axis=1)
+    annual = year_weights.T @ rep_daily
+    annual_totals = {output_keys[col]: annual[:,col] for col in ENERGY_COLUMNS}
+    lifetime_totals = {output_keys[col]: annual[:,col].sum() for col in ENERGY_COLUMNS}
+    # The weighted total is off by the sum over every day of the difference
+    # between the day and its representative day, estimated from the mean 
+    # difference over the check days (a uniform sample of the days).
+    error_estimate = {}
+    if check is None:
+        check = np.zeros(0, dtype=int)
+    for col in ENERGY_COLUMNS:
+        lifetime = annual[:,col].sum()
+        if len(check) > 1 and lifetime != 0:
+            residual = check_output[:,:,col].sum(axis=1) - rep_daily[labels[check],col]
+            bias = len(labels) * residual.mean()
+            spread = len(labels) * residual.std(ddof=1) / np.sqrt(len(check))
+            error_estimate[output_keys[col]] = {'estimate': abs(bias) / abs(lifetime),
+                                                'bound': (abs(bias) + 2*spread) / abs(lifetime)}
+        else:
+            error_estimate[output_keys[col]] = {'estimate': np.nan, 'bound': np.nan}
+    # Compare the weighted PV only energy against the exact value.
+    exact_annual = np.bincount(day_year, weights=exact_pv_only.sum(axis=1),
+                               minlength=max(years, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual_error = np.abs(annual[:,0] - exact_annual) / np.abs(exact_annual)
+    lifetime_exact = exact_annual.sum()
+    lifetime_error = (abs(annual[:,0].sum() - lifetime_exact) / abs(lifetime_exact)
+                      if lifetime_exact != 0 else 0.0)
+    screening_output = {'representative days': representative['days'],
+                        'weights': representative['weights'],
+                        'annual totals': annual_totals,
+                        'lifetime totals': lifetime_totals,
+                        'error estimate': error_estimate,
+                        'check days': check,
+                        'PV only error': {
+                            'lifetime': lifetime_error,
+                            'worst year':
+                                np.nanmax(annual_error) if np.isfinite(annual_error).any() else 0.0}}
+    return screening_output
+
+
+def shortlist(case_list, count, key='POI meter PVS'):
+    """
+    Function to pick the cases with the highest screened lifetime total, to be
+    sent through the full dispatch.
+
+    Parameters
+    ----------
+    case_list : dict
+        cases run through pvs.arbitrage in screening mode.
+    count : int
+        number of cases to keep.
+    key : string, optional
+        lifetime total to rank the cases by. The default is 'POI meter PVS'.
+
+    Returns
+    -------
+    shortlisted : dict
+        the top cases from case_list, highest total first.
+
+    """
+    ranked = sorted(case_list,
+                    key=lambda case: case_list[case]['screening output']['lifetime totals'][key],
+                    reverse=True)
+    return {case: case_list[case] for case in ranked[:count]}
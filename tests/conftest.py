@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup for the tests, the shipped component models, PV-Syst file and
+rates.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules sit at the top of the repository.
+sys.path.insert(0, ROOT)
+
+# Components of the UDA project (see UDA_35_year.py).
+COMPONENTS = {'Mod': 'Waaree_535', 'ModCol': 'default', 'Inv': 'chint_275',
+              'MVCol_Inv': 'default', 'MVT_Inv': 'default', 'Batt': 'catl_atrisco',
+              'BattCol': 'default', 'PCS': 'sungrow_sc3450', 'MVCol_PCS': 'default',
+              'MVT_PCS': 'default', 'GSU': 'default'}
+
+
+def load_components():
+    # Component dictionaries from the JSON files, as config_project reads them.
+    components = {}
+    for component, name in COMPONENTS.items():
+        with open(os.path.join(ROOT, 'Components', f'{component}.json')) as file:
+            components[component] = json.load(file)[name]
+    components['ModCol']['eta'] = 1
+    return components
+
+
+def load_array_energy():
+    # One year of array energy from the PV-Syst file, as populate_8760 reads it.
+    df_8760 = pd.read_csv(os.path.join(ROOT, 'pv_syst_files', 'UDA_1.2.CSV'),
+                          encoding="ISO-8859-1",
+                          engine='python',
+                          header=[8])
+    df_8760 = df_8760.drop(labels=[0])
+    return np.squeeze(df_8760['EArrMPP'].to_numpy(dtype=float))
+
+
+def uda_case(years, PCS_np=40, aug_sched=[]):
+    """
+    Build the UDA case for a run of years, with the shipped uda_rates.
+
+    Returns
+    -------
+    case : dict
+        case from functions.define_cases.
+    project_rates : dict
+        rate_functions.uda_rates for the years.
+    """
+    import functions as fun
+    import monthly_battery_functions as batt
+    import rate_functions as rf
+
+    components = load_components()
+    components['Mod']['life'] = years
+    # The battery arrays are padded to the module life, not trimmed.
+    components['Batt']['life'] = min(components['Batt']['life'], years)
+    POI = 80
+    array_life = np.tile(load_array_energy(), years)
+    module_deg = fun.module_degradation(components['Mod'])
+    batt_deg = batt.battery_degradation(components['Batt'], 1)
+    case_list = fun.define_cases(components,
+                                 module_deg,
+                                 array_life,
+                                 batt_deg,
+                                 POI,
+                                 [1.2, 1.2, 0.05],
+                                 [1.1275*POI, 1.1275*POI, 0.05*POI],
+                                 [PCS_np, PCS_np, 100],
+                                 [1.0, 1.0, 1.0],
+                                 aug_sched)
+    project_rates = rf.uda_rates(years)
+    # uda_rates holds 35 years of the zero rates.
+    for key in project_rates:
+        project_rates[key] = project_rates[key][:years*8760]
+    return case_list['Case 1'], project_rates
+
+
+@pytest.fixture(scope='session')
+def uda_10_years():
+    return uda_case(10)
+
+
+@pytest.fixture(scope='session')
+def uda_25_years():
+    # The battery life is 21 years, the last years run past end of life.
+    return uda_case(25)
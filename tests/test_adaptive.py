@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive case sweep.
+"""
+import pytest
+
+import adaptive
+import retention as rt
+
+
+@pytest.mark.parametrize('kwargs', [{'screening_days': 20},
+                                    {'horizon_step': 5},
+                                    {'retention': rt.RetentionPolicy({})}])
+def test_rejects_outputs_without_hourly_dispatch(kwargs):
+    # Checked before any case is built or dispatched.
+    with pytest.raises(ValueError, match=list(kwargs)[0]):
+        adaptive.adaptive_sweep(None, None, None, None, 80,
+                                [1.2, 1.2, 0.05], [90, 90, 0], [40, 40, 0], [4, 4, 1],
+                                None, 0.1, 8, 40, 4,
+                                arbitrage_kwargs=kwargs)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Interning store for the hourly case arrays.
+"""
+import gc
+
+import numpy as np
+import pytest
+
+import array_store
+
+
+def test_hits_share_one_array():
+    store = array_store.ArrayStore()
+    first = store.intern(np.arange(8760, dtype=float))
+    second = store.intern(np.arange(8760, dtype=float))
+    other = store.intern(np.arange(8760, dtype=float) + 1)
+    assert second is first
+    assert other is not first
+    stats = store.stats()
+    assert stats['requests'] == 3
+    assert stats['hits'] == 1
+    assert stats['arrays'] == 2
+    assert stats['saved bytes'] == first.nbytes
+
+
+def test_interned_arrays_are_read_only():
+    store = array_store.ArrayStore()
+    array = np.ones(24)
+    interned = store.intern(array)
+    # The caller's array is stored, and made read only.
+    assert interned is array
+    assert not array.flags.writeable
+    with pytest.raises(ValueError):
+        interned[0] = 2.0
+    # Scalars are passed through.
+    assert store.intern(0.95) == 0.95
+
+
+def test_intern_dict():
+    store = array_store.ArrayStore()
+    losses = store.intern_dict({'array to POI': np.full(48, 0.97), 'battery to POI': 0.95})
+    limits = store.intern_dict({'POI limit': np.full(48, 0.97)})
+    assert limits['POI limit'] is losses['array to POI']
+    assert losses['battery to POI'] == 0.95
+
+
+def test_freed_arrays_are_pruned():
+    store = array_store.ArrayStore()
+    arrays = [store.intern(np.full(24, float(value))) for value in range(3)]
+    assert store.stats()['arrays'] == 3
+    del arrays
+    gc.collect()
+    # Entries and their empty buckets go once no case uses the arrays.
+    assert store.stats()['arrays'] == 0
+    assert len(store._buckets) == 0
+    # A new array with the same content is stored again.
+    array = store.intern(np.full(24, 1.0))
+    assert store.stats()['arrays'] == 1
+    assert store.stats()['hits'] == 0
+    assert array.flags.writeable is False
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Daily dispatch kernels of dispatch.py on hand built days.
+"""
+import os
+
+import numpy as np
+import pytest
+
+import dispatch as nd
+
+# Outputs of the original daily_arbitrage (before the running SOC total 
+# discharge allocation) for the days of HAND_DAYS.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                        'daily_arbitrage_baseline.npz')
+
+# Array energy of a summer day of the UDA case.
+PV = np.array([0, 0, 0, 0, 0, 10.4, 58.7, 85.8, 90.9, 92.9, 47.3, 56.7,
+               63.4, 79.2, 62.6, 78.1, 86.3, 82.8, 62.8, 18.2, 0, 0, 0, 0])
+
+
+def hand_day(pv_scale=1.0, peak=(16, 22), batt_power=8.6, dod=33.6,
+             inv_limit=91.6, POI_limit=82.1):
+    """
+    Build the 24 x 25 dispatch array of a day, see dispatch.daily_arbitrage 
+    for the columns.
+    """
+    day = np.zeros([24,25])
+    pv = PV*pv_scale
+    day[:,0] = pv
+    # Combined rate, high over the peak hours.
+    day[:,2] = 5.0
+    day[peak[0]:peak[1],2] = 50.0
+    day[:,6] = np.minimum(pv, inv_limit)
+    day[:,7] = np.minimum(day[:,6], POI_limit)
+    day[:,8] = batt_power
+    day[:,9] = batt_power
+    day[:,10] = inv_limit
+    day[:,11] = 40.0
+    day[:,12] = 40.6
+    day[:,13] = POI_limit
+    day[:,14] = batt_power*1.04
+    # Losses and battery efficiencies.
+    day[:,15] = 0.937
+    day[:,16] = 0.979
+    day[:,17] = 0.974
+    day[:,18] = 0.952
+    day[:,19] = 0.974
+    day[:,20] = 0.974
+    day[:,21] = dod
+    day[:,22] = batt_power
+    day[:,23] = dod*1.02
+    day[:,24] = 0.95
+    return day
+
+
+# Name: (arbitrage, batt_limit_POI, batt_hours_POI, daily_array).
+HAND_DAYS = {'arbitrage': (True, 40, 4, hand_day()),
+             # SOC limited charge, partial discharge in the first peak hour.
+             'small battery': (True, 40, 4, hand_day(dod=12.0)),
+             # Charge and discharge limited by the POI battery limit.
+             'POI limited': (True, 5, 2, hand_day()),
+             # Peak too short to discharge the battery at full power.
+             'short peak': (True, 40, 4, hand_day(peak=(18, 20), batt_power=20.0)),
+             'clip only': (False, 40, 4, hand_day(pv_scale=1.3)),
+             'end of life': (True, 40, 4, hand_day(dod=0.0)),
+             'low sun': (True, 40, 4, hand_day(pv_scale=0.1))}
+
+
+def dispatch_day(name, **kwargs):
+    arbitrage, batt_limit_POI, batt_hours_POI, daily_array = HAND_DAYS[name]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return nd.daily_arbitrage(arbitrage, 80, 9.3, 8, batt_limit_POI, 
+                                  batt_hours_POI, daily_array, **kwargs)
+
+
+@pytest.mark.parametrize('name', list(HAND_DAYS))
+def test_daily_arbitrage_matches_baseline(name):
+    baseline = np.load(BASELINE)[name]
+    assert np.allclose(dispatch_day(name), baseline, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def test_baseline_days_cover_limits():
+    baseline = np.load(BASELINE)
+    # Partial discharge, an hour between zero and the full discharge.
+    discharge = baseline['small battery'][:,2]
+    assert ((discharge > 0) & (discharge < discharge.max())).any()
+    # SOC limited, the battery fills to the DOD or the POI battery capacity.
+    assert baseline['small battery'][:,4].max() == pytest.approx(12.0)
+    assert baseline['POI limited'][:,4].max() == pytest.approx(5*2/0.952)
+
+
+def test_workspace_reuse_matches_baseline():
+    # Days dispatched through one workspace do not carry state between them.
+    workspace = nd.dispatch_workspace()
+    baseline = np.load(BASELINE)
+    for name in HAND_DAYS:
+        output = dispatch_day(name, workspace=workspace)
+        assert np.allclose(output, baseline[name], rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def dispatch_days(arbitrage, PV_min_energy_chg, batt_limit_POI, batt_hours_POI, dispatch_block):
+    # Full daily_arbitrage kernel for each day of a block.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.array([nd.daily_arbitrage(arbitrage[day], 80, PV_min_energy_chg, 8,
+                                            batt_limit_POI, batt_hours_POI,
+                                            dispatch_block[day])
+                         for day in range(len(dispatch_block))])
+
+
+def test_idle_days_hand_built():
+    names = ['arbitrage', 'clip only', 'end of life']
+    block = np.array([HAND_DAYS[name][3] for name in names])
+    # A day without arbitrage or clipping, the battery stays empty.
+    block = np.append(block, hand_day(pv_scale=0.5)[None], axis=0)
+    arbitrage = np.array([True, False, True, False])
+    idle = nd.idle_days(arbitrage, 40, 4, block)
+    assert list(idle) == [False, False, True, True]
+    full = dispatch_days(arbitrage, 9.3, 40, 4, block)
+    pv_only = nd.pv_only_dispatch(arbitrage[idle], 9.3, block[idle])
+    assert np.allclose(pv_only, full[idle], rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_idle_days_match_full_kernel(uda_25_years):
+    import pvs
+    import rate_functions as rf
+
+    case, project_rates = uda_25_years
+    compact = pvs.dispatch_prep_compact(case['degraded array energy'],
+                                        project_rates,
+                                        case['losses'],
+                                        case['limits'],
+                                        case['battery capacity'],
+                                        case['battery power'])
+    block = pvs.dispatch_block_days(compact, slice(None))
+    PV_min_energy_chg = max(case['degraded array energy'])*0.1
+    rate_arbitrage = rf.daily_rate_index(project_rates, 8)['arbitrage days']
+    # Days with and without arbitrage, past end of life every day is idle.
+    for arbitrage in (rate_arbitrage, np.zeros(len(block), dtype=bool)):
+        idle = nd.idle_days(arbitrage, 40, 4, block)
+        assert idle.any() and not idle.all()
+        assert idle[-365:].all()
+        full = dispatch_days(arbitrage[idle], PV_min_energy_chg, 40, 4, block[idle])
+        pv_only = nd.pv_only_dispatch(arbitrage[idle], PV_min_energy_chg, block[idle])
+        assert np.allclose(pv_only, full, rtol=1e-12, atol=1e-9, equal_nan=True)
+        # Days left to the full dispatch do use the battery.
+        busy = dispatch_days(arbitrage[~idle], PV_min_energy_chg, 40, 4, block[~idle])
+        assert (busy[:,:,4].max(axis=1) > 0).all()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Daily dispatch cache on the UDA case with the shipped uda_rates.
+"""
+import numpy as np
+import pytest
+
+import dispatch_cache as dcm
+import dispatch_numba as dn
+import pvs
+
+
+def run(case, project_rates, engine, cache=None):
+    return pvs.pvs_ac_mv(max(case['degraded array energy'])*0.1,
+                         8,
+                         40,
+                         4,
+                         case['degraded array energy'],
+                         project_rates,
+                         case['POI'],
+                         case['losses'],
+                         case['limits'],
+                         case['battery capacity'],
+                         case['battery power'],
+                         engine=engine,
+                         cache=cache)
+
+
+def test_hits_on_shipped_rates(uda_10_years):
+    case, project_rates = uda_10_years
+    # Approximate keys, opted in with rtol.
+    cache = dcm.DailyDispatchCache(max_size=20000, rtol=0.05)
+    output = run(case, project_rates, 'batch', cache)
+    reference = run(case, project_rates, 'batch')
+    # The same calendar day of nearby years shares an output.
+    assert cache.stats()['hit rate'] > 0.1
+    # Reused days differ by up to rtol, the totals stay close.
+    for key in ['PVS POI output - PV', 'PVS POI output - battery']:
+        assert output[key].sum() == pytest.approx(reference[key].sum(), rel=0.01)
+
+
+@pytest.mark.parametrize('engine', ['loop', 'numba'])
+def test_engines_match_with_cache(uda_10_years, engine):
+    if engine == 'numba' and not dn.NUMBA_AVAILABLE:
+        pytest.skip('numba not installed')
+    case, project_rates = uda_10_years
+    batch_cache = dcm.DailyDispatchCache(max_size=20000, rtol=0.05)
+    engine_cache = dcm.DailyDispatchCache(max_size=20000, rtol=0.05)
+    batch = run(case, project_rates, 'batch', batch_cache)
+    output = run(case, project_rates, engine, engine_cache)
+    assert engine_cache.stats() == batch_cache.stats()
+    assert np.allclose(output.data, batch.data, equal_nan=True)
+
+
+def test_default_is_exact(uda_10_years):
+    case, project_rates = uda_10_years
+    cache = dcm.DailyDispatchCache(max_size=20000)
+    output = run(case, project_rates, 'batch', cache)
+    reference = run(case, project_rates, 'batch')
+    assert np.array_equal(output.data, reference.data, equal_nan=True)
+    # A second run of the case is served from the cache, unchanged.
+    hits = cache.hits
+    again = run(case, project_rates, 'batch', cache)
+    assert cache.hits - hits == len(case['degraded array energy'])//24
+    assert np.array_equal(again.data, reference.data, equal_nan=True)
+
+
+def test_tight_tolerance_is_exact(uda_10_years):
+    case, project_rates = uda_10_years
+    cache = dcm.DailyDispatchCache(max_size=20000, rtol=1e-9)
+    output = run(case, project_rates, 'batch', cache)
+    reference = run(case, project_rates, 'batch')
+    assert cache.hits == 0
+    assert np.array_equal(output.data, reference.data, equal_nan=True)
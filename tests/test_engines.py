@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Dispatch engines against the pure python daily_arbitrage loop.
+"""
+import numpy as np
+import pytest
+
+import dispatch_numba as dn
+import pvs
+
+
+def run(case, project_rates, engine, **kwargs):
+    return pvs.pvs_ac_mv(max(case['degraded array energy'])*0.1,
+                         8,
+                         40,
+                         4,
+                         case['degraded array energy'],
+                         project_rates,
+                         case['POI'],
+                         case['losses'],
+                         case['limits'],
+                         case['battery capacity'],
+                         case['battery power'],
+                         engine=engine,
+                         **kwargs)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('years', ['uda_10_years', 'uda_25_years'])
+def test_batch_matches_loop(request, years):
+    case, project_rates = request.getfixturevalue(years)
+    if years == 'uda_25_years':
+        # Years past the battery end of life are part of the run.
+        assert (np.asarray(case['battery power']['DOD np']) == 0).any()
+    # Every day through the engines, the idle day fast path is left out.
+    loop = run(case, project_rates, 'loop', idle_fast_path=False)
+    batch = run(case, project_rates, 'batch', idle_fast_path=False)
+    assert np.allclose(batch.data, loop.data, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_numba_matches_loop(uda_25_years):
+    if not dn.NUMBA_AVAILABLE:
+        pytest.skip('numba not installed')
+    case, project_rates = uda_25_years
+    loop = run(case, project_rates, 'loop', idle_fast_path=False)
+    compiled = run(case, project_rates, 'numba', idle_fast_path=False)
+    assert np.allclose(compiled.data, loop.data, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_numba_fallback(uda_10_years, monkeypatch, capsys):
+    case, project_rates = uda_10_years
+    loop = run(case, project_rates, 'loop')
+    # Without numba the numba engine runs the python loop.
+    monkeypatch.setattr(dn, 'NUMBA_AVAILABLE', False)
+    fallback = run(case, project_rates, 'numba')
+    assert 'falling back' in capsys.readouterr().out
+    assert np.array_equal(fallback.data, loop.data, equal_nan=True)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_numba_kernel_runs_uncompiled(uda_10_years, monkeypatch):
+    # The kernels are plain python functions when numba is not installed.
+    case, project_rates = uda_10_years
+    compiled = run(case, project_rates, 'numba')
+    for name in ('daily_arbitrage_nb', 'pvs_ac_mv_nb'):
+        function = getattr(dn, name)
+        monkeypatch.setattr(dn, name, getattr(function, 'py_func', function))
+    python = run(case, project_rates, 'numba')
+    assert np.allclose(python.data, compiled.data, rtol=1e-12, atol=1e-9, equal_nan=True)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Case level parallel runs, parallel.run_cases and arbitrage with case_workers.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+import parallel as par
+import pvs
+from conftest import uda_case
+
+
+def sleep_case(shared, case, output, seconds):
+    # Stands in for the dispatch of a case, sleeps and writes its output.
+    start = time.time()
+    time.sleep(seconds)
+    output[...] = case['values'] + shared['offset']
+    return os.getpid(), start, time.time()
+
+
+def run(pool, seconds=0.0):
+    cases = {f'Case {i}': {'values': np.full(24, float(i))} for i in range(2)}
+    return list(par.run_cases(sleep_case,
+                              {'offset': np.ones(24)},
+                              cases,
+                              {key: (24,) for key in cases},
+                              (seconds,),
+                              2,
+                              pool=pool))
+
+
+def test_cases_overlap_and_reuse_pool():
+    with par.make_pool(2) as pool:
+        # Start both workers.
+        warm = run(pool, 0.5)
+        results = run(pool, 1.0)
+    # Results come back in case order.
+    assert [key for key, output, result in results] == ['Case 0', 'Case 1']
+    for i, (key, output, result) in enumerate(results):
+        assert np.array_equal(output, np.full(24, i + 1.0))
+    # The cases ran in two workers at the same time, each started before the
+    # other finished.
+    (pid_0, start_0, end_0), (pid_1, start_1, end_1) = [result for key, output, result in results]
+    assert pid_0 != pid_1
+    assert start_1 < end_0 and start_0 < end_1
+    # The second sweep ran in the workers started by the first.
+    assert {pid_0, pid_1} <= {result[0] for key, output, result in warm}
+
+
+def test_case_workers_reject_caches(uda_10_years):
+    import dispatch_cache as dcm
+
+    case, project_rates = uda_10_years
+    with pytest.raises(ValueError):
+        pvs.arbitrage(9.3, 8, {'Case 1': dict(case)}, project_rates, 40, 4,
+                      cache=dcm.DailyDispatchCache(), case_workers=2)
+
+
+def test_case_workers_match_serial():
+    outputs = []
+    for case_workers in (1, 2):
+        case_list = {}
+        for i, PCS_np in enumerate((40, 20)):
+            case_list[f'Case {i + 1}'], project_rates = uda_case(2, PCS_np=PCS_np)
+        with par.make_pool(2) as pool:
+            pvs.arbitrage(max(case_list['Case 1']['degraded array energy'])*0.1,
+                          8,
+                          case_list,
+                          project_rates,
+                          40,
+                          4,
+                          case_workers=case_workers,
+                          pool=pool)
+        outputs.append([case_list[key]['dispatch output'].data for key in case_list])
+    for serial, parallel in zip(*outputs):
+        assert np.allclose(serial, parallel, equal_nan=True)
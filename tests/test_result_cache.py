@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent case result cache.
+"""
+import numpy as np
+import pytest
+
+import dispatch_cache as dcm
+import pvs
+import result_cache as rc
+
+
+def run(case, project_rates, **kwargs):
+    return pvs.pvs_ac_mv(max(case['degraded array energy'])*0.1,
+                         8,
+                         40,
+                         4,
+                         case['degraded array energy'],
+                         project_rates,
+                         case['POI'],
+                         case['losses'],
+                         case['limits'],
+                         case['battery capacity'],
+                         case['battery power'],
+                         engine='batch',
+                         **kwargs)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_approximate_daily_cache_keyed_apart(uda_10_years, tmp_path):
+    case, project_rates = uda_10_years
+    result_cache = rc.DispatchResultCache(str(tmp_path))
+    approximate = run(case, project_rates, result_cache=result_cache,
+                      cache=dcm.DailyDispatchCache(max_size=20000, rtol=0.05))
+    # An exact run does not load the approximate result.
+    exact = run(case, project_rates, result_cache=result_cache)
+    assert result_cache.hits == 0
+    assert np.array_equal(exact.data, run(case, project_rates).data, equal_nan=True)
+    assert not np.array_equal(exact.data, approximate.data, equal_nan=True)
+    # An exact daily cache gives the exact result, shared with the plain run.
+    again = run(case, project_rates, result_cache=result_cache,
+                cache=dcm.DailyDispatchCache())
+    assert result_cache.hits == 1
+    assert np.array_equal(again.data, exact.data, equal_nan=True)
+
+
+def test_code_version_covers_dispatch_modules():
+    for name in ('dispatch_cache', 'screening', 'horizon', 'parallel', 'rate_functions'):
+        assert name in rc.DISPATCH_MODULES
+    assert rc.code_version() == rc.code_version()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming dispatch, pvs.pvs_ac_mv_stream against the full pvs_ac_mv run.
+"""
+import numpy as np
+import pytest
+
+import pvs
+
+KEYS = ['PV only plant energy', 'PVS POI output - PV', 'PVS POI output - battery']
+
+
+def arguments(case, project_rates):
+    return (max(case['degraded array energy'])*0.1,
+            8,
+            40,
+            4,
+            case['degraded array energy'],
+            project_rates,
+            case['POI'],
+            case['losses'],
+            case['limits'],
+            case['battery capacity'],
+            case['battery power'])
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('block_days', [365, 100])
+def test_blocks_add_up_to_full_run(uda_10_years, block_days):
+    case, project_rates = uda_10_years
+    full = pvs.pvs_ac_mv(*arguments(case, project_rates))
+    covered = 0
+    for days, block_output in pvs.pvs_ac_mv_stream(*arguments(case, project_rates),
+                                                   block_days=block_days):
+        assert days.start == covered
+        assert len(block_output['hour']) == (days.stop - days.start)*24
+        assert np.array_equal(block_output.days, full.days[days], equal_nan=True)
+        covered = days.stop
+    assert covered == len(case['degraded array energy'])//24
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_annual_totals_match(uda_10_years):
+    case, project_rates = uda_10_years
+    full = pvs.pvs_ac_mv(*arguments(case, project_rates))
+    years = len(case['degraded array energy'])//8760
+    streamed = {key: [] for key in KEYS}
+    for days, year_output in pvs.pvs_ac_mv_stream(*arguments(case, project_rates)):
+        for key in KEYS:
+            streamed[key].append(year_output[key].sum())
+    for key in KEYS:
+        annual = full[key].reshape(years, 8760).sum(axis=1)
+        assert np.allclose(streamed[key], annual, rtol=1e-12)